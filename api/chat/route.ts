@@ -2,6 +2,10 @@ import OpenAI from "openai";
 import { NextRequest } from "next/server";
 import { readFileSync } from "fs";
 import { join } from "path";
+import { searchCourses } from "@/lib/searchIndex";
+import { getAssignments } from "@/lib/assignmentIndex";
+import { buildSchedule } from "@/lib/scheduleSearch";
+import { PAGING_PROPERTIES, viaDaemon } from "@/lib/queryDaemon";
 
 const openai = new OpenAI({ apiKey: process.env.OPENAI_API_KEY });
 
@@ -54,6 +58,7 @@ const tools = [
         type: "object",
         properties: {
           teacher_name: { type: "string", description: "Teacher's first or last name" },
+          ...PAGING_PROPERTIES,
         },
       },
     },
@@ -62,11 +67,14 @@ const tools = [
     type: "function" as const,
     function: {
       name: "get_assignments",
-      description: "Get current assignments for courses. Optionally filter by course code.",
+      description: "Get current assignments for courses. Optionally filter by course code and due date range.",
       parameters: {
         type: "object",
         properties: {
           course: { type: "string", description: "Course code (e.g., 'MATH 320')" },
+          due_after: { type: "string", description: "Only assignments due on or after this date (YYYY-MM-DD)" },
+          due_before: { type: "string", description: "Only assignments due on or before this date (YYYY-MM-DD)" },
+          ...PAGING_PROPERTIES,
         },
       },
     },
@@ -81,10 +89,26 @@ const tools = [
         properties: {
           course_code: { type: "string", description: "Course code to search (e.g., 'A HTG 100', 'MATH')" },
           instructor: { type: "string", description: "Instructor name to filter by" },
+          ...PAGING_PROPERTIES,
         },
       },
     },
   },
+  {
+    type: "function" as const,
+    function: {
+      name: "build_schedule",
+      description: "Build conflict-free class schedules for a list of courses, ranked by instructor rating, later start and fewer gaps. Use 'DEPT *' for any course in a department (e.g. 'REL *' for a Religion class).",
+      parameters: {
+        type: "object",
+        properties: {
+          courses: { type: "array", items: { type: "string" }, description: "Course codes, e.g. ['MATH 320', 'CS 452', 'REL *']" },
+          k: { type: "number", description: "Number of schedules to return (default 5)" },
+        },
+        required: ["courses"],
+      },
+    },
+  },
   {
     type: "function" as const,
     function: {
@@ -106,6 +130,9 @@ const tools = [
   },
 ];
 
+// BYU events API. Set EVENTS_API_URL to a legacy/events_sync.py instance to serve from its cache.
+const EVENTS_API = process.env.EVENTS_API_URL ?? "https://calendar.byu.edu/api";
+
 function appendParam(url: URL, key: string, value: string | number | undefined) {
   if (value !== undefined && value !== null && String(value) !== "") {
     url.searchParams.append(key, String(value));
@@ -116,7 +143,7 @@ async function callTool(name: string, args: any) {
   switch (name) {
     case "query_events": {
       const { start_date, end_date, category, price } = args;
-      const base = "https://calendar.byu.edu/api/Events.json";
+      const base = `${EVENTS_API}/Events.json`;
       const url = new URL(base);
       if (category && category.length > 0) {
         url.searchParams.set("categories", category.map(String).join("+"));
@@ -133,7 +160,7 @@ async function callTool(name: string, args: any) {
     
     case "get_category_event_counts": {
       const { start_date, end_date, price } = args;
-      const base = "https://calendar.byu.edu/api/AllCategoryCounts.json";
+      const base = `${EVENTS_API}/AllCategoryCounts.json`;
       const url = new URL(base);
       appendParam(url, "event[min][date]", start_date);
       appendParam(url, "event[max][date]", end_date);
@@ -144,62 +171,36 @@ async function callTool(name: string, args: any) {
     }
     
     case "get_event_categories": {
-      const res = await fetch("https://calendar.byu.edu/api/AllCategories.json");
+      const res = await fetch(`${EVENTS_API}/AllCategories.json`);
       return await res.json();
     }
     
     case "get_teacher_ratings": {
-      const dataPath = join(process.cwd(), "data", "teacher_ratings.json");
-      const data = JSON.parse(readFileSync(dataPath, "utf-8"));
-      
-      if (args.teacher_name) {
-        const searchTerms = args.teacher_name.toLowerCase().split(/\s+/);
-        return data.filter((t: any) => {
-          const fullName = `${t.firstName} ${t.lastName}`.toLowerCase();
-          return searchTerms.every(term => fullName.includes(term));
-        });
-      }
-      return data;
+      return viaDaemon("get_teacher_ratings", args, () => {
+        const dataPath = join(process.cwd(), "data", "teacher_ratings.json");
+        const data = JSON.parse(readFileSync(dataPath, "utf-8"));
+
+        if (args.teacher_name) {
+          const searchTerms = args.teacher_name.toLowerCase().split(/\s+/);
+          return data.filter((t: any) => {
+            const fullName = `${t.firstName} ${t.lastName}`.toLowerCase();
+            return searchTerms.every((term: string) => fullName.includes(term));
+          });
+        }
+        return data;
+      });
     }
     
     case "get_assignments": {
-      const dataPath = join(process.cwd(), "data", "current_assignments.json");
-      const data = JSON.parse(readFileSync(dataPath, "utf-8"));
-      
-      if (args.course) {
-        const filtered = data.events.filter((e: any) => 
-          e.course.toLowerCase().includes(args.course.toLowerCase())
-        );
-        return { ...data, events: filtered };
-      }
-      return data;
+      return viaDaemon("get_assignments", args, () => getAssignments(args));
     }
     
     case "search_courses": {
-      const dataPath = join(process.cwd(), "data", "courses.json");
-      const data = JSON.parse(readFileSync(dataPath, "utf-8"));
-      
-      let filtered = data;
-      
-      if (args.course_code) {
-        const search = args.course_code.toLowerCase();
-        filtered = filtered.filter((c: any) => 
-          c.course_name.toLowerCase().includes(search) ||
-          c.full_title.toLowerCase().includes(search)
-        );
-      }
-      
-      if (args.instructor) {
-        const search = args.instructor.toLowerCase();
-        filtered = filtered.map((c: any) => ({
-          ...c,
-          sections: c.sections.filter((s: any) =>
-            s.instructor_name.toLowerCase().includes(search)
-          )
-        })).filter((c: any) => c.sections.length > 0);
-      }
-      
-      return filtered;
+      return viaDaemon("search_courses", args, () => searchCourses(args));
+    }
+    
+    case "build_schedule": {
+      return viaDaemon("build_schedule", args, () => buildSchedule(args));
     }
     
     case "create_calendar_event": {
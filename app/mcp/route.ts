@@ -2,6 +2,23 @@ import { createMcpHandler } from "mcp-handler";
 import { z } from "zod";
 import { readFileSync } from "fs";
 import { join } from "path";
+import { searchCourses } from "@/lib/searchIndex";
+import { getAssignments } from "@/lib/assignmentIndex";
+import { buildSchedule } from "@/lib/scheduleSearch";
+import { DAEMON_ENABLED, viaDaemon } from "@/lib/queryDaemon";
+
+// BYU events API. Set EVENTS_API_URL to a legacy/events_sync.py instance to serve from its cache.
+const EVENTS_API = process.env.EVENTS_API_URL ?? "https://calendar.byu.edu/api";
+
+// Paging arguments for the bounded tools, offered only when the daemon answers them
+// (see PAGING_PROPERTIES in lib/queryDaemon.ts)
+const paging = DAEMON_ENABLED ? {
+  limit: z.number().optional(),
+  fields: z.array(z.string()).optional(),
+  cursor: z.string().optional(),
+  max_bytes: z.number().optional(),
+} : {};
+type Paging = { limit?: number; fields?: string[]; cursor?: string; max_bytes?: number };
 
 // Helper to build query params safely
 function appendParam(url: URL, key: string, value: string | number | undefined) {
@@ -24,7 +41,7 @@ const handler = createMcpHandler(
       },
       async (args: { start_date?: string; end_date?: string; category?: number[]; price?: number }) => {
         const { start_date, end_date, category, price } = args;
-        const base = "https://calendar.byu.edu/api/Events.json";
+        const base = `${EVENTS_API}/Events.json`;
         // Build URL with categories param (BYU API expects categories=all or a plus-separated list)
         const url = new URL(base);
         if (category && category.length > 0) {
@@ -56,7 +73,7 @@ const handler = createMcpHandler(
       },
       async (args: { start_date?: string; end_date?: string; price?: number }) => {
         const { start_date, end_date, price } = args;
-        const base = "https://calendar.byu.edu/api/AllCategoryCounts.json";
+        const base = `${EVENTS_API}/AllCategoryCounts.json`;
         const url = new URL(base);
         appendParam(url, "event[min][date]", start_date);
         appendParam(url, "event[max][date]", end_date);
@@ -74,7 +91,7 @@ const handler = createMcpHandler(
       "Get a list of all event categories with their names and IDs.",
       {},
       async () => {
-        const res = await fetch("https://calendar.byu.edu/api/AllCategories.json");
+        const res = await fetch(`${EVENTS_API}/AllCategories.json`);
         const json = await res.json();
         return { content: [{ type: "json", json }] };
       },
@@ -83,46 +100,42 @@ const handler = createMcpHandler(
     // get_teacher_ratings(teacher_name?: string)
     server.tool(
       "get_teacher_ratings",
-      "Get ratings for BYU teachers. Optionally filter by teacher name (first or last).",
+      "Get ratings for BYU teachers. Optionally filter by teacher name (every word must appear in the full name).",
       {
         teacher_name: z.string().optional(),
+        ...paging,
       },
-      async (args: { teacher_name?: string }) => {
-        const dataPath = join(process.cwd(), "data", "teacher_ratings.json");
-        const data = JSON.parse(readFileSync(dataPath, "utf-8"));
-        
-        if (args.teacher_name) {
-          const search = args.teacher_name.toLowerCase();
-          const filtered = data.filter((t: any) => 
-            t.firstName.toLowerCase().includes(search) || 
-            t.lastName.toLowerCase().includes(search)
-          );
-          return { content: [{ type: "json", json: filtered }] };
-        }
-        
-        return { content: [{ type: "json", json: data }] };
+      async (args: { teacher_name?: string } & Paging) => {
+        const json = await viaDaemon("get_teacher_ratings", args, () => {
+          const dataPath = join(process.cwd(), "data", "teacher_ratings.json");
+          const data = JSON.parse(readFileSync(dataPath, "utf-8"));
+
+          // Same match as the chat route and the daemon (store.py): every term in the full name
+          if (args.teacher_name) {
+            const searchTerms = args.teacher_name.toLowerCase().split(/\s+/);
+            return data.filter((t: any) => {
+              const fullName = `${t.firstName} ${t.lastName}`.toLowerCase();
+              return searchTerms.every((term: string) => fullName.includes(term));
+            });
+          }
+          return data;
+        });
+        return { content: [{ type: "json", json }] };
       },
     );
 
-    // get_assignments(course?: string)
+    // get_assignments(course?: string, due_after?: string, due_before?: string)
     server.tool(
       "get_assignments",
-      "Get current assignments for courses. Optionally filter by course code (e.g., 'MATH 320').",
+      "Get current assignments for courses. Optionally filter by course code (e.g., 'MATH 320') and due date range (YYYY-MM-DD, inclusive).",
       {
         course: z.string().optional(),
+        due_after: z.string().optional(),
+        due_before: z.string().optional(),
+        ...paging,
       },
-      async (args: { course?: string }) => {
-        const dataPath = join(process.cwd(), "data", "current_assignments.json");
-        const data = JSON.parse(readFileSync(dataPath, "utf-8"));
-        
-        if (args.course) {
-          const filtered = data.events.filter((e: any) => 
-            e.course.toLowerCase().includes(args.course!.toLowerCase())
-          );
-          return { content: [{ type: "json", json: { ...data, events: filtered } }] };
-        }
-        
-        return { content: [{ type: "json", json: data }] };
+      async (args: { course?: string; due_after?: string; due_before?: string } & Paging) => {
+        return { content: [{ type: "json", json: await viaDaemon("get_assignments", args, () => getAssignments(args)) }] };
       },
     );
 
@@ -133,32 +146,23 @@ const handler = createMcpHandler(
       {
         course_code: z.string().optional(),
         instructor: z.string().optional(),
+        ...paging,
       },
-      async (args: { course_code?: string; instructor?: string }) => {
-        const dataPath = join(process.cwd(), "data", "courses.json");
-        const data = JSON.parse(readFileSync(dataPath, "utf-8"));
-        
-        let filtered = data;
-        
-        if (args.course_code) {
-          const search = args.course_code.toLowerCase();
-          filtered = filtered.filter((c: any) => 
-            c.course_name.toLowerCase().includes(search) ||
-            c.full_title.toLowerCase().includes(search)
-          );
-        }
-        
-        if (args.instructor) {
-          const search = args.instructor.toLowerCase();
-          filtered = filtered.map((c: any) => ({
-            ...c,
-            sections: c.sections.filter((s: any) =>
-              s.instructor_name.toLowerCase().includes(search)
-            )
-          })).filter((c: any) => c.sections.length > 0);
-        }
-        
-        return { content: [{ type: "json", json: filtered }] };
+      async (args: { course_code?: string; instructor?: string } & Paging) => {
+        return { content: [{ type: "json", json: await viaDaemon("search_courses", args, () => searchCourses(args)) }] };
+      },
+    );
+
+    // build_schedule(courses: string[], k?: number)
+    server.tool(
+      "build_schedule",
+      "Build conflict-free class schedules for a list of courses, ranked by instructor rating, later start and fewer gaps. Use 'DEPT *' for any course in a department.",
+      {
+        courses: z.array(z.string()),
+        k: z.number().optional(),
+      },
+      async (args: { courses: string[]; k?: number }) => {
+        return { content: [{ type: "json", json: await viaDaemon("build_schedule", args, () => buildSchedule(args)) }] };
       },
     );
   },
@@ -169,8 +173,9 @@ const handler = createMcpHandler(
         get_category_event_counts: { description: "Get a list of the number of events by event category name and ID." },
         get_event_categories: { description: "Get a list of all event categories with their names and IDs." },
         get_teacher_ratings: { description: "Get ratings for BYU teachers. Optionally filter by teacher name." },
-        get_assignments: { description: "Get current assignments for courses. Optionally filter by course code." },
-        search_courses: { description: "Search BYU courses by course code, title, or instructor name." }
+        get_assignments: { description: "Get current assignments for courses. Optionally filter by course code and due date range." },
+        search_courses: { description: "Search BYU courses by course code, title, or instructor name." },
+        build_schedule: { description: "Build conflict-free class schedules for a list of courses." }
       },
     },
   },
@@ -1,23 +1,13 @@
+import argparse
 import json
-import requests
-import time
-
-# Read the simplified courses JSON
-print("Reading simplified_courses.json...")
-with open('simplified_courses.json', 'r') as f:
-    simplified_courses = json.load(f)
-
-# Read original data to get title_code
-print("Reading parsed_classes.json to get title_codes...")
-with open('parsed_classes.json', 'r') as f:
-    original_data = json.load(f)
-
-# Build curriculum_id to title_code mapping
-curriculum_to_titlecode = {}
-for course_key, course_data in original_data.items():
-    curriculum_id = course_data['curriculum_id']
-    title_code = course_data['title_code']
-    curriculum_to_titlecode[curriculum_id] = title_code
+import os
+from collections import Counter
+
+from crawl_journal import CrawlJournal
+from delta_refresh import FingerprintStore, build_report, fingerprint
+from http_pool import TokenBucket, Throughput, make_session, request_with_retry, run_pool
+from meeting_times import building_code, days_to_mask, format_clock, parse_hhmm
+from publish import atomic_write_json, publish
 
 # API endpoint
 base_url = "https://commtech.byu.edu/noauth/classSchedule/ajax/getSections.php"
@@ -25,112 +15,236 @@ base_url = "https://commtech.byu.edu/noauth/classSchedule/ajax/getSections.php"
 # Session ID - you may need to update this periodically
 session_id = "GH0JQG8JLMJVED9MSNAQ"
 
-# Only process first 10 courses for debugging
-courses_to_process = simplified_courses
-print(f"Processing first {len(courses_to_process)} courses for debugging")
-
-# Process each course
-for i, course in enumerate(courses_to_process):
-    curriculum_id = course['curriculum_id']
-    
-    # Get title_code for this curriculum_id
-    if curriculum_id not in curriculum_to_titlecode:
-        print(f"Warning: No title_code found for {course['course_name']}")
-        continue
-    
-    title_code = curriculum_to_titlecode[curriculum_id]
-    course_id = f"{curriculum_id}-{title_code}"
-    
-    print(f"Fetching {i+1}/{len(courses_to_process)}: {course['course_name']}")
-    
-    # Prepare payload
+yearterm = '20261'
+
+
+def format_time(time_str):
+    """Format time nicely (0900 -> 9:00 AM, 900 -> 9:00 AM, 1200 -> 12:00 PM)"""
+    minutes = parse_hhmm(time_str)
+    return format_clock(minutes) if minutes is not None else time_str
+
+
+def format_times(times):
+    """Turn the raw getSections time blocks into meetings (or None): display strings
+    plus start_min/end_min, day_mask and building_code for comparisons"""
+    time_ranges = []
+    for time_block in times or []:
+        # Build day string from individual day fields
+        days = []
+        if time_block.get('mon'): days.append('M')
+        if time_block.get('tue'): days.append('T')
+        if time_block.get('wed'): days.append('W')
+        if time_block.get('thu'): days.append('Th')
+        if time_block.get('fri'): days.append('F')
+        if time_block.get('sat'): days.append('Sa')
+        if time_block.get('sun'): days.append('Su')
+
+        day_string = ' '.join(days)
+        begin = time_block.get('begin_time', '')
+        end = time_block.get('end_time', '')
+        building = time_block.get('building', '')
+        room = time_block.get('room', '')
+
+        if day_string and begin and end:
+            time_ranges.append({
+                'days': day_string,
+                'start_time': format_time(begin),
+                'end_time': format_time(end),
+                'building': building,
+                'room': room,
+                'start_min': parse_hhmm(begin),
+                'end_min': parse_hhmm(end),
+                'day_mask': days_to_mask(day_string),
+                'building_code': building_code(building),
+            })
+
+    return time_ranges if time_ranges else None
+
+
+def load_parsed(filename='parsed_classes.json'):
+    """Load the getClasses entries keyed by curriculum_id-title_code"""
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def load_title_codes(filename='parsed_classes.json', original_data=None):
+    """Build curriculum_id to [title_code, ...] from the parsed classes, in file order.
+
+    Cross-listed courses (ACC 588, IS 588, MBA 588, ...) share a curriculum_id
+    under different title codes; simplified_courses.json lists them in the same
+    order, so the n-th course with a curriculum_id takes its n-th title code.
+    """
+    if original_data is None:
+        original_data = load_parsed(filename)
+
+    curriculum_to_titlecodes = {}
+    for course_key, course_data in original_data.items():
+        curriculum_to_titlecodes.setdefault(course_data['curriculum_id'], []).append(course_data['title_code'])
+    return curriculum_to_titlecodes
+
+
+def fetch_sections(session, course_id, limiter=None, retries=3):
+    """POST getSections.php for one course and return its sections list"""
     payload = {
         'courseId': course_id,
         'sessionId': session_id,
-        'yearterm': '20261'
+        'yearterm': yearterm
     }
-    
-    try:
-        response = requests.post(base_url, data=payload, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            if 'sections' in data:
-                sections_detail = data['sections']
-                
-                # Match sections by section_number
-                for section in course['sections']:
-                    section_num = section['section_number']
-                    
-                    # Find matching section in API response
-                    matching_section = next(
-                        (s for s in sections_detail if s['section_number'] == section_num),
-                        None
-                    )
-                    
-                    if matching_section and 'times' in matching_section:
-                        times = matching_section['times']
-                        if times:
-                            # Format time ranges
-                            time_ranges = []
-                            for time_block in times:
-                                # Build day string from individual day fields
-                                days = []
-                                if time_block.get('mon'): days.append('M')
-                                if time_block.get('tue'): days.append('T')
-                                if time_block.get('wed'): days.append('W')
-                                if time_block.get('thu'): days.append('Th')
-                                if time_block.get('fri'): days.append('F')
-                                if time_block.get('sat'): days.append('Sa')
-                                if time_block.get('sun'): days.append('Su')
-                                
-                                day_string = ' '.join(days)
-                                begin = time_block.get('begin_time', '')
-                                end = time_block.get('end_time', '')
-                                building = time_block.get('building', '')
-                                room = time_block.get('room', '')
-                                
-                                if day_string and begin and end:
-                                    # Format time nicely (0900 -> 9:00 AM)
-                                    def format_time(time_str):
-                                        if len(time_str) == 4:
-                                            hour = int(time_str[:2])
-                                            minute = time_str[2:]
-                                            period = 'AM' if hour < 12 else 'PM'
-                                            if hour > 12:
-                                                hour -= 12
-                                            elif hour == 0:
-                                                hour = 12
-                                            return f"{hour}:{minute} {period}"
-                                        return time_str
-                                    
-                                    time_ranges.append({
-                                        'days': day_string,
-                                        'start_time': format_time(begin),
-                                        'end_time': format_time(end),
-                                        'building': building,
-                                        'room': room
-                                    })
-                            
-                            section['times'] = time_ranges if time_ranges else None
-                        else:
-                            section['times'] = None
-                    else:
-                        section['times'] = None
-            
-        # Small delay to be nice to the server
-        time.sleep(0.13)
-        
-    except Exception as e:
-        print(f"Error fetching {course['course_name']}: {e}")
-        for section in course['sections']:
+    response = request_with_retry(session, 'POST', base_url, limiter=limiter,
+                                  retries=retries, data=payload)
+    # Keep only what apply_sections needs so checkpoints stay small
+    return [{'section_number': s['section_number'], 'times': s.get('times')}
+            for s in response.json().get('sections', [])]
+
+
+def apply_sections(course, sections_detail):
+    """Match sections by section_number and attach their formatted times"""
+    by_number = {s['section_number']: s for s in sections_detail}
+    for section in course['sections']:
+        matching_section = by_number.get(section['section_number'])
+        if matching_section and 'times' in matching_section:
+            section['times'] = format_times(matching_section['times'])
+        else:
             section['times'] = None
 
-# Save updated JSON (only first 10 for debugging)
-with open('simplified_courses_with_times_final.json', 'w') as f:
-    json.dump(courses_to_process, f, indent=2)
 
-print(f"\nCreated simplified_courses_with_times_debug.json")
-print("\nFirst example with times:")
-print(json.dumps(courses_to_process[0], indent=2))
\ No newline at end of file
+def add_times(courses, curriculum_to_titlecodes, concurrency=8, rate=8.0, retries=3,
+              journal=None, cached=None):
+    """Fetch section times for every course concurrently, updating courses in place.
+
+    With a journal, courses already checkpointed are filled from it instead of
+    refetched, and every fetch outcome is appended as it happens. `cached` maps
+    course_id to a previous getSections result to reuse without fetching.
+    Returns (fetched, failed): the new results by course_id (including resumed
+    ones) and the course_ids that failed, whose sections are left untouched.
+    """
+    limiter = TokenBucket(rate, capacity=concurrency)
+    session = make_session(pool_size=concurrency)
+    completed = journal.completed() if journal else set()
+
+    jobs = []
+    fetched = {}
+    resumed = 0
+    seen_curricula = Counter()
+    for course in courses:
+        curriculum_id = course['curriculum_id']
+        # Get this course's title_code (cross-listed courses share a curriculum_id)
+        title_codes = curriculum_to_titlecodes.get(curriculum_id, [])
+        position = seen_curricula[curriculum_id]
+        seen_curricula[curriculum_id] += 1
+        if position >= len(title_codes):
+            print(f"Warning: No title_code found for {course['course_name']}")
+            continue
+        course_id = f"{curriculum_id}-{title_codes[position]}"
+        if course_id in completed:
+            fetched[course_id] = journal.get(course_id)
+            apply_sections(course, fetched[course_id])
+            resumed += 1
+        elif cached and course_id in cached:
+            apply_sections(course, cached[course_id])
+        else:
+            jobs.append((course, course_id))
+
+    if resumed:
+        print(f"Resumed {resumed} courses from checkpoint")
+    print(f"{len(jobs)} courses to fetch")
+
+    stats = Throughput(len(jobs), label='courses')
+    worker = lambda job: fetch_sections(session, job[1], limiter=limiter, retries=retries)
+    failed = []
+
+    for (course, course_id), sections_detail, error in run_pool(jobs, worker, concurrency):
+        stats.tick(ok=error is None)
+        if error:
+            print(f"Error fetching {course['course_name']}: {error}")
+            failed.append(course_id)
+            if journal:
+                journal.record_failure(course_id, str(error))
+            continue
+        if journal:
+            journal.record_success(course_id, sections_detail)
+        fetched[course_id] = sections_detail
+        apply_sections(course, sections_detail)
+        if stats.done % 100 == 0:
+            print(f"Fetched {stats.done}/{stats.total} ({stats.rate:.1f} courses/sec)")
+
+    print(stats.summary())
+    return fetched, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add section meeting times to simplified_courses.json")
+    parser.add_argument('--concurrency', type=int, default=8, help="requests in flight at once")
+    parser.add_argument('--rate', type=float, default=8.0, help="max requests per second to commtech")
+    parser.add_argument('--retries', type=int, default=3, help="retries per course on transient errors")
+    parser.add_argument('--output', default='simplified_courses_with_times_final.json')
+    parser.add_argument('--checkpoint', default='add_times.checkpoint.jsonl',
+                        help="JSONL journal used to resume an interrupted run")
+    parser.add_argument('--fresh', action='store_true', help="ignore any existing checkpoint")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only refetch courses whose getClasses entry changed since the last run")
+    parser.add_argument('--fingerprints', default='course_fingerprints.json',
+                        help="per-course fingerprint store (refreshed every run, read by --incremental)")
+    parser.add_argument('--publish', action='store_true',
+                        help="publish the output as the new courses version (data/courses.json and its derived files)")
+    parser.add_argument('--report', default='course_changes.json',
+                        help="change report written by --incremental")
+    args = parser.parse_args()
+
+    if args.fresh and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    journal = CrawlJournal(args.checkpoint)
+
+    # Read the simplified courses JSON
+    print("Reading simplified_courses.json...")
+    with open('simplified_courses.json', 'r') as f:
+        simplified_courses = json.load(f)
+
+    # Read original data to get title_code
+    print("Reading parsed_classes.json to get title_codes...")
+    original_data = load_parsed('parsed_classes.json')
+    curriculum_to_titlecodes = load_title_codes(original_data=original_data)
+
+    # Every run refreshes the fingerprint store, so the next --incremental run diffs against this one
+    store = FingerprintStore(args.fingerprints)
+    classes_hashes = {course_id: fingerprint(entry) for course_id, entry in original_data.items()}
+    cached = None
+    if args.incremental:
+        cached = {course_id: store.sections(course_id) for course_id, classes_hash in classes_hashes.items()
+                  if store.unchanged(course_id, classes_hash)}
+        print(f"Incremental refresh: {len(cached)} courses unchanged since last run")
+
+    print(f"Processing {len(simplified_courses)} courses "
+          f"({args.concurrency} concurrent, {args.rate} req/sec)")
+    fetched, failed = add_times(simplified_courses, curriculum_to_titlecodes,
+                                concurrency=args.concurrency, rate=args.rate, retries=args.retries,
+                                journal=journal, cached=cached)
+
+    report = build_report(store, fetched, classes_hashes, format_times)
+    store.save()
+    if args.incremental:
+        atomic_write_json(args.report, report, indent=2)
+        print(f"Changes: {report['sections_added']} sections added, "
+              f"{report['sections_removed']} removed, "
+              f"{report['sections_time_shifted']} time-shifted (see {args.report})")
+
+    # Save updated JSON
+    atomic_write_json(args.output, simplified_courses, indent=2)
+
+    print(f"\nCreated {args.output}")
+    if args.publish and failed:
+        print("Not publishing: some courses have no times yet")
+    elif args.publish:
+        publish('courses', args.output)
+    if failed:
+        journal.close()
+        print(f"{len(failed)} courses failed and have no times; re-run to retry them "
+              f"(progress kept in {args.checkpoint})")
+    else:
+        journal.discard()
+    print("\nFirst example with times:")
+    print(json.dumps(simplified_courses[0], indent=2))
+
+
+if __name__ == "__main__":
+    main()
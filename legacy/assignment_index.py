@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Build the index the get_assignments tool uses for date-range queries.
+fetch_class_calendar.py writes it next to every export; run this directly
+to index an existing file such as data/current_assignments.json.
+
+Events in the export are sorted by due_date, so a date range over all
+courses is two binary searches on the events list. Each course gets its
+own list of event positions, also in due_date order, so "due between A
+and B for course C" is two binary searches on that list.
+
+Index layout (positions refer to the order of the export's events):
+  courses   normalised course name -> [event position]   (due_date order)
+  undated   [event position] without a due_date (never in a date range)
+"""
+
+import hashlib
+import json
+import os
+import sys
+from typing import Any, Dict
+
+from publish import atomic_write_json
+
+INDEX_VERSION = 1
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse whitespace (must match normalize() in lib/assignmentIndex.ts)"""
+    return ' '.join((text or '').lower().split())
+
+
+def index_path(export_file: str) -> str:
+    """schedule.json -> schedule_index.json"""
+    root, ext = os.path.splitext(export_file)
+    return f"{root}_index{ext}"
+
+
+def build_index(export: Dict[str, Any], source_sha1: str) -> Dict[str, Any]:
+    events = export['events']
+    dates = [event.get('due_date') or '' for event in events]
+    if dates != sorted(dates):
+        raise ValueError("events must be sorted by due_date")
+
+    courses: Dict[str, list] = {}
+    undated = []
+    for position, event in enumerate(events):
+        courses.setdefault(normalize(event.get('course')), []).append(position)
+        if not event.get('due_date'):
+            undated.append(position)
+
+    return {
+        'version': INDEX_VERSION,
+        'source_sha1': source_sha1,
+        'event_count': len(events),
+        'courses': courses,
+        'undated': undated,
+    }
+
+
+def write_index(export_file: str) -> str:
+    """Index an export file in place; returns the index path"""
+    with open(export_file, 'rb') as f:
+        raw = f.read()
+    index = build_index(json.loads(raw), hashlib.sha1(raw).hexdigest())
+    path = index_path(export_file)
+    atomic_write_json(path, index, separators=(',', ':'), ensure_ascii=False)
+    return path
+
+
+def main(export_file: str = '../data/current_assignments.json'):
+    path = write_index(export_file)
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    print(f"Indexed {index['event_count']} events in {len(index['courses'])} courses -> {path}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
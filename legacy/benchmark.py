@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the ETL stages and the hot tool queries.
+
+Every benchmark runs offline. ETL stages run against fixtures derived
+deterministically from the checked-in snapshots, so numbers are
+comparable between runs:
+  parse_classes      legacy/classes_full.json
+  simplify           legacy/parsed_classes.json
+  time_enrichment    getSections-shaped time blocks rebuilt from data/courses.json
+  process_calendar   an .ics rendered from data/current_assignments.json
+  rmp_parse          search pages rebuilt from data/teacher_ratings.json
+  store_build        data/*.json -> SQLite (store.py)
+Queries run a fixed, seeded mix against the real data/*.json files,
+both through store.py and as the linear scans the routes used to do.
+
+Each benchmark reports latency percentiles over its runs and the peak
+traced memory of one extra run (tracemalloc, so that run is not timed).
+
+Usage:
+  python benchmark.py                          # everything
+  python benchmark.py query --runs 200         # names containing "query"
+  python benchmark.py --json results.json      # save results
+  python benchmark.py --compare results.json   # exit 1 if p50 regressed > --threshold
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from add_times import apply_sections
+from fetch_class_calendar import process_calendar, simplify_events
+from parse_classes import parse_classes
+from scrape_rmp import RateMyProfessorsScraper
+from simplify_classes import simplify_course
+from store import Store, build as build_store
+
+DATA = '../data'
+
+DAY_FIELDS = {'M': 'mon', 'T': 'tue', 'W': 'wed', 'Th': 'thu', 'F': 'fri', 'Sa': 'sat', 'Su': 'sun'}
+
+
+def _load(name: str):
+    with open(os.path.join(DATA, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _raw_clock(text: str) -> str:
+    """'1:00 PM' -> '1300' (inverse of add_times.format_time)"""
+    clock, period = text.split()
+    hour, minute = clock.split(':')
+    hour = int(hour) % 12 + (12 if period == 'PM' else 0)
+    return f"{hour:02d}{minute}"
+
+
+def sections_fixture(courses: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """(course without times, getSections 'sections' payload) pairs"""
+    pairs = []
+    for course in courses:
+        detail = []
+        for section in course['sections']:
+            raw = []
+            for meeting in section.get('times') or []:
+                block = {field: meeting['days'].split().count(day) for day, field in DAY_FIELDS.items()}
+                block.update(begin_time=_raw_clock(meeting['start_time']), end_time=_raw_clock(meeting['end_time']),
+                             building=meeting['building'], room=meeting['room'])
+                raw.append(block)
+            detail.append({'section_number': section['section_number'], 'times': raw})
+        bare = {**course, 'sections': [{k: v for k, v in s.items() if k != 'times'} for s in course['sections']]}
+        pairs.append((bare, detail))
+    return pairs
+
+
+def _ics_text(text: str) -> str:
+    """Escape a TEXT value (RFC 5545 3.3.11)"""
+    for raw, escaped in (('\\', '\\\\'), (';', '\\;'), (',', '\\,'), ('\n', '\\n')):
+        text = text.replace(raw, escaped)
+    return text
+
+
+def ics_fixture(export: Dict[str, Any]) -> str:
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//benchmark//EN']
+    for i, event in enumerate(export['events']):
+        due = (event['due_date'] or '2025-01-01').replace('-', '')
+        lines += ['BEGIN:VEVENT', f'UID:bench-{i}', f"SUMMARY:{_ics_text(event['assignment'])}",
+                  f'DTSTART;VALUE=DATE:{due}', f'DTEND;VALUE=DATE:{due}', 'END:VEVENT']
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def rmp_fixture(teachers: List[Dict[str, Any]], page_size: int = 100) -> List[str]:
+    """Search response pages as the API returns them (search-card profile)"""
+    pages = []
+    for start in range(0, len(teachers), page_size):
+        chunk = teachers[start:start + page_size]
+        edges = [{'node': {**{k: v for k, v in t.items() if k != 'school'},
+                           'school': {'name': t.get('school'), 'id': 'U2Nob29sLTEzNQ=='}}} for t in chunk]
+        pages.append(json.dumps({'data': {'search': {'teachers': {
+            'edges': edges,
+            'pageInfo': {'hasNextPage': start + page_size < len(teachers), 'endCursor': str(start + page_size)},
+            'resultCount': len(teachers)}}}}))
+    return pages
+
+
+def query_mix(courses, teachers, export, n: int = 50, seed: int = 0) -> Dict[str, List[Any]]:
+    rng = random.Random(seed)
+    names = sorted({s['instructor_name'] for c in courses for s in c['sections'] if s.get('instructor_name')})
+    return {
+        'codes': [rng.choice(courses)['course_name'][:-2] for _ in range(n)],
+        'instructors': [rng.choice(names).split()[-1] for _ in range(n)],
+        'teachers': [rng.choice(teachers)['lastName'].strip() for _ in range(n)],
+        'assignment_courses': [rng.choice(export['courses']) for _ in range(n)],
+    }
+
+
+# Linear scans as the routes did them before the indexes
+def scan_courses(courses, course_code=None, instructor=None):
+    result = courses
+    if course_code:
+        q = course_code.lower()
+        result = [c for c in result if q in c['course_name'].lower() or q in (c['full_title'] or '').lower()]
+    if instructor:
+        q = instructor.lower()
+        result = [{**c, 'sections': [s for s in c['sections'] if q in (s.get('instructor_name') or '').lower()]}
+                  for c in result]
+        result = [c for c in result if c['sections']]
+    return result
+
+
+def scan_ratings(teachers, teacher_name):
+    terms = teacher_name.lower().split()
+    return [t for t in teachers if all(term in f"{t['firstName']} {t['lastName']}".lower() for term in terms)]
+
+
+def scan_assignments(export, course):
+    return [e for e in export['events'] if course.lower() in e['course'].lower()]
+
+
+def cycle(items: List[Any]) -> Callable[[], Any]:
+    state = {'i': 0}
+
+    def next_item():
+        item = items[state['i'] % len(items)]
+        state['i'] += 1
+        return item
+    return next_item
+
+
+def define_benchmarks(tmp_dir: str) -> Dict[str, Tuple[Callable[[], Any], int]]:
+    """name -> (function, default runs)"""
+    courses = _load('courses.json')
+    teachers = _load('teacher_ratings.json')
+    export = _load('current_assignments.json')
+    parsed = parse_classes('parsed_classes.json')
+    sections = sections_fixture(courses)
+    ics = ics_fixture(export)
+    pages = rmp_fixture(teachers)
+    mix = query_mix(courses, teachers, export)
+
+    db_path = os.path.join(tmp_dir, 'store.sqlite')
+    build_store(db_path)
+    store = Store(db_path)
+
+    def time_enrichment():
+        for course, detail in sections:
+            apply_sections({**course, 'sections': [dict(s) for s in course['sections']]}, detail)
+
+    def rmp_parse():
+        return [RateMyProfessorsScraper.extract_professor(edge['node'])
+                for page in pages for edge in json.loads(page)['data']['search']['teachers']['edges']]
+
+    code, instructor = cycle(mix['codes']), cycle(mix['instructors'])
+    teacher, assignment_course = cycle(mix['teachers']), cycle(mix['assignment_courses'])
+    return {
+        'etl.parse_classes': (lambda: parse_classes('classes_full.json'), 5),
+        'etl.simplify': (lambda: [simplify_course(c) for c in parsed.values()], 10),
+        'etl.time_enrichment': (time_enrichment, 10),
+        'etl.process_calendar': (lambda: simplify_events(process_calendar('BENCH 101', ics)), 10),
+        'etl.rmp_parse': (rmp_parse, 10),
+        'etl.store_build': (lambda: build_store(os.path.join(tmp_dir, 'rebuild.sqlite')), 3),
+        'query.search_courses.code.store': (lambda: store.search_courses(course_code=code()), 200),
+        'query.search_courses.code.scan': (lambda: scan_courses(courses, course_code=code()), 50),
+        'query.search_courses.instructor.store': (lambda: store.search_courses(instructor=instructor()), 200),
+        'query.search_courses.instructor.scan': (lambda: scan_courses(courses, instructor=instructor()), 50),
+        'query.get_teacher_ratings.store': (lambda: store.get_teacher_ratings(teacher()), 200),
+        'query.get_teacher_ratings.scan': (lambda: scan_ratings(teachers, teacher()), 50),
+        'query.get_assignments.course.store': (lambda: store.get_assignments(course=assignment_course()), 200),
+        'query.get_assignments.course.scan': (lambda: scan_assignments(export, assignment_course()), 200),
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(fn: Callable[[], Any], runs: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    gc.collect()
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'runs': runs,
+        'mean_ms': statistics.fmean(latencies),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': latencies[-1],
+        'peak_kb': peak / 1024,
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before and before['p50_ms'] > 0 and result['p50_ms'] / before['p50_ms'] > threshold:
+            regressions.append(f"{name}: p50 {before['p50_ms']:.3f} -> {result['p50_ms']:.3f} ms "
+                               f"({result['p50_ms'] / before['p50_ms']:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ETL stages and tool queries")
+    parser.add_argument('filter', nargs='?', default='', help="only benchmarks whose name contains this")
+    parser.add_argument('--runs', type=int, help="override the runs per benchmark")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--compare', help="baseline results file from an earlier --json run")
+    parser.add_argument('--threshold', type=float, default=1.25, help="p50 ratio that counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        benchmarks = define_benchmarks(tmp_dir)
+        results = {}
+        print(f"{'benchmark':42} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10} {'peak KB':>10}")
+        for name, (fn, runs) in benchmarks.items():
+            if args.filter not in name:
+                continue
+            r = measure(fn, args.runs or runs)
+            results[name] = r
+            print(f"{name:42} {r['runs']:>5} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['p99_ms']:>10.3f} "
+                  f"{r['max_ms']:>10.3f} {r['peak_kb']:>10.0f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold}x:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold}x against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Build the prebuilt search index used by the search_courses tool.
+Run after add_times.py once the final courses file is in data/courses.json.
+The routes load courses.json and this index once and answer queries with
+hash lookups instead of a substring scan over every course and section.
+
+Index layout (positions refer to the order of courses.json):
+  code_prefix        normalised course code prefix -> [course]   (e.g. "math 3")
+  title_prefix       title token prefix (>= 3 chars) -> [course]
+  instructor_names   [normalised instructor name]
+  instructor_sections  per instructor name: [[course, section], ...]
+  instructor_prefix  name or name-token prefix -> [instructor name id]
+"""
+
+import hashlib
+import json
+import re
+import sys
+from typing import Dict, List
+
+from publish import atomic_write_json
+
+INDEX_VERSION = 1
+TITLE_MIN_PREFIX = 3
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse whitespace (must match normalize() in lib/searchIndex.ts)"""
+    return ' '.join((text or '').lower().split())
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall((text or '').lower())
+
+
+def _add_prefixes(table: Dict[str, List[int]], text: str, item: int, min_len: int = 1):
+    for end in range(min_len, len(text) + 1):
+        postings = table.setdefault(text[:end], [])
+        # Items are added in increasing order, so only the last entry can repeat
+        if not postings or postings[-1] != item:
+            postings.append(item)
+
+
+def build_index(courses: List[Dict], source_sha1: str) -> Dict:
+    code_prefix: Dict[str, List[int]] = {}
+    title_prefix: Dict[str, List[int]] = {}
+    instructor_ids: Dict[str, int] = {}
+    instructor_sections: List[List[List[int]]] = []
+
+    for course_idx, course in enumerate(courses):
+        code = normalize(course['course_name'])
+        _add_prefixes(code_prefix, code, course_idx)
+        # Also index the catalog number on its own ("320" finds MATH 320)
+        catalog = code.rsplit(' ', 1)[-1]
+        if catalog != code:
+            _add_prefixes(code_prefix, catalog, course_idx)
+
+        for token in tokenize(course['full_title']):
+            _add_prefixes(title_prefix, token, course_idx, TITLE_MIN_PREFIX)
+
+        for section_idx, section in enumerate(course['sections']):
+            name = normalize(section.get('instructor_name'))
+            if not name:
+                continue
+            if name not in instructor_ids:
+                instructor_ids[name] = len(instructor_sections)
+                instructor_sections.append([])
+            instructor_sections[instructor_ids[name]].append([course_idx, section_idx])
+
+    instructor_prefix: Dict[str, List[int]] = {}
+    for name, name_id in instructor_ids.items():
+        _add_prefixes(instructor_prefix, name, name_id)
+        for token in name.split(' ')[1:]:
+            _add_prefixes(instructor_prefix, token, name_id)
+
+    return {
+        'version': INDEX_VERSION,
+        'source_sha1': source_sha1,
+        'course_count': len(courses),
+        'code_prefix': code_prefix,
+        'title_prefix': title_prefix,
+        'instructor_names': list(instructor_ids),
+        'instructor_sections': instructor_sections,
+        'instructor_prefix': instructor_prefix
+    }
+
+
+def main(courses_file: str = '../data/courses.json', index_file: str = '../data/courses_index.json'):
+    with open(courses_file, 'rb') as f:
+        raw = f.read()
+    courses = json.loads(raw)
+
+    index = build_index(courses, hashlib.sha1(raw).hexdigest())
+    atomic_write_json(index_file, index, separators=(',', ':'), ensure_ascii=False)
+
+    print(f"Indexed {len(courses)} courses, {len(index['instructor_names'])} instructors")
+    print(f"  {len(index['code_prefix'])} code prefixes, {len(index['title_prefix'])} title prefixes, "
+          f"{len(index['instructor_prefix'])} instructor prefixes")
+    print(f"Saved to {index_file}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
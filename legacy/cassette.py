@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Record/replay HTTP layer for offline, reproducible runs.
+
+make_session() in http_pool.py mounts a CassetteAdapter when HTTP_CASSETTE
+is set, so every script that fetches through it (add_times.py, scrape_rmp.py,
+get_reviews.py, fetch_class_calendar.py, pipeline.py) can be switched
+without code changes:
+
+  HTTP_CASSETTE=record python add_times.py       # hit the network, save every response
+  HTTP_CASSETTE=replay python add_times.py       # serve saved responses, no network
+  HTTP_CASSETTE=replay HTTP_CASSETTE_LATENCY=40:120 python add_times.py
+
+  HTTP_CASSETTE_DIR      cassette directory (default: cassettes)
+  HTTP_CASSETTE_LATENCY  synthetic replay latency in ms, fixed ("50") or a
+                         uniform range ("40:120"). Each request's delay is
+                         derived from its key, so runs are repeatable.
+
+Each interaction is one gzipped JSON file named by the sha1 of method, URL
+and body, so recording is safe from many threads and interrupted runs keep
+what they saved. Request headers are not part of the key; conditional GETs
+are answered in replay with a 304 when If-None-Match / If-Modified-Since
+match the recorded response. A replay miss raises CassetteMiss, which is not
+retried by request_with_retry.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+MODES = ('record', 'replay')
+
+# Describe the decoded body we store, not the bytes on the wire
+DROP_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection'}
+
+
+class CassetteMiss(requests.RequestException):
+    """Replay mode found no recorded response for a request"""
+
+
+def canonical_url(url: str) -> str:
+    """Sort query parameters so equivalent URLs share a key"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+
+
+def request_key(method: str, url: str, body: Any) -> str:
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    digest = hashlib.sha1()
+    for part in (method.upper().encode(), canonical_url(url).encode(), body or b''):
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def parse_latency(spec: Optional[str]) -> Tuple[float, float]:
+    """'50' -> (0.05, 0.05); '40:120' -> (0.04, 0.12), in seconds"""
+    if not spec:
+        return 0.0, 0.0
+    low, _, high = spec.partition(':')
+    low_s = float(low) / 1000
+    return low_s, (float(high) / 1000 if high else low_s)
+
+
+class CassetteAdapter(HTTPAdapter):
+    """HTTPAdapter that records responses to, or replays them from, a cassette directory."""
+
+    def __init__(self, directory: str, mode: str, latency: Tuple[float, float] = (0.0, 0.0), **kwargs):
+        if mode not in MODES:
+            raise ValueError(f"cassette mode must be one of {MODES}, not {mode!r}")
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.mode = mode
+        self.latency = latency
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.json.gz')
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with gzip.open(self._path(key), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, EOFError, OSError, json.JSONDecodeError):
+            return None
+
+    def save(self, key: str, request: requests.PreparedRequest, response: requests.Response):
+        interaction = {
+            'request': {'method': request.method, 'url': request.url},
+            'response': {
+                'status': response.status_code,
+                'reason': response.reason,
+                'headers': {k: v for k, v in response.headers.items() if k.lower() not in DROP_HEADERS},
+                'body': base64.b64encode(response.content).decode('ascii'),
+            },
+            'recorded_at': time.time(),
+        }
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{id(response)}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(interaction, f)
+        os.replace(tmp_path, path)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        key = request_key(request.method, request.url, request.body)
+        if self.mode == 'record':
+            response = super().send(request, **kwargs)
+            # A 304 has no body worth keeping; the full response recorded earlier stays
+            if response.status_code != 304:
+                self.save(key, request, response)
+            return response
+
+        interaction = self.load(key)
+        if interaction is None:
+            raise CassetteMiss(f"no recorded response for {request.method} {request.url}", request=request)
+        low, high = self.latency
+        if high > 0:
+            time.sleep(random.Random(key).uniform(low, high))
+        return self.build_response_from(request, interaction['response'])
+
+    def build_response_from(self, request: requests.PreparedRequest, recorded: Dict[str, Any]) -> requests.Response:
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.headers = CaseInsensitiveDict(recorded['headers'])
+        response.status_code = recorded['status']
+        response.reason = recorded['reason']
+        response._content = base64.b64decode(recorded['body'])
+        if response.status_code == 200 and _not_modified(request, response.headers):
+            response.status_code, response.reason, response._content = 304, 'Not Modified', b''
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+
+def _not_modified(request: requests.PreparedRequest, headers: CaseInsensitiveDict) -> bool:
+    etag = request.headers.get('If-None-Match')
+    if etag:
+        return etag == headers.get('ETag')
+    since = request.headers.get('If-Modified-Since')
+    return bool(since) and since == headers.get('Last-Modified')
+
+
+def adapter_from_env(pool_size: int) -> Optional[CassetteAdapter]:
+    """A CassetteAdapter configured from HTTP_CASSETTE*, or None when unset"""
+    mode = os.environ.get('HTTP_CASSETTE')
+    if not mode:
+        return None
+    return CassetteAdapter(os.environ.get('HTTP_CASSETTE_DIR', 'cassettes'), mode,
+                           latency=parse_latency(os.environ.get('HTTP_CASSETTE_LATENCY')),
+                           pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
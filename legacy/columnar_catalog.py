@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Compact columnar export of courses.json, loadable with mmap.
+
+Strings (depts, titles, instructors, buildings, ...) are interned into
+per-kind tables and every course/section/meeting field becomes a packed
+integer column: meeting times are minutes since midnight and days are a
+bitmask (see meeting_times.py). Reading a column is a zero-copy
+memoryview over the mapped file.
+
+File layout: b'CCOLv001', uint32 header length, JSON header, then each
+column 8-byte aligned. The header maps column name -> [offset, typecode, length]
+and records the sha1 of the courses.json it was built from (source_sha1), so
+readers can tell a stale catalog from a current one without parsing the JSON.
+
+Usage:
+  python columnar_catalog.py build [courses.json] [courses.cols]
+  python columnar_catalog.py bench [courses.json] [courses.cols]
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import subprocess
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+from meeting_times import format_clock, mask_to_days, meeting_minutes, normalize_meeting
+
+MAGIC = b'CCOLv001'
+
+STRING_KINDS = ['course_name', 'dept', 'full_title', 'curriculum_id', 'credit_hours',
+                'section_number', 'instructor', 'mode', 'building', 'room']
+
+# Column name -> array typecode. Offsets columns have one extra trailing entry.
+COLUMNS = {
+    'course.name': 'I', 'course.dept': 'I', 'course.title': 'I', 'course.curriculum': 'I',
+    'course.credits': 'i', 'course.sections': 'I',
+    'section.number': 'I', 'section.instructor': 'i', 'section.mode': 'i',
+    'section.times_state': 'B', 'section.meetings': 'I',
+    'meeting.days': 'B', 'meeting.start': 'h', 'meeting.end': 'h',
+    'meeting.building': 'i', 'meeting.room': 'i',
+}
+
+# section.times_state values
+TIMES_MISSING, TIMES_NONE, TIMES_LIST = 0, 1, 2
+
+
+class CatalogWriter:
+    """Accumulates courses into packed columns; add() courses one at a time, then write()"""
+
+    def __init__(self):
+        self.strings: Dict[str, Dict[str, int]] = {kind: {} for kind in STRING_KINDS}
+        self.columns: Dict[str, array] = {name: array(code) for name, code in COLUMNS.items()}
+        self.columns['course.sections'].append(0)
+        self.columns['section.meetings'].append(0)
+
+    def intern(self, kind: str, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        table = self.strings[kind]
+        if value not in table:
+            table[value] = len(table)
+        return table[value]
+
+    def add(self, course: Dict[str, Any]):
+        cols = self.columns
+        cols['course.name'].append(self.intern('course_name', course['course_name']))
+        cols['course.dept'].append(self.intern('dept', course['course_name'].rsplit(' ', 1)[0]))
+        cols['course.title'].append(self.intern('full_title', course['full_title']))
+        cols['course.curriculum'].append(self.intern('curriculum_id', course['curriculum_id']))
+        cols['course.credits'].append(self.intern('credit_hours', course.get('credit_hours')))
+
+        for section in course['sections']:
+            cols['section.number'].append(self.intern('section_number', section['section_number']))
+            cols['section.instructor'].append(self.intern('instructor', section.get('instructor_name')))
+            cols['section.mode'].append(self.intern('mode', section.get('mode')))
+            if 'times' not in section:
+                cols['section.times_state'].append(TIMES_MISSING)
+            elif section['times'] is None:
+                cols['section.times_state'].append(TIMES_NONE)
+            else:
+                cols['section.times_state'].append(TIMES_LIST)
+            for meeting in section.get('times') or []:
+                start, end, day_mask = meeting_minutes(meeting)
+                if start is None or end is None:
+                    raise ValueError(f"Unparseable meeting time in {course['course_name']}: {meeting}")
+                cols['meeting.days'].append(day_mask)
+                cols['meeting.start'].append(start)
+                cols['meeting.end'].append(end)
+                cols['meeting.building'].append(self.intern('building', meeting.get('building')))
+                cols['meeting.room'].append(self.intern('room', meeting.get('room')))
+            cols['section.meetings'].append(len(cols['meeting.days']))
+
+        cols['course.sections'].append(len(cols['section.number']))
+
+    def _string_columns(self) -> Dict[str, array]:
+        out = {}
+        for kind, table in self.strings.items():
+            offsets = array('I', [0])
+            data = bytearray()
+            for value in table:
+                data += value.encode('utf-8')
+                offsets.append(len(data))
+            out[f'{kind}.offsets'] = offsets
+            out[f'{kind}.data'] = array('B', bytes(data))
+        return out
+
+    def write(self, path: str, source_sha1: Optional[str] = None):
+        """Write atomically (temp file + rename) so mmap readers never see a partial file"""
+        columns = dict(self.columns)
+        columns.update(self._string_columns())
+
+        # Offsets in the header are relative to the end of the header block
+        layout = {}
+        position = 0
+        for name, values in columns.items():
+            layout[name] = [position, values.typecode, len(values)]
+            position += -(-len(values) * values.itemsize // 8) * 8
+        header = json.dumps({'byteorder': sys.byteorder, 'source_sha1': source_sha1,
+                             'columns': layout}).encode('utf-8')
+        header += b' ' * (-(len(MAGIC) + 4 + len(header)) % 8)
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(header)) + header)
+            for values in columns.values():
+                raw = values.tobytes()
+                f.write(raw + b'\0' * (-len(raw) % 8))
+        os.replace(tmp_path, path)
+
+
+class ColumnarCatalog:
+    """Read-only mmap view of a .cols file; columns are memoryviews into the mapping"""
+
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a columnar catalog")
+        (header_len,) = struct.unpack_from('<I', self.mm, len(MAGIC))
+        base = len(MAGIC) + 4
+        header = json.loads(self.mm[base:base + header_len])
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f"{path} was written on a {header['byteorder']}-endian machine")
+        self.source_sha1: Optional[str] = header.get('source_sha1')
+
+        view = memoryview(self.mm)
+        data_start = base + header_len
+        self.columns: Dict[str, memoryview] = {}
+        for name, (offset, typecode, length) in header['columns'].items():
+            start = data_start + offset
+            size = array(typecode).itemsize
+            self.columns[name] = view[start:start + length * size].cast(typecode)
+        self._view = view
+
+    def __len__(self) -> int:
+        return len(self.columns['course.name'])
+
+    def __getitem__(self, name: str) -> memoryview:
+        return self.columns[name]
+
+    def string(self, kind: str, index: int) -> Optional[str]:
+        if index < 0:
+            return None
+        offsets = self.columns[f'{kind}.offsets']
+        return bytes(self.columns[f'{kind}.data'][offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+    def strings(self, kind: str) -> List[str]:
+        return [self.string(kind, i) for i in range(len(self.columns[f'{kind}.offsets']) - 1)]
+
+    def course(self, i: int) -> Dict[str, Any]:
+        """Rebuild course i exactly as it appears in courses.json"""
+        c = self.columns
+        sections = []
+        for s in range(c['course.sections'][i], c['course.sections'][i + 1]):
+            section = {
+                'section_number': self.string('section_number', c['section.number'][s]),
+                'instructor_name': self.string('instructor', c['section.instructor'][s]),
+                'mode': self.string('mode', c['section.mode'][s]),
+            }
+            state = c['section.times_state'][s]
+            if state == TIMES_NONE:
+                section['times'] = None
+            elif state == TIMES_LIST:
+                section['times'] = [normalize_meeting({
+                    'days': mask_to_days(c['meeting.days'][m]),
+                    'start_time': format_clock(c['meeting.start'][m]),
+                    'end_time': format_clock(c['meeting.end'][m]),
+                    'building': self.string('building', c['meeting.building'][m]),
+                    'room': self.string('room', c['meeting.room'][m]),
+                }) for m in range(c['section.meetings'][s], c['section.meetings'][s + 1])]
+            sections.append(section)
+        return {
+            'course_name': self.string('course_name', c['course.name'][i]),
+            'full_title': self.string('full_title', c['course.title'][i]),
+            'curriculum_id': self.string('curriculum_id', c['course.curriculum'][i]),
+            'credit_hours': self.string('credit_hours', c['course.credits'][i]),
+            'sections': sections,
+        }
+
+    def close(self):
+        for column in self.columns.values():
+            column.release()
+        self._view.release()
+        self.mm.close()
+        self.file.close()
+
+
+def build(courses: Iterable[Dict[str, Any]], path: str, source_sha1: Optional[str] = None) -> CatalogWriter:
+    writer = CatalogWriter()
+    for course in courses:
+        writer.add(course)
+    writer.write(path, source_sha1)
+    return writer
+
+
+def build_file(json_path: str, cols_path: str) -> CatalogWriter:
+    """Build cols_path from the courses.json at json_path, stamped with its sha1"""
+    with open(json_path, 'rb') as f:
+        raw = f.read()
+    return build(json.loads(raw), cols_path, hashlib.sha1(raw).hexdigest())
+
+
+# Each benchmark runs in a fresh interpreter so its peak RSS is its own
+_BENCH_BASELINE = """
+import resource
+print(0, 0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+_BENCH_JSON = """
+import json, time, resource
+t = time.perf_counter()
+with open(PATH) as f:
+    courses = json.load(f)
+load = time.perf_counter() - t
+t = time.perf_counter()
+late = sum(1 for c in courses for s in c['sections'] for m in (s.get('times') or [])
+           if m['start_min'] >= 15 * 60)
+scan = time.perf_counter() - t
+print(load, scan, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+_BENCH_COLS = """
+import time, resource
+from columnar_catalog import ColumnarCatalog
+t = time.perf_counter()
+catalog = ColumnarCatalog(PATH)
+load = time.perf_counter() - t
+t = time.perf_counter()
+late = sum(1 for start in catalog['meeting.start'] if start >= 15 * 60)
+scan = time.perf_counter() - t
+print(load, scan, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def bench(json_path: str, cols_path: str, runs: int = 5):
+    here = os.path.dirname(os.path.abspath(__file__))
+    baseline = _run_bench(_BENCH_BASELINE, '', here)
+    print(f"{'format':<8} {'size':>10} {'load ms':>9} {'scan ms':>9} {'RSS +KiB':>9}")
+    for label, code, path in (('json', _BENCH_JSON, json_path), ('columnar', _BENCH_COLS, cols_path)):
+        results = [_run_bench(code, path, here) for _ in range(runs)]
+        load = min(r[0] for r in results) * 1000
+        scan = min(r[1] for r in results) * 1000
+        rss = min(r[2] for r in results) - baseline[2]
+        print(f"{label:<8} {os.path.getsize(path):>10} {load:>9.2f} {scan:>9.2f} {rss:>9.0f}")
+
+
+def _run_bench(code: str, path: str, cwd: str):
+    script = f"PATH = {path!r}\n{code}"
+    out = subprocess.run([sys.executable, '-c', script], cwd=cwd, capture_output=True, text=True, check=True)
+    return [float(x) for x in out.stdout.split()]
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+    json_path = os.path.abspath(sys.argv[2] if len(sys.argv) > 2 else '../data/courses.json')
+    cols_path = os.path.abspath(sys.argv[3] if len(sys.argv) > 3 else os.path.splitext(json_path)[0] + '.cols')
+
+    if command == 'build':
+        writer = build_file(json_path, cols_path)
+        print(f"Wrote {len(writer.columns['course.name'])} courses, {len(writer.columns['section.number'])} sections, "
+              f"{len(writer.columns['meeting.days'])} meetings to {cols_path} "
+              f"({os.path.getsize(cols_path)} bytes vs {os.path.getsize(json_path)} JSON)")
+    elif command == 'bench':
+        bench(json_path, cols_path)
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
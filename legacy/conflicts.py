@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Vectorized schedule-conflict engine over section meeting times.
+
+Every meeting block in the catalog is parsed once into NumPy arrays
+(day bitmask, start/end minutes, owning section). Two blocks conflict when
+they share a day and their [start, end) intervals overlap, so one-vs-all
+queries ("which sections of MATH 320 fit around my schedule") are a
+single broadcast over the arrays instead of a Python loop over strings.
+
+Some course names are shared by several courses (topics courses such as
+BIO 559R); pass the full title to pick one, e.g.
+--busy "BIO 559R:001:Advanced Ecology." or --title.
+
+Usage:
+  python conflicts.py "MATH 320" --busy "CS 452:001" --busy "A HTG 100:020"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from meeting_times import meeting_minutes
+
+
+class MeetingTable:
+    def __init__(self, courses: Sequence[Dict[str, Any]], section_keys: List[Tuple[str, str, str]],
+                 section_course: np.ndarray, section_index: np.ndarray, meeting_section: np.ndarray,
+                 days: np.ndarray, start: np.ndarray, end: np.ndarray):
+        self.courses = courses
+        self.section_course = section_course    # section id -> course position
+        self.section_index = section_index      # section id -> position within course['sections']
+        self.meeting_section = meeting_section  # meeting -> section id
+        self.days = days
+        self.start = start
+        self.end = end
+        self.n_sections = len(section_course)
+        # Sections are numbered in catalog order, so each section's meetings are contiguous
+        counts = np.bincount(meeting_section, minlength=self.n_sections)
+        self.meeting_offsets = np.concatenate(([0], np.cumsum(counts)))
+        # section_keys[sid] = (course_name, full_title, section_number); a course_name can
+        # belong to several courses, so lookups keep every match and refuse to guess
+        self.section_title = [title for _, title, _ in section_keys]
+        self._keys: Dict[Tuple[str, str], List[int]] = {}
+        self._by_course: Dict[str, Dict[str, List[int]]] = {}
+        for sid, (course_name, title, number) in enumerate(section_keys):
+            self._keys.setdefault((course_name, number), []).append(sid)
+            self._by_course.setdefault(course_name, {}).setdefault(title, []).append(sid)
+
+    @classmethod
+    def from_courses(cls, courses: List[Dict[str, Any]]) -> 'MeetingTable':
+        """Parse the display strings in courses.json once"""
+        section_keys, section_course, section_index = [], [], []
+        meeting_section, days, start, end = [], [], [], []
+        for course_pos, course in enumerate(courses):
+            for section_pos, section in enumerate(course['sections']):
+                sid = len(section_course)
+                section_keys.append((course['course_name'], course['full_title'], section['section_number']))
+                section_course.append(course_pos)
+                section_index.append(section_pos)
+                for meeting in section.get('times') or []:
+                    begin, finish, day_mask = meeting_minutes(meeting)
+                    if begin is None or finish is None:
+                        continue
+                    meeting_section.append(sid)
+                    days.append(day_mask)
+                    start.append(begin)
+                    end.append(finish)
+        return cls(courses, section_keys,
+                   np.array(section_course, dtype=np.int32), np.array(section_index, dtype=np.int32),
+                   np.array(meeting_section, dtype=np.int32), np.array(days, dtype=np.uint8),
+                   np.array(start, dtype=np.int16), np.array(end, dtype=np.int16))
+
+    @classmethod
+    def from_catalog(cls, catalog, courses: Optional[List[Dict[str, Any]]] = None) -> 'MeetingTable':
+        """Build from a ColumnarCatalog; the time columns are used without copying and,
+        without `courses`, course dicts are only rebuilt when describe() needs them"""
+        section_offsets = np.frombuffer(catalog['course.sections'], dtype=np.uint32).astype(np.int64)
+        meeting_offsets = np.frombuffer(catalog['section.meetings'], dtype=np.uint32).astype(np.int64)
+        n_courses = len(section_offsets) - 1
+        n_sections = len(meeting_offsets) - 1
+        section_course = np.repeat(np.arange(n_courses, dtype=np.int32), np.diff(section_offsets))
+        section_index = (np.arange(n_sections) - section_offsets[section_course]).astype(np.int32)
+        meeting_section = np.repeat(np.arange(n_sections, dtype=np.int32), np.diff(meeting_offsets))
+        names, titles, numbers = (catalog.strings(kind) for kind in ('course_name', 'full_title', 'section_number'))
+        course_name, course_title = catalog['course.name'], catalog['course.title']
+        section_number = catalog['section.number']
+        section_keys = [(names[course_name[c]], titles[course_title[c]] if course_title[c] >= 0 else None,
+                         numbers[section_number[sid]]) for sid, c in enumerate(section_course.tolist())]
+        if courses is None:
+            courses = _CatalogCourses(catalog)
+        return cls(courses, section_keys, section_course, section_index, meeting_section,
+                   np.frombuffer(catalog['meeting.days'], dtype=np.uint8),
+                   np.frombuffer(catalog['meeting.start'], dtype=np.int16),
+                   np.frombuffer(catalog['meeting.end'], dtype=np.int16))
+
+    def section_id(self, course_name: str, section_number: str, full_title: Optional[str] = None) -> int:
+        """KeyError if no section matches, ValueError if several courses share the name and no title picks one"""
+        sids = [sid for sid in self._keys.get((course_name, section_number), [])
+                if full_title is None or self.section_title[sid] == full_title]
+        if not sids:
+            raise KeyError(f"no section {course_name}:{section_number}" + (f" titled {full_title!r}" if full_title else ''))
+        if len(sids) > 1:
+            raise ValueError(f"{course_name}:{section_number} is ambiguous; pass one of the titles "
+                             f"{[self.section_title[sid] for sid in sids]}")
+        return sids[0]
+
+    def sections_of(self, course_name: str, full_title: Optional[str] = None) -> List[int]:
+        """Section ids of a course; ValueError if several courses share the name and no title picks one"""
+        by_title = self._by_course.get(course_name, {})
+        if full_title is not None:
+            return by_title.get(full_title, [])
+        if len(by_title) > 1:
+            raise ValueError(f"{course_name} names {len(by_title)} courses; pass one of the titles {list(by_title)}")
+        return next(iter(by_title.values()), [])
+
+    def blocks(self, section_ids: Iterable[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Meeting blocks (days, start, end) of the given sections"""
+        picks = [np.arange(self.meeting_offsets[sid], self.meeting_offsets[sid + 1]) for sid in section_ids]
+        rows = np.concatenate(picks) if picks else np.zeros(0, dtype=np.int64)
+        return self.days[rows], self.start[rows], self.end[rows]
+
+    def conflict_mask(self, days: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """One-vs-all: bool per section, True if any of its meetings overlaps any busy block"""
+        if len(days) == 0:
+            return np.zeros(self.n_sections, dtype=bool)
+        overlap = ((self.days[:, None] & days[None, :]) != 0) \
+            & (self.start[:, None] < end[None, :]) \
+            & (start[None, :] < self.end[:, None])
+        hit = overlap.any(axis=1)
+        return np.bincount(self.meeting_section[hit], minlength=self.n_sections) > 0
+
+    def conflicts(self, a: int, b: int) -> bool:
+        """Pairwise: do sections a and b meet at the same time?"""
+        a_days, a_start, a_end = self.blocks([a])
+        b_days, b_start, b_end = self.blocks([b])
+        overlap = ((a_days[:, None] & b_days[None, :]) != 0) \
+            & (a_start[:, None] < b_end[None, :]) \
+            & (b_start[None, :] < a_end[:, None])
+        return bool(overlap.any())
+
+    def conflict_matrix(self, section_ids: List[int]) -> np.ndarray:
+        """Pairwise conflicts among the given sections as a symmetric bool matrix"""
+        ids = np.asarray(section_ids, dtype=np.int64)
+        counts = self.meeting_offsets[ids + 1] - self.meeting_offsets[ids]
+        owner = np.repeat(np.arange(len(ids)), counts)
+        days, start, end = self.blocks(ids)
+        overlap = ((days[:, None] & days[None, :]) != 0) \
+            & (start[:, None] < end[None, :]) \
+            & (start[None, :] < end[:, None])
+        matrix = np.zeros((len(ids), len(ids)), dtype=bool)
+        i, j = np.nonzero(overlap)
+        matrix[owner[i], owner[j]] = True
+        np.fill_diagonal(matrix, False)
+        return matrix
+
+    def fits(self, busy_sections: Iterable[int], candidates: Optional[Iterable[int]] = None) -> List[int]:
+        """Section ids (of `candidates`, default all) that fit around the busy sections"""
+        busy_sections = list(busy_sections)
+        mask = self.conflict_mask(*self.blocks(busy_sections))
+        mask[busy_sections] = True
+        if candidates is None:
+            return np.nonzero(~mask)[0].tolist()
+        return [sid for sid in candidates if not mask[sid]]
+
+    def describe(self, sid: int) -> Dict[str, Any]:
+        course = self.courses[self.section_course[sid]]
+        section = course['sections'][self.section_index[sid]]
+        return {'course_name': course['course_name'], **section}
+
+
+class _CatalogCourses:
+    """courses.json-shaped list view over a ColumnarCatalog, rebuilding courses on access"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.cache: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        if i not in self.cache:
+            self.cache[i] = self.catalog.course(int(i))
+        return self.cache[i]
+
+
+def load_table(data_dir: str = '../data') -> MeetingTable:
+    """Prefer the mmap columnar catalog when it was built from the current courses.json
+    (same source_sha1); otherwise parse courses.json"""
+    with open(os.path.join(data_dir, 'courses.json'), 'rb') as f:
+        raw = f.read()
+    cols_path = os.path.join(data_dir, 'courses.cols')
+    if os.path.exists(cols_path):
+        from columnar_catalog import ColumnarCatalog
+        catalog = ColumnarCatalog(cols_path)
+        if catalog.source_sha1 == hashlib.sha1(raw).hexdigest():
+            return MeetingTable.from_catalog(catalog)
+        catalog.close()
+        print(f"{cols_path} is stale (built from a different courses.json); parsing courses.json instead")
+    return MeetingTable.from_courses(json.loads(raw))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List sections of a course that fit around a schedule")
+    parser.add_argument('course', help="course name, e.g. 'MATH 320', or 'all' for the whole catalog")
+    parser.add_argument('--busy', action='append', default=[],
+                        help="COURSE:SECTION[:TITLE] already taken, e.g. 'CS 452:001'")
+    parser.add_argument('--title', help="full title of the course, when several courses share its name")
+    parser.add_argument('--data', default='../data')
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    table = load_table(args.data)
+    load_ms = (time.perf_counter() - t) * 1000
+
+    try:
+        busy = []
+        for item in args.busy:
+            name, number, *title = item.split(':', 2)
+            busy.append(table.section_id(name, number, title[0] if title else None))
+        t = time.perf_counter()
+        candidates = None if args.course == 'all' else table.sections_of(args.course, args.title)
+    except (KeyError, ValueError) as e:
+        parser.error(str(e.args[0]))
+    fitting = table.fits(busy, candidates)
+    query_ms = (time.perf_counter() - t) * 1000
+
+    for sid in fitting[:50]:
+        print(json.dumps(table.describe(sid)))
+    print(f"{len(fitting)} sections fit (loaded {table.n_sections} sections, "
+          f"{len(table.days)} meetings in {load_ms:.1f} ms; query {query_ms:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Append-only JSONL checkpoint journal for long-running crawls.
+Each line records the outcome for one key; on reload the last line per key wins,
+so a restarted run can skip completed keys and retry only the failed ones.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Set
+
+
+class CrawlJournal:
+    def __init__(self, path: str):
+        self.path = path
+        self.records: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            self._load()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def _load(self):
+        """Replay the journal, dropping a torn last line from a crash so new records start on a fresh line"""
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        complete = data.rfind(b'\n') + 1
+        for line in data[:complete].splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self.records[record['key']] = record
+        if complete < len(data):
+            with open(self.path, 'r+b') as f:
+                f.truncate(complete)
+
+    def _append(self, record: Dict[str, Any]):
+        record['at'] = datetime.now().isoformat()
+        self.records[record['key']] = record
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def completed(self) -> Set[str]:
+        return {key for key, record in self.records.items() if record['status'] == 'ok'}
+
+    def failed(self) -> Set[str]:
+        return {key for key, record in self.records.items() if record['status'] == 'failed'}
+
+    def get(self, key: str) -> Any:
+        """Return the saved payload for a completed key"""
+        return self.records[key].get('data')
+
+    def record_success(self, key: str, data: Any):
+        self._append({'key': key, 'status': 'ok', 'data': data})
+
+    def record_failure(self, key: str, error: str):
+        self._append({'key': key, 'status': 'failed', 'error': error})
+
+    def close(self):
+        self.file.close()
+
+    def discard(self):
+        """Close and delete the journal once its results have been merged"""
+        self.close()
+        os.remove(self.path)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Incremental term refresh support for the course pipeline.
+Keeps a per-course fingerprint of each getClasses.php entry together with the
+last getSections.php result, so add_times.py only refetches courses whose
+entry changed, and reports which sections were added, removed or time-shifted.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+def fingerprint(obj: Any) -> str:
+    """Stable content hash of a JSON-serialisable object"""
+    canonical = json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+class FingerprintStore:
+    """course_id -> {classes: hash of getClasses entry, sections_hash, sections}"""
+
+    def __init__(self, path: str = 'course_fingerprints.json'):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def unchanged(self, course_id: str, classes_hash: str) -> bool:
+        entry = self.entries.get(course_id)
+        return entry is not None and entry['classes'] == classes_hash
+
+    def sections(self, course_id: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self.entries.get(course_id)
+        return entry['sections'] if entry else None
+
+    def update(self, course_id: str, classes_hash: str, sections: List[Dict[str, Any]]):
+        self.entries[course_id] = {
+            'classes': classes_hash,
+            'sections_hash': fingerprint(sections),
+            'sections': sections
+        }
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def diff_sections(old: Optional[List[Dict[str, Any]]], new: List[Dict[str, Any]],
+                  format_times: Callable[[Any], Any]) -> Dict[str, Any]:
+    """Compare two getSections results by section_number and formatted times"""
+    old_times = {s['section_number']: format_times(s.get('times')) for s in old or []}
+    new_times = {s['section_number']: format_times(s.get('times')) for s in new}
+
+    return {
+        'added': sorted(set(new_times) - set(old_times)),
+        'removed': sorted(set(old_times) - set(new_times)),
+        'time_shifted': [
+            {'section_number': num, 'before': old_times[num], 'after': new_times[num]}
+            for num in sorted(set(old_times) & set(new_times))
+            if old_times[num] != new_times[num]
+        ]
+    }
+
+
+def build_report(store: FingerprintStore, fetched: Dict[str, List[Dict[str, Any]]],
+                 classes_hashes: Dict[str, str], format_times: Callable[[Any], Any]) -> Dict[str, Any]:
+    """Diff refetched courses against the store, update it, and summarise the changes"""
+    courses = {}
+    for course_id, sections in fetched.items():
+        previous = store.entries.get(course_id)
+        if previous is None or previous['sections_hash'] != fingerprint(sections):
+            change = diff_sections(store.sections(course_id), sections, format_times)
+            if change['added'] or change['removed'] or change['time_shifted']:
+                courses[course_id] = change
+        store.update(course_id, classes_hashes[course_id], sections)
+
+    dropped = sorted(set(store.entries) - set(classes_hashes))
+    for course_id in dropped:
+        del store.entries[course_id]
+
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'refetched': len(fetched),
+        'courses_changed': len(courses),
+        'courses_removed': dropped,
+        'sections_added': sum(len(c['added']) for c in courses.values()),
+        'sections_removed': sum(len(c['removed']) for c in courses.values()),
+        'sections_time_shifted': sum(len(c['time_shifted']) for c in courses.values()),
+        'courses': courses
+    }
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Caching proxy and scheduled sync for the BYU events API (calendar.byu.edu/api).
+
+The query_events, get_category_event_counts and get_event_categories tools
+call the API on every chat turn. Run this service and point the routes at it
+(EVENTS_API_URL=http://127.0.0.1:8765/api) to serve them from a local cache:
+
+  AllCategories.json       LRU + TTL (the list rarely changes)
+  AllCategoryCounts.json   LRU + TTL, keyed by the full query
+  Events.json              day-partitioned store. A request for [min, max]
+                           is answered by merging the cached days; only the
+                           missing or stale days are fetched, as one request
+                           per contiguous gap, so overlapping "this week"
+                           windows share partitions instead of refetching.
+
+Partitions are keyed by the non-date filters (categories, price) and kept
+on disk under events_cache/, so a restart is warm. Concurrent misses for
+the same filters wait on one upstream fetch. A background sync refreshes
+today..today+--days ahead every --interval minutes. If the API is down,
+stale partitions are served rather than failing.
+
+Responses the store can't partition (no date window, not a list of events
+with a recognisable start date) are passed through uncached.
+
+Usage:
+  python events_sync.py                        # serve on 127.0.0.1:8765
+  python events_sync.py --once --days 14       # sync once and exit
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from http_pool import TokenBucket, make_session, request_with_retry
+
+API = 'https://calendar.byu.edu/api'
+MIN_DATE = 'event[min][date]'
+MAX_DATE = 'event[max][date]'
+
+# Field names tried, in order, for an event's start/end time and identity
+START_FIELDS = ('StartDateTime', 'StartDate', 'startDateTime', 'start_date', 'start')
+END_FIELDS = ('EndDateTime', 'EndDate', 'endDateTime', 'end_date', 'end')
+ID_FIELDS = ('EventId', 'eventId', 'event_id', 'id')
+
+MAX_SPAN_DAYS = 31  # a multi-day event is filed under at most this many days
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 900):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any):
+        with self.lock:
+            self.entries[key] = (time.time(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+def _field(event: Dict[str, Any], names: Tuple[str, ...]) -> Optional[Any]:
+    for name in names:
+        if event.get(name):
+            return event[name]
+    return None
+
+
+def _day(value: Any) -> Optional[date]:
+    """'2025-09-04 11:00:00' / '2025-09-04T11:00:00-06:00' / '2025-09-04' -> date"""
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def event_days(event: Dict[str, Any], first: date, last: date) -> Optional[List[date]]:
+    """Days within [first, last] the event belongs to, or None if it has no usable start"""
+    start = _day(_field(event, START_FIELDS))
+    if start is None:
+        return None
+    end = _day(_field(event, END_FIELDS)) or start
+    lo, hi = max(start, first), min(max(end, start), last, max(start, first) + timedelta(days=MAX_SPAN_DAYS))
+    return [lo + timedelta(days=i) for i in range((hi - lo).days + 1)]
+
+
+def event_identity(event: Dict[str, Any]) -> str:
+    found = _field(event, ID_FIELDS)
+    return str(found) if found is not None else json.dumps(event, sort_keys=True)
+
+
+def date_range(first: date, last: date) -> List[date]:
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+def gaps(days: List[date]) -> List[Tuple[date, date]]:
+    """Coalesce sorted days into contiguous (first, last) ranges"""
+    ranges = []
+    for day in days:
+        if ranges and day == ranges[-1][1] + timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+class DayStore:
+    """Events partitioned by (filter key, day), in memory and on disk."""
+
+    def __init__(self, directory: str, ttl: float):
+        self.directory = directory
+        self.ttl = ttl
+        self.partitions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, filter_key: str, day: date) -> str:
+        return os.path.join(self.directory, filter_key, day.isoformat() + '.json')
+
+    def get(self, filter_key: str, day: date) -> Optional[Dict[str, Any]]:
+        """{fetched_at, events} for the day, regardless of age"""
+        key = (filter_key, day.isoformat())
+        with self.lock:
+            partition = self.partitions.get(key)
+        if partition is None:
+            try:
+                with open(self._path(filter_key, day), 'r', encoding='utf-8') as f:
+                    partition = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return None
+            with self.lock:
+                self.partitions[key] = partition
+        return partition
+
+    def fresh(self, partition: Optional[Dict[str, Any]]) -> bool:
+        return partition is not None and time.time() - partition['fetched_at'] <= self.ttl
+
+    def put(self, filter_key: str, day: date, events: List[Dict[str, Any]], fetched_at: float):
+        partition = {'fetched_at': fetched_at, 'events': events}
+        path = self._path(filter_key, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(partition, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.partitions[(filter_key, day.isoformat())] = partition
+
+
+class EventsSync:
+    def __init__(self, api: str = API, cache_dir: str = 'events_cache', events_ttl: float = 900,
+                 categories_ttl: float = 86400, counts_ttl: float = 900, rate: float = 4.0):
+        self.api = api.rstrip('/')
+        self.session = make_session(pool_size=8)
+        self.limiter = TokenBucket(rate, capacity=4)
+        self.days = DayStore(os.path.join(cache_dir, 'events'), events_ttl)
+        self.categories = TTLCache(maxsize=1, ttl=categories_ttl)
+        self.counts = TTLCache(maxsize=256, ttl=counts_ttl)
+        self.filter_locks: Dict[str, threading.Lock] = {}
+        self.locks_lock = threading.Lock()
+        self.stats = {'hit': 0, 'partial': 0, 'miss': 0, 'stale': 0, 'passthrough': 0, 'upstream': 0}
+        self.stats_lock = threading.Lock()
+
+    def _count(self, outcome: str):
+        with self.stats_lock:
+            self.stats[outcome] += 1
+
+    def upstream(self, path: str, params: List[Tuple[str, str]]) -> Any:
+        self._count('upstream')
+        url = f"{self.api}/{path}" + (f"?{urlencode(params)}" if params else '')
+        return request_with_retry(self.session, 'GET', url, limiter=self.limiter, timeout=20).json()
+
+    def all_categories(self) -> Tuple[Any, str]:
+        cached = self.categories.get('all')
+        if cached is not None:
+            self._count('hit')
+            return cached, 'hit'
+        value = self.upstream('AllCategories.json', [])
+        self.categories.put('all', value)
+        self._count('miss')
+        return value, 'miss'
+
+    def category_counts(self, params: List[Tuple[str, str]]) -> Tuple[Any, str]:
+        key = urlencode(sorted(params))
+        cached = self.counts.get(key)
+        if cached is not None:
+            self._count('hit')
+            return cached, 'hit'
+        value = self.upstream('AllCategoryCounts.json', params)
+        self.counts.put(key, value)
+        self._count('miss')
+        return value, 'miss'
+
+    def _filter_lock(self, filter_key: str) -> threading.Lock:
+        with self.locks_lock:
+            return self.filter_locks.setdefault(filter_key, threading.Lock())
+
+    def events(self, params: List[Tuple[str, str]]) -> Tuple[Any, str]:
+        """Events.json for these query params, as (json, outcome)"""
+        query = dict(params)
+        first, last = _day(query.get(MIN_DATE)), _day(query.get(MAX_DATE))
+        if first is None or last is None or last < first:
+            self._count('passthrough')
+            return self.upstream('Events.json', params), 'passthrough'
+
+        filters = sorted((k, v) for k, v in params if k not in (MIN_DATE, MAX_DATE))
+        filter_key = hashlib.sha1(urlencode(filters).encode('utf-8')).hexdigest()[:16]
+        days = date_range(first, last)
+
+        missing = [day for day in days if not self.days.fresh(self.days.get(filter_key, day))]
+        outcome = 'hit'
+        if missing:
+            with self._filter_lock(filter_key):
+                # Another request may have filled these while we waited
+                missing = [day for day in missing if not self.days.fresh(self.days.get(filter_key, day))]
+                if missing:
+                    outcome = 'miss' if len(missing) == len(days) else 'partial'
+                for gap_first, gap_last in gaps(missing):
+                    try:
+                        if not self.fill(filter_key, filters, gap_first, gap_last):
+                            self._count('passthrough')
+                            return self.upstream('Events.json', params), 'passthrough'
+                    except Exception:
+                        if any(self.days.get(filter_key, day) is None for day in date_range(gap_first, gap_last)):
+                            raise
+                        outcome = 'stale'
+        self._count(outcome)
+        return self.merge(filter_key, days), outcome
+
+    def fill(self, filter_key: str, filters: List[Tuple[str, str]], first: date, last: date) -> bool:
+        """Fetch [first, last] once and file the events under their days; False if unpartitionable"""
+        fetched_at = time.time()
+        result = self.upstream('Events.json', filters + [(MIN_DATE, first.isoformat()), (MAX_DATE, last.isoformat())])
+        if not isinstance(result, list):
+            return False
+        by_day: Dict[date, List[Dict[str, Any]]] = {day: [] for day in date_range(first, last)}
+        for event in result:
+            days = event_days(event, first, last) if isinstance(event, dict) else None
+            if days is None:
+                return False
+            for day in days:
+                by_day[day].append(event)
+        for day, events in by_day.items():
+            self.days.put(filter_key, day, events, fetched_at)
+        return True
+
+    def merge(self, filter_key: str, days: List[date]) -> List[Dict[str, Any]]:
+        """Union of the day partitions, each event once, in start order"""
+        seen = set()
+        merged = []
+        for day in days:
+            for event in self.days.get(filter_key, day)['events']:
+                identity = event_identity(event)
+                if identity not in seen:
+                    seen.add(identity)
+                    merged.append(event)
+        merged.sort(key=lambda e: str(_field(e, START_FIELDS)))
+        return merged
+
+    def sync(self, days_ahead: int = 14):
+        """Refresh the categories list and every stale day of today..today+days_ahead"""
+        today = date.today()
+        self.categories.put('all', self.upstream('AllCategories.json', []))
+        window = [('categories', 'all'), (MIN_DATE, today.isoformat()),
+                  (MAX_DATE, (today + timedelta(days=days_ahead)).isoformat())]
+        events, outcome = self.events(window)
+        print(f"[{datetime.now():%H:%M:%S}] synced {len(events)} events over {days_ahead + 1} days ({outcome})")
+
+
+def make_handler(service: EventsSync):
+    routes = {
+        '/api/Events.json': service.events,
+        '/api/AllCategoryCounts.json': service.category_counts,
+        '/api/AllCategories.json': lambda params: service.all_categories(),
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path == '/stats':
+                return self.reply(200, dict(service.stats), 'stats')
+            route = routes.get(parts.path)
+            if route is None:
+                return self.reply(404, {'error': f"unknown path {parts.path}"}, 'none')
+            try:
+                body, outcome = route(parse_qsl(parts.query, keep_blank_values=True))
+            except Exception as e:
+                return self.reply(502, {'error': str(e)}, 'error')
+            self.reply(200, body, outcome)
+
+        def reply(self, status: int, body: Any, outcome: str):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('X-Cache', outcome)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def run_sync_loop(service: EventsSync, days_ahead: int, interval: float, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            service.sync(days_ahead)
+        except Exception as e:
+            print(f"Sync failed: {e}")
+        stop.wait(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache and sync the BYU events API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--api', default=API, help="upstream API base")
+    parser.add_argument('--cache-dir', default='events_cache')
+    parser.add_argument('--days', type=int, default=14, help="days ahead to keep synced")
+    parser.add_argument('--interval', type=float, default=15, help="minutes between syncs (0 disables)")
+    parser.add_argument('--events-ttl', type=float, default=15, help="minutes before a day partition is stale")
+    parser.add_argument('--rate', type=float, default=4.0, help="max upstream requests/sec")
+    parser.add_argument('--once', action='store_true', help="sync once and exit")
+    args = parser.parse_args()
+
+    service = EventsSync(args.api, args.cache_dir, events_ttl=args.events_ttl * 60, counts_ttl=args.events_ttl * 60,
+                         rate=args.rate)
+    if args.once:
+        service.sync(args.days)
+        return
+
+    stop = threading.Event()
+    if args.interval > 0:
+        threading.Thread(target=run_sync_loop, args=(service, args.days, args.interval * 60, stop),
+                         daemon=True).start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Serving events API cache on http://{args.host}:{args.port}/api (upstream {args.api})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        print(f"Stats: {service.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,38 @@
 """
 Convert iCal feeds and files to JSON format.
 Reads calendar sources from icals.txt and outputs to calendar.json
+
+Feeds are fetched concurrently over one pooled session with a per-feed
+timeout. Each feed's ETag/Last-Modified (or a local file's mtime) is kept
+in ical_cache/ next to its parsed events, so an unchanged feed costs one
+304 response and no parsing.
+
+Batch mode (--students DIR) reads one icals.txt-style file per student,
+fetches every distinct source once and writes one schedule per student
+to --output-dir, so the work grows with distinct feeds, not students.
+
+Recurring events (RRULE/RDATE/EXDATE) become one entry per occurrence
+inside the --from/--until window; see recurrence.py.
 """
 
+import argparse
 import json
+import os
 import requests
-from datetime import datetime
+from collections import Counter
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from icalendar import Calendar
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+from assignment_index import write_index
+from http_pool import Throughput, make_session, request_with_retry, run_pool
+from publish import atomic_write_json, publish
+from recurrence import expand_event, is_recurring
+from response_cache import ResponseCache
+
+# Bump when parse_event's output changes so cached feeds get reparsed
+PARSE_VERSION = 2
 
 
 def parse_icals_file(filename: str = "icals.txt") -> Dict[str, str]:
@@ -38,11 +62,10 @@ def parse_icals_file(filename: str = "icals.txt") -> Dict[str, str]:
     return sources
 
 
-def fetch_ical_content(source: str) -> str:
+def fetch_ical_content(source: str, session: Optional[requests.Session] = None, timeout: float = 15) -> str:
     """Fetch iCal content from a URL or read from a local file."""
     if source.startswith('http://') or source.startswith('https://'):
-        response = requests.get(source)
-        response.raise_for_status()
+        response = request_with_retry(session or make_session(pool_size=1), 'GET', source, timeout=timeout)
         return response.text
     else:
         # Local file
@@ -73,61 +96,135 @@ def parse_event(event: Any) -> Dict[str, Any]:
             else:
                 event_dict[field.lower()] = str(value)
     
-    # Handle recurrence rules
+    # Handle recurrence rules (expanded later by recurrence.expand_event)
     if 'RRULE' in event:
-        event_dict['rrule'] = str(event['RRULE'])
+        event_dict['rrule'] = event['RRULE'].to_ical().decode()
+    for field in ['EXDATE', 'RDATE']:
+        if field in event:
+            values = event[field] if isinstance(event[field], list) else [event[field]]
+            event_dict[field.lower()] = [convert_datetime(d.dt) for value in values for d in value.dts]
+    tzinfo = getattr(event['DTSTART'].dt, 'tzinfo', None) if 'DTSTART' in event else None
+    if getattr(tzinfo, 'key', None):
+        event_dict['tzid'] = tzinfo.key
     
     return event_dict
 
 
+def parse_calendar(ical_content: str) -> List[Dict[str, Any]]:
+    """Parse an iCal calendar's events, not yet tagged with a course."""
+    cal = Calendar.from_ical(ical_content)
+    return [parse_event(component) for component in cal.walk() if component.name == "VEVENT"]
+
+
 def process_calendar(course_name: str, ical_content: str) -> List[Dict[str, Any]]:
     """Process an iCal calendar and extract events."""
-    cal = Calendar.from_ical(ical_content)
-    events = []
-    
-    for component in cal.walk():
-        if component.name == "VEVENT":
-            event = parse_event(component)
-            event['course'] = course_name
-            events.append(event)
-    
-    return events
+    return [{**event, 'course': course_name} for event in parse_calendar(ical_content)]
 
 
-def main():
-    """Main function to convert all iCal sources to JSON."""
-    print("Reading icals.txt...")
-    sources = parse_icals_file()
-    
-    all_events = []
-    
-    for course_name, source in sources.items():
-        print(f"Processing {course_name}...")
-        try:
-            ical_content = fetch_ical_content(source)
-            events = process_calendar(course_name, ical_content)
-            all_events.extend(events)
-            print(f"  Found {len(events)} events")
-        except Exception as e:
-            print(f"  Error processing {course_name}: {e}")
-    
-    # Process events: calculate due_date and simplify structure
+def fetch_feed(source: str, session: requests.Session, cache: ResponseCache,
+               timeout: float = 15) -> Tuple[List[Dict[str, Any]], str]:
+    """Parsed (untagged) events for one source and how they were obtained: 'fetched', 'not modified' or 'cached'.
+
+    URLs are revalidated with If-None-Match/If-Modified-Since; local files by mtime.
+    If the fetch fails and an earlier copy is cached, that copy is served.
+    """
+    entry = cache.entry(source)
+    cached = entry['response'] if entry else None
+    if cached and cached.get('parse_version') != PARSE_VERSION:
+        cached = None
+    try:
+        if source.startswith('http://') or source.startswith('https://'):
+            conditional = {}
+            if cached and cached.get('etag'):
+                conditional['If-None-Match'] = cached['etag']
+            if cached and cached.get('last_modified'):
+                conditional['If-Modified-Since'] = cached['last_modified']
+            response = request_with_retry(session, 'GET', source, timeout=timeout, headers=conditional)
+            if response.status_code == 304 and cached:
+                return cached['events'], 'not modified'
+            validators = {'etag': response.headers.get('ETag'),
+                          'last_modified': response.headers.get('Last-Modified')}
+            content = response.text
+        else:
+            mtime = os.path.getmtime(source)
+            if cached and cached.get('mtime') == mtime:
+                return cached['events'], 'not modified'
+            validators = {'mtime': mtime}
+            with open(source, 'r', encoding='utf-8') as f:
+                content = f.read()
+    except (requests.RequestException, OSError):
+        if cached:
+            return cached['events'], 'cached'
+        raise
+
+    events = parse_calendar(content)
+    cache.put(source, {**validators, 'parse_version': PARSE_VERSION, 'events': events})
+    return events, 'fetched'
+
+
+def fetch_sources(sources: Iterable[str], concurrency: int = 8, timeout: float = 15,
+                  cache_dir: str = 'ical_cache') -> Dict[str, List[Dict[str, Any]]]:
+    """source -> parsed events, fetching each distinct source once, concurrently"""
+    sources = list(dict.fromkeys(sources))
+    session = make_session(pool_size=concurrency)
+    cache = ResponseCache(cache_dir, ttl=float('inf'))
+    progress = Throughput(len(sources), label="feeds")
+    counts = Counter()
+    results = {}
+    fetch = lambda source: fetch_feed(source, session, cache, timeout)
+    for source, result, error in run_pool(sources, fetch, concurrency):
+        progress.tick(error is None)
+        if error:
+            print(f"  Error processing {source}: {error}")
+            continue
+        results[source], how = result
+        counts[how] += 1
+    print(f"  {progress.summary()}: {', '.join(f'{n} {how}' for how, n in counts.most_common())}")
+    return results
+
+
+def course_events(sources: Dict[str, str], parsed: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Tag each source's events with its course name, in `sources` order"""
+    return [{**event, 'course': course_name}
+            for course_name, source in sources.items()
+            for event in parsed.get(source, [])]
+
+
+def fetch_all_feeds(sources: Dict[str, str], concurrency: int = 8, timeout: float = 15,
+                    cache_dir: str = 'ical_cache') -> List[Dict[str, Any]]:
+    """Every source's events tagged with its course name, in icals.txt order"""
+    return course_events(sources, fetch_sources(sources.values(), concurrency, timeout, cache_dir))
+
+
+def clean_course_name(course: str) -> str:
+    """Remove the "Canvas (...)" wrapper"""
+    if course.startswith('Canvas (') and course.endswith(')'):
+        return course[8:-1]
+    return course
+
+
+def expand_recurring(all_events: List[Dict[str, Any]], window: Tuple[date, date]) -> Iterator[Dict[str, Any]]:
+    """Replace each recurring event with its occurrences inside window [start, end)"""
+    for event in all_events:
+        if is_recurring(event) and 'dtstart' in event:
+            yield from expand_event(event, *window)
+        else:
+            yield event
+
+
+def simplify_events(all_events: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reduce events to {assignment, due_date, course}, sorted by due date"""
     processed_events = []
     for event in all_events:
         # Calculate due_date
         if 'dtend' in event:
-            # Parse dtend and subtract one day
             dtend_str = event['dtend']
             if 'T' in dtend_str:
-                # Has time component
-                dtend = datetime.fromisoformat(dtend_str)
+                # Timed event: due the day it ends
+                due_date_str = datetime.fromisoformat(dtend_str).date().isoformat()
             else:
-                # Date only
-                dtend = datetime.fromisoformat(dtend_str)
-            
-            from datetime import timedelta
-            due_date = dtend - timedelta(days=1)
-            due_date_str = due_date.date().isoformat()
+                # All-day event: DTEND is the exclusive next day
+                due_date_str = (date.fromisoformat(dtend_str) - timedelta(days=1)).isoformat()
         elif 'dtstart' in event:
             dtstart_str = event['dtstart']
             if 'T' in dtstart_str:
@@ -138,35 +235,97 @@ def main():
         else:
             due_date_str = None
         
-        # Clean up course name - remove "Canvas" wrapper
-        course = event.get('course', '')
-        if course.startswith('Canvas (') and course.endswith(')'):
-            course = course[8:-1]  # Remove "Canvas (" and ")"
-        
         # Create simplified event
         processed_events.append({
             'assignment': event.get('summary', ''),
             'due_date': due_date_str,
-            'course': course
+            'course': clean_course_name(event.get('course', ''))
         })
     
-    # Sort events by due date
-    processed_events.sort(key=lambda x: x.get('due_date', ''))
-    
-    # Create output structure
-    output = {
+    # Sort events by due date (undated first)
+    processed_events.sort(key=lambda x: x.get('due_date') or '')
+    return processed_events
+
+
+def build_output(sources: Dict[str, str], all_events: List[Dict[str, Any]],
+                 window: Tuple[date, date]) -> Dict[str, Any]:
+    """The schedule.json structure for one set of sources"""
+    processed_events = simplify_events(expand_recurring(all_events, window))
+    return {
         'generated_at': datetime.now().isoformat(),
+        'window': {'start': window[0].isoformat(), 'end': window[1].isoformat()},
         'total_events': len(processed_events),
-        'courses': [c if not c.startswith('Canvas (') else c[8:-1] for c in sources.keys()],
+        'courses': [clean_course_name(c) for c in sources.keys()],
         'events': processed_events
     }
+
+
+def default_window() -> Tuple[date, date]:
+    """Recurring events are expanded from a month ago to half a year ahead"""
+    today = date.today()
+    return today - timedelta(days=30), today + timedelta(days=183)
+
+
+def run_batch(students_dir: str, output_dir: str, concurrency: int = 8, timeout: float = 15,
+              cache_dir: str = 'ical_cache', window: Optional[Tuple[date, date]] = None):
+    """Write output_dir/<student>.json for every <student>.txt in students_dir"""
+    students = {
+        Path(name).stem: parse_icals_file(os.path.join(students_dir, name))
+        for name in sorted(os.listdir(students_dir)) if name.endswith('.txt')
+    }
+    distinct = {source for sources in students.values() for source in sources.values()}
+    total = sum(len(sources) for sources in students.values())
+    print(f"{len(students)} students, {total} feed subscriptions, {len(distinct)} distinct feeds")
+
+    parsed = fetch_sources(distinct, concurrency, timeout, cache_dir)
+
+    os.makedirs(output_dir, exist_ok=True)
+    for student, sources in students.items():
+        output = build_output(sources, course_events(sources, parsed), window or default_window())
+        output_file = os.path.join(output_dir, f"{student}.json")
+        atomic_write_json(output_file, output, indent=2, ensure_ascii=False)
+        write_index(output_file)
+    print(f"\nSuccessfully exported schedules for {len(students)} students to {output_dir}/")
+
+
+def main():
+    """Main function to convert all iCal sources to JSON."""
+    parser = argparse.ArgumentParser(description="Convert the iCal sources in icals.txt to JSON")
+    parser.add_argument('--icals', default='icals.txt')
+    parser.add_argument('--output', default='schedule.json')
+    parser.add_argument('--students', help="directory of <student>.txt files in icals.txt format (batch mode)")
+    parser.add_argument('--output-dir', default='schedules', help="batch mode: where <student>.json files go")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--timeout', type=float, default=15, help="seconds per feed request")
+    parser.add_argument('--cache-dir', default='ical_cache')
+    parser.add_argument('--publish', action='store_true',
+                        help="publish the output as the new current_assignments version (data/ and its derived files)")
+    parser.add_argument('--from', dest='window_start', type=date.fromisoformat,
+                        help="expand recurring events from this date (default: 30 days ago)")
+    parser.add_argument('--until', dest='window_end', type=date.fromisoformat,
+                        help="...up to, not including, this date (default: 183 days ahead)")
+    args = parser.parse_args()
+    default_start, default_end = default_window()
+    window = (args.window_start or default_start, args.window_end or default_end)
+
+    if args.students:
+        run_batch(args.students, args.output_dir, args.concurrency, args.timeout, args.cache_dir, window)
+        return
+
+    print(f"Reading {args.icals}...")
+    sources = parse_icals_file(args.icals)
+    
+    # Events stay in icals.txt order so the output doesn't depend on which feed answered first
+    all_events = fetch_all_feeds(sources, args.concurrency, args.timeout, args.cache_dir)
+    output = build_output(sources, all_events, window)
     
     # Write to JSON file
-    output_file = 'schedule.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    atomic_write_json(args.output, output, indent=2, ensure_ascii=False)
+    index_file = write_index(args.output)
     
-    print(f"\nSuccessfully exported {len(processed_events)} events to {output_file}")
+    print(f"\nSuccessfully exported {output['total_events']} events to {args.output} (index: {index_file})")
+    if args.publish:
+        publish('current_assignments', args.output)
 
 
 if __name__ == "__main__":
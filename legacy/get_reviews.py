@@ -1,488 +1,251 @@
+import argparse
 import json
-import requests
+import os
+import threading
 import time
 
-def fetch_professor_data(professor_id):
-    url = "https://www.ratemyprofessors.com/graphql"
-    
-    # Paste your entire query here
-    query = """query TeacherRatingsPageQuery(
-  $id: ID!
-) {
-  node(id: $id) {
-    __typename
-    ... on Teacher {
-      id
-      legacyId
-      firstName
-      lastName
-      department
-      school {
-        legacyId
-        name
-        city
-        state
-        country
-        id
-      }
-      lockStatus
-      ...StickyHeaderContent_teacher
-      ...MiniStickyHeader_teacher
-      ...TeacherBookmark_teacher
-      ...RatingDistributionWrapper_teacher
-      ...TeacherInfo_teacher
-      ...SimilarProfessors_teacher
-      ...TeacherRatingTabs_teacher
-    }
-    id
-  }
-}
-
-fragment CompareProfessorLink_teacher on Teacher {
-  legacyId
-}
-
-fragment CourseMeta_rating on Rating {
-  attendanceMandatory
-  wouldTakeAgain
-  grade
-  textbookUse
-  isForOnlineClass
-  isForCredit
-}
-
-fragment HeaderDescription_teacher on Teacher {
-  id
-  legacyId
-  firstName
-  lastName
-  department
-  school {
-    legacyId
-    name
-    city
-    state
-    id
-  }
-  ...TeacherTitles_teacher
-  ...TeacherBookmark_teacher
-  ...RateTeacherLink_teacher
-  ...CompareProfessorLink_teacher
-}
-
-fragment HeaderRateButton_teacher on Teacher {
-  ...RateTeacherLink_teacher
-  ...CompareProfessorLink_teacher
-}
-
-fragment MiniStickyHeader_teacher on Teacher {
-  id
-  legacyId
-  firstName
-  lastName
-  department
-  departmentId
-  school {
-    legacyId
-    name
-    city
-    state
-    id
-  }
-  ...TeacherBookmark_teacher
-  ...RateTeacherLink_teacher
-  ...CompareProfessorLink_teacher
-}
-
-fragment NameLink_teacher on Teacher {
-  isProfCurrentUser
-  id
-  legacyId
-  firstName
-  lastName
-  school {
-    name
-    id
-  }
-}
-
-fragment NameTitle_teacher on Teacher {
-  id
-  firstName
-  lastName
-  department
-  school {
-    legacyId
-    name
-    id
-  }
-  ...TeacherDepartment_teacher
-  ...TeacherBookmark_teacher
-}
-
-fragment NoRatingsArea_teacher on Teacher {
-  lastName
-  ...RateTeacherLink_teacher
-}
-
-fragment NumRatingsLink_teacher on Teacher {
-  numRatings
-  ...RateTeacherLink_teacher
-}
-
-fragment ProfessorNoteEditor_rating on Rating {
-  id
-  legacyId
-  class
-  teacherNote {
-    id
-    teacherId
-    comment
-  }
-}
+from crawl_journal import CrawlJournal
+from http_pool import Throughput, TokenBucket, make_session, run_pool
+from publish import atomic_write_json
+from rmp_queries import URL, QueryStats, run_query
+from response_cache import ResponseCache
+
+url = URL
+
+headers = {
+    "Content-Type": "application/json",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+
+# Ratings on the first page, as on the teacher's RMP page
+FIRST_PAGE_RATINGS = 5
+
+
+def fetch_professor_data(professor_id, session=None, limiter=None, profile='ratings-full', stats=None):
+    variables = {"id": professor_id}
+    if profile == 'ratings-full':
+        variables.update(count=FIRST_PAGE_RATINGS, cursor=None)
+
+    if session is None:
+        session = make_session(pool_size=1, headers=headers)
+    return run_query(session, profile, variables, limiter=limiter, stats=stats, url=url, timeout=30)
+
+
+def graphql_error(response):
+    """Why a GraphQL response (HTTP 200) is not a usable result, or None if it is"""
+    if not isinstance(response, dict):
+        return "response is not a JSON object"
+    if response.get('errors'):
+        return '; '.join(str(error.get('message', error)) for error in response['errors'])
+    if not response.get('data'):
+        return "response has no data"
+    return None
+
+
+def harvest(professors, cache, output_file='professor_responses.jsonl', concurrency=4, rate=6.0,
+            profile='ratings-full', stats=None):
+    """Fetch every stale or missing professor concurrently, streaming all responses to JSONL"""
+    session = make_session(pool_size=concurrency, headers=headers)
+    limiter = TokenBucket(rate, capacity=concurrency)
+
+    to_fetch = []
+    written = 0
+    with open(output_file, 'w', encoding='utf-8') as out:
+        # Fresh cache entries go straight to the output
+        for prof in professors:
+            cached = cache.get(f"{profile}:{prof['id']}")
+            if cached is None or graphql_error(cached):
+                to_fetch.append(prof)
+                continue
+            out.write(json.dumps({'id': prof['id'], 'response': cached}, ensure_ascii=False) + '\n')
+            written += 1
+        print(f"{written} professors served from cache, {len(to_fetch)} to fetch")
+
+        started = time.monotonic()
+        failed = 0
+        worker = lambda prof: fetch_professor_data(prof['id'], session, limiter, profile, stats)
+        for i, (prof, response, error) in enumerate(run_pool(to_fetch, worker, concurrency), 1):
+            name = f"{prof.get('firstName')} {prof.get('lastName')}"
+            error = error or graphql_error(response)
+            if error:
+                # Errors are never cached, so a transient upstream failure is retried next run
+                failed += 1
+                print(f"{i}. {name}... failed: {error}")
+                continue
+            cache.put(f"{profile}:{prof['id']}", response)
+            out.write(json.dumps({'id': prof['id'], 'response': response}, ensure_ascii=False) + '\n')
+            out.flush()
+            written += 1
+            print(f"{i}. {name}... ({i / (time.monotonic() - started):.1f}/sec)")
+
+    return written, failed
+
+
+class PageBudgetExhausted(Exception):
+    """iter_ratings stopped at max_pages with more pages left"""
+
+
+def iter_ratings(professor_id, session, limiter=None, page_size=20, max_pages=None, seen=None, stop_at_seen=False,
+                 stats=None):
+    """Yield (page_number, new ratings on that page) following cursors until the last page.
+
+    Ratings come newest first, so with stop_at_seen paging ends at the first rating
+    already in `seen` (everything after it was harvested before). Without it, seen
+    ratings are skipped but paging continues, which backfills a harvest that an
+    earlier max_pages budget cut short. Raises PageBudgetExhausted if max_pages
+    runs out while pages remain.
+    """
+    seen = seen or set()
+    cursor = None
+    page = 0
+    while True:
+        if max_pages is not None and page >= max_pages:
+            raise PageBudgetExhausted(page)
+        page += 1
+        variables = {"id": professor_id, "count": page_size, "cursor": cursor}
+        data = run_query(session, 'ratings-full', variables, limiter=limiter, stats=stats, url=url, timeout=30)
+        ratings = ((data.get('data') or {}).get('node') or {}).get('ratings')
+        if not ratings:
+            return
+        fresh = []
+        for edge in ratings['edges']:
+            if edge['node']['legacyId'] in seen:
+                if stop_at_seen:
+                    yield page, fresh
+                    return
+                continue
+            fresh.append(edge['node'])
+        yield page, fresh
+        if not ratings['pageInfo']['hasNextPage']:
+            return
+        cursor = ratings['pageInfo']['endCursor']
+
+
+def harvest_ratings(professors, output_file='professor_ratings.jsonl', state_file='ratings_state.json',
+                    concurrency=4, rate=6.0, page_size=20, max_pages=None, incremental=False, stats=None):
+    """Page through every professor's ratings, appending one JSONL record per rating as it arrives.
+
+    state_file keeps, per teacher, the rating ids harvested so far and whether the
+    harvest reached the last page. In incremental mode a completely harvested teacher
+    costs only the pages holding ratings newer than the last harvest; an incomplete one
+    is paged again from the top, writing only ratings not seen before. After every
+    page, right after that page's ratings are flushed, the teacher's state is appended
+    to a journal beside state_file, so an interrupted run loses at most one page of
+    bookkeeping; the journal is compacted into state_file when the run ends, and a
+    journal left by a crash is merged on the next run.
+    """
+    journal_file = state_file + '.journal.jsonl'
+    state = {}
+    if incremental:
+        if os.path.exists(state_file):
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+    else:
+        # A fresh harvest truncates the output, so no earlier state applies
+        atomic_write_json(state_file, state)
+        if os.path.exists(journal_file):
+            os.remove(journal_file)
+    journal = CrawlJournal(journal_file)
+    for prof_id in journal.completed():
+        state[prof_id] = journal.get(prof_id)
+
+    session = make_session(pool_size=concurrency, headers=headers)
+    limiter = TokenBucket(rate, capacity=concurrency)
+    write_lock = threading.Lock()
+
+    with open(output_file, 'a' if incremental else 'w', encoding='utf-8') as out:
+        def checkpoint(prof_id, complete, seen):
+            # Caller holds write_lock. Ratings reach the disk before the state that claims them.
+            out.flush()
+            os.fsync(out.fileno())
+            state[prof_id] = {'complete': complete, 'seen': seen}
+            journal.record_success(prof_id, state[prof_id])
+
+        def worker(prof):
+            previous = state.get(prof['id'], {})
+            seen = set(previous.get('seen', []))
+            new_ids = []
+            pages = 0
+            complete = False
+            try:
+                for pages, ratings in iter_ratings(prof['id'], session, limiter, page_size, max_pages,
+                                                   seen, previous.get('complete', False), stats):
+                    with write_lock:
+                        for rating in ratings:
+                            out.write(json.dumps({'teacher_id': prof['id'], **rating}, ensure_ascii=False) + '\n')
+                        new_ids.extend(rating['legacyId'] for rating in ratings)
+                        checkpoint(prof['id'], False, new_ids + previous.get('seen', []))
+                complete = True
+            except PageBudgetExhausted as budget:
+                pages = budget.args[0]
+            finally:
+                # Pages already written are checkpointed; this records whether the harvest finished.
+                # A budget-limited incremental run may leave a gap below the new ratings,
+                # so only a run that reached the end (or the old ratings) counts as complete.
+                with write_lock:
+                    checkpoint(prof['id'], complete, new_ids + previous.get('seen', []))
+            return len(new_ids), pages
+
+        progress = Throughput(len(professors), label="professors")
+        total_written = total_pages = 0
+        for prof, result, error in run_pool(professors, worker, concurrency):
+            progress.tick(error is None)
+            name = f"{prof.get('firstName')} {prof.get('lastName')}"
+            if error:
+                print(f"{progress.done}. {name}... failed: {error}")
+                continue
+            written, pages = result
+            total_written += written
+            total_pages += pages
+            status = '' if state[prof['id']]['complete'] else ', page budget reached'
+            print(f"{progress.done}. {name}... {written} new ratings in {pages} pages{status}")
+
+        # Compact: every journaled state is in `state`, so one write replaces the journal.
+        # An interrupted run leaves the journal for the next run to merge.
+        atomic_write_json(state_file, state)
+        journal.discard()
+
+    print(progress.summary())
+    return total_written, total_pages
 
-fragment ProfessorNoteEditor_teacher on Teacher {
-  id
-}
-
-fragment ProfessorNoteFooter_note on TeacherNotes {
-  legacyId
-  flagStatus
-}
 
-fragment ProfessorNoteFooter_teacher on Teacher {
-  legacyId
-  isProfCurrentUser
-}
-
-fragment ProfessorNoteHeader_note on TeacherNotes {
-  createdAt
-  updatedAt
-}
-
-fragment ProfessorNoteHeader_teacher on Teacher {
-  lastName
-}
-
-fragment ProfessorNoteSection_rating on Rating {
-  teacherNote {
-    ...ProfessorNote_note
-    id
-  }
-  ...ProfessorNoteEditor_rating
-}
-
-fragment ProfessorNoteSection_teacher on Teacher {
-  ...ProfessorNote_teacher
-  ...ProfessorNoteEditor_teacher
-}
-
-fragment ProfessorNote_note on TeacherNotes {
-  comment
-  ...ProfessorNoteHeader_note
-  ...ProfessorNoteFooter_note
-}
-
-fragment ProfessorNote_teacher on Teacher {
-  ...ProfessorNoteHeader_teacher
-  ...ProfessorNoteFooter_teacher
-}
-
-fragment RateTeacherLink_teacher on Teacher {
-  legacyId
-  numRatings
-  lockStatus
-}
-
-fragment RatingDistributionChart_ratingsDistribution on ratingsDistribution {
-  r1
-  r2
-  r3
-  r4
-  r5
-}
-
-fragment RatingDistributionWrapper_teacher on Teacher {
-  ...NoRatingsArea_teacher
-  ratingsDistribution {
-    total
-    ...RatingDistributionChart_ratingsDistribution
-  }
-}
-
-fragment RatingFooter_rating on Rating {
-  id
-  comment
-  adminReviewedAt
-  flagStatus
-  legacyId
-  thumbsUpTotal
-  thumbsDownTotal
-  thumbs {
-    thumbsUp
-    thumbsDown
-    computerId
-    id
-  }
-  teacherNote {
-    id
-  }
-  ...Thumbs_rating
-}
-
-fragment RatingFooter_teacher on Teacher {
-  id
-  legacyId
-  lockStatus
-  isProfCurrentUser
-  ...Thumbs_teacher
-}
-
-fragment RatingHeader_rating on Rating {
-  legacyId
-  date
-  class
-  helpfulRating
-  clarityRating
-  isForOnlineClass
-}
-
-fragment RatingSuperHeader_rating on Rating {
-  legacyId
-}
-
-fragment RatingSuperHeader_teacher on Teacher {
-  firstName
-  lastName
-  legacyId
-  school {
-    name
-    id
-  }
-}
-
-fragment RatingTags_rating on Rating {
-  ratingTags
-}
-
-fragment RatingValue_teacher on Teacher {
-  avgRating
-  numRatings
-  ...NumRatingsLink_teacher
-}
-
-fragment RatingValues_rating on Rating {
-  helpfulRating
-  clarityRating
-  difficultyRating
-}
-
-fragment Rating_rating on Rating {
-  comment
-  flagStatus
-  createdByUser
-  teacherNote {
-    id
-  }
-  ...RatingHeader_rating
-  ...RatingSuperHeader_rating
-  ...RatingValues_rating
-  ...CourseMeta_rating
-  ...RatingTags_rating
-  ...RatingFooter_rating
-  ...ProfessorNoteSection_rating
-}
-
-fragment Rating_teacher on Teacher {
-  ...RatingFooter_teacher
-  ...RatingSuperHeader_teacher
-  ...ProfessorNoteSection_teacher
-}
-
-fragment RatingsFilter_teacher on Teacher {
-  courseCodes {
-    courseCount
-    courseName
-  }
-}
-
-fragment RatingsList_teacher on Teacher {
-  id
-  legacyId
-  lastName
-  numRatings
-  school {
-    id
-    legacyId
-    name
-    city
-    state
-    avgRating
-    numRatings
-  }
-  ...Rating_teacher
-  ...NoRatingsArea_teacher
-  ratings(first: 5) {
-    edges {
-      cursor
-      node {
-        ...Rating_rating
-        id
-        __typename
-      }
-    }
-    pageInfo {
-      hasNextPage
-      endCursor
-    }
-  }
-}
-
-fragment SimilarProfessorListItem_teacher on RelatedTeacher {
-  legacyId
-  firstName
-  lastName
-  avgRating
-}
-
-fragment SimilarProfessors_teacher on Teacher {
-  department
-  relatedTeachers {
-    legacyId
-    ...SimilarProfessorListItem_teacher
-    id
-  }
-}
-
-fragment StickyHeaderContent_teacher on Teacher {
-  ...HeaderDescription_teacher
-  ...HeaderRateButton_teacher
-  ...MiniStickyHeader_teacher
-}
-
-fragment TeacherBookmark_teacher on Teacher {
-  id
-  isSaved
-}
-
-fragment TeacherDepartment_teacher on Teacher {
-  department
-  departmentId
-  school {
-    legacyId
-    name
-    isVisible
-    id
-  }
-}
-
-fragment TeacherFeedback_teacher on Teacher {
-  numRatings
-  avgDifficulty
-  wouldTakeAgainPercent
-}
-
-fragment TeacherInfo_teacher on Teacher {
-  id
-  lastName
-  numRatings
-  ...RatingValue_teacher
-  ...NameTitle_teacher
-  ...TeacherTags_teacher
-  ...NameLink_teacher
-  ...TeacherFeedback_teacher
-  ...RateTeacherLink_teacher
-  ...CompareProfessorLink_teacher
-}
-
-fragment TeacherRatingTabs_teacher on Teacher {
-  numRatings
-  courseCodes {
-    courseName
-    courseCount
-  }
-  ...RatingsList_teacher
-  ...RatingsFilter_teacher
-}
-
-fragment TeacherTags_teacher on Teacher {
-  lastName
-  teacherRatingTags {
-    legacyId
-    tagCount
-    tagName
-    id
-  }
-}
-
-fragment TeacherTitles_teacher on Teacher {
-  department
-  school {
-    legacyId
-    name
-    id
-  }
-}
+def main():
+    parser = argparse.ArgumentParser(description="Harvest RateMyProfessors ratings pages for byu_professors.json")
+    parser.add_argument('--professors', default='byu_professors.json')
+    parser.add_argument('--output', default='professor_responses.jsonl')
+    parser.add_argument('--cache-dir', default='review_cache')
+    parser.add_argument('--ttl-hours', type=float, default=24 * 7, help="refetch cached responses older than this")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=6.0, help="max requests per second")
+    parser.add_argument('--profile', default='ratings-full', choices=['card', 'ratings-full', 'tags-only', 'page'],
+                        help="query field set per teacher (see rmp_queries.py); 'page' is the full web-app query")
+    parser.add_argument('--all-ratings', action='store_true',
+                        help="page through every rating instead of saving the ratings page")
+    parser.add_argument('--ratings-output', default='professor_ratings.jsonl')
+    parser.add_argument('--state', default='ratings_state.json', help="per-teacher harvest state for --incremental")
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--max-pages', type=int, help="page budget per teacher per run")
+    parser.add_argument('--incremental', action='store_true', help="only fetch ratings newer than the last harvest")
+    args = parser.parse_args()
+
+    with open(args.professors, 'r') as f:
+        professors = json.load(f)
+    stats = QueryStats()
 
-fragment Thumbs_rating on Rating {
-  id
-  comment
-  adminReviewedAt
-  flagStatus
-  legacyId
-  thumbsUpTotal
-  thumbsDownTotal
-  thumbs {
-    computerId
-    thumbsUp
-    thumbsDown
-    id
-  }
-  teacherNote {
-    id
-  }
-}
+    if args.all_ratings:
+        print(f"Paging ratings for {len(professors)} professors...\n")
+        written, pages = harvest_ratings(professors, args.ratings_output, args.state, args.concurrency, args.rate,
+                                         args.page_size, args.max_pages, args.incremental, stats)
+        print(f"\n✓ Done! Appended {written} ratings from {pages} pages to '{args.ratings_output}'")
+        print(stats.summary())
+        return
 
-fragment Thumbs_teacher on Teacher {
-  id
-  legacyId
-  lockStatus
-  isProfCurrentUser
-}
-"""
-    
-    payload = {
-        "query": query,
-        "variables": {"id": professor_id}
-    }
-    
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    }
-    
-    response = requests.post(url, json=payload, headers=headers)
-    return response.json()
+    print(f"Fetching {len(professors)} professors...\n")
+    cache = ResponseCache(args.cache_dir, ttl=args.ttl_hours * 3600)
+    written, failed = harvest(professors, cache, args.output, args.concurrency, args.rate, args.profile, stats)
 
-def main():
-    with open('byu_professors.json', 'r') as f:
-        professors = json.load(f)
-    
-    first_10 = professors # [:10]
-    all_responses = []
-    
-    print(f"Fetching {len(first_10)} professors...\n")
-    
-    for i, prof in enumerate(first_10, 1):
-        print(f"{i}. {prof.get('firstName')} {prof.get('lastName')}...")
-        response = fetch_professor_data(prof['id'])
-        all_responses.append(response)
-        time.sleep(.16)  # Be nice to the API
-    
-    with open('professor_responses.json', 'w') as f:
-        json.dump(all_responses, f, indent=2)
-    
-    print(f"\n✓ Done! Saved to 'professor_responses.json'")
+    print(f"\n✓ Done! Saved {written} responses to '{args.output}' ({failed} failed; re-run to retry)")
+    print(stats.summary())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
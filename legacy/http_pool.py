@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP fetch engine for the scraping scripts.
+Provides a pooled keep-alive session, a token-bucket rate limiter,
+retry with exponential backoff and a bounded thread pool runner.
+Sessions record or replay through cassette.py when HTTP_CASSETTE is set.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cassette import adapter_from_env
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests/sec with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until `tokens` are available, then take them."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait_for = (tokens - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+
+class Throughput:
+    """Counts finished items and reports items/sec since start."""
+
+    def __init__(self, total: int, label: str = "items"):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def tick(self, ok: bool = True):
+        self.done += 1
+        if not ok:
+            self.failed += 1
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        return (f"{self.done}/{self.total} {self.label} in {elapsed:.1f}s "
+                f"({self.rate:.1f} {self.label}/sec, {self.failed} failed)")
+
+
+def make_session(pool_size: int = 10, headers: Optional[Dict[str, str]] = None) -> requests.Session:
+    """Create a session whose connection pool can keep `pool_size` sockets alive."""
+    session = requests.Session()
+    adapter = adapter_from_env(pool_size) or HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                                         max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    value = response.headers.get('Retry-After')
+    if value and value.isdigit():
+        return float(value)
+    return None
+
+
+def request_with_retry(session: requests.Session, method: str, url: str,
+                       limiter: Optional[TokenBucket] = None, retries: int = 3,
+                       backoff: float = 0.5, timeout: float = 10, **kwargs) -> requests.Response:
+    """Send a request, retrying connection errors and 429/5xx with exponential backoff."""
+    attempt = 0
+    while True:
+        if limiter:
+            limiter.acquire()
+        delay = backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUS or attempt >= retries:
+                response.raise_for_status()
+                return response
+            delay = _retry_after(response) or delay
+        attempt += 1
+        time.sleep(delay)
+
+
+def run_pool(items: Iterable[Any], worker: Callable[[Any], Any],
+             concurrency: int = 8) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+    """Run `worker` over `items` with at most `concurrency` in flight.
+
+    Yields (item, result, error) in completion order; `error` is None on success.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {}
+        for item in items:
+            pending[executor.submit(worker, item)] = item
+            if len(pending) >= concurrency:
+                break
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                yield item, (None if error else future.result()), error
+                for next_item in items:
+                    pending[executor.submit(worker, next_item)] = next_item
+                    break
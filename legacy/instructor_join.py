@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Join course instructors to RateMyProfessors teachers once, at ETL time.
+
+Names from both sides are normalised (case, accents, punctuation, stray
+spaces such as "Rob " from scrape_rmp.py, Jr/III suffixes). Each distinct
+instructor_name in courses.json is then resolved:
+  exact       one RMP teacher with the same normalised full name
+  exact+dept  several share the name; the one whose RMP department matches
+              the departments the instructor teaches in wins
+  fuzzy       same last name, similar or abbreviated first name (Rob/Robert),
+              scored with the department match
+The department affinity (course dept code -> RMP department) is learnt from
+the unambiguous exact matches, so no hand-written mapping is needed.
+
+Output (data/instructor_rmp.json):
+  {"instructors": {instructor_name: {"legacyId", "id", "confidence", "method"}},
+   "unmatched": [instructor_name, ...]}
+"""
+
+import json
+import re
+import sys
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+from publish import atomic_write_json
+
+FUZZY_THRESHOLD = 0.75
+
+_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv'}
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """'  José  O'Neil Jr. ' -> 'jose oneil'"""
+    text = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode('ascii')
+    text = re.sub(r"[^a-z\s-]", '', text.lower()).replace('-', ' ')
+    return ' '.join(part for part in text.split() if part not in _SUFFIXES)
+
+
+def course_dept(course_name: str) -> str:
+    return course_name.rsplit(' ', 1)[0]
+
+
+def instructor_depts(courses: List[Dict[str, Any]]) -> Dict[str, Counter]:
+    """instructor_name -> Counter of course dept codes they teach"""
+    depts: Dict[str, Counter] = defaultdict(Counter)
+    for course in courses:
+        for section in course['sections']:
+            if section.get('instructor_name'):
+                depts[section['instructor_name']][course_dept(course['course_name'])] += 1
+    return depts
+
+
+def _first_name_similarity(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    # Nicknames are usually prefixes: Rob/Robert, Jim/Jimmy
+    if len(a) >= 3 and len(b) >= 3 and (a.startswith(b) or b.startswith(a)):
+        return 0.9
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def _dept_score(depts: Counter, rmp_department: Optional[str], affinity: Dict[str, Counter]) -> float:
+    """Share of the instructor's sections whose dept code is usually taught by rmp_department"""
+    if not rmp_department or not depts:
+        return 0.0
+    total = sum(depts.values())
+    matched = 0
+    for dept, count in depts.items():
+        seen = affinity.get(dept)
+        if seen and rmp_department in seen and seen[rmp_department] / sum(seen.values()) >= 0.2:
+            matched += count
+    return matched / total
+
+
+def build_join(courses: List[Dict[str, Any]], teachers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    by_full: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    by_last: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for teacher in teachers:
+        first, last = normalize_name(teacher.get('firstName')), normalize_name(teacher.get('lastName'))
+        teacher = {**teacher, '_first': first, '_last': last}
+        by_full[f"{first} {last}".strip()].append(teacher)
+        if last:
+            by_last[last.split()[-1]].append(teacher)
+
+    depts = instructor_depts(courses)
+
+    # Learn dept code -> RMP department from unambiguous exact matches
+    affinity: Dict[str, Counter] = defaultdict(Counter)
+    for name, taught in depts.items():
+        matches = by_full.get(normalize_name(name), [])
+        if len(matches) == 1 and matches[0].get('department'):
+            for dept, count in taught.items():
+                affinity[dept][matches[0]['department']] += count
+
+    resolved: Dict[str, Dict[str, Any]] = {}
+    unmatched: List[str] = []
+    for name, taught in sorted(depts.items()):
+        match = _resolve(normalize_name(name), taught, by_full, by_last, affinity)
+        if match:
+            teacher, confidence, method = match
+            resolved[name] = {
+                'legacyId': teacher['legacyId'],
+                'id': teacher['id'],
+                'confidence': round(confidence, 3),
+                'method': method,
+            }
+        else:
+            unmatched.append(name)
+
+    return {
+        'version': 1,
+        'instructors': resolved,
+        'unmatched': unmatched,
+    }
+
+
+def _resolve(name: str, taught: Counter, by_full, by_last, affinity) -> Optional[Tuple[Dict[str, Any], float, str]]:
+    exact = by_full.get(name, [])
+    if len(exact) == 1:
+        return exact[0], 1.0, 'exact'
+    if len(exact) > 1:
+        # Prefer the department match, then the profile with more ratings
+        ranked = sorted(exact, key=lambda t: (_dept_score(taught, t.get('department'), affinity),
+                                              t.get('numRatings') or 0), reverse=True)
+        best = ranked[0]
+        dept = _dept_score(taught, best.get('department'), affinity)
+        return best, 0.8 + 0.2 * dept, 'exact+dept'
+
+    parts = name.split()
+    if len(parts) < 2:
+        return None
+    first, last = parts[0], parts[-1]
+    best, best_score = None, 0.0
+    for teacher in by_last.get(last, []):
+        first_score = _first_name_similarity(first, teacher['_first'].split()[0] if teacher['_first'] else '')
+        if first_score < 0.6:
+            continue
+        score = 0.75 * first_score + 0.25 * _dept_score(taught, teacher.get('department'), affinity)
+        if score > best_score:
+            best, best_score = teacher, score
+    if best and best_score >= FUZZY_THRESHOLD:
+        return best, best_score, 'fuzzy'
+    return None
+
+
+def load_join(filename: str = '../data/instructor_rmp.json') -> Dict[str, Dict[str, Any]]:
+    """instructor_name (as in courses.json) -> join record"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)['instructors']
+
+
+def main(courses_file: str = '../data/courses.json', ratings_file: str = '../data/teacher_ratings.json',
+         output_file: str = '../data/instructor_rmp.json'):
+    with open(courses_file, 'r', encoding='utf-8') as f:
+        courses = json.load(f)
+    with open(ratings_file, 'r', encoding='utf-8') as f:
+        teachers = json.load(f)
+
+    join = build_join(courses, teachers)
+    atomic_write_json(output_file, join, indent=2, ensure_ascii=False)
+
+    methods = Counter(r['method'] for r in join['instructors'].values())
+    total = len(join['instructors']) + len(join['unmatched'])
+    print(f"Matched {len(join['instructors'])}/{total} instructors "
+          f"({', '.join(f'{m}: {n}' for m, n in methods.most_common())}), "
+          f"{len(join['unmatched'])} unmatched")
+    print(f"Saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:4])
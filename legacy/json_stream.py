@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON reading and writing for the large pipeline files.
+Reads the members of a top-level object or array one at a time from a
+buffered file, and writes an array item by item, so memory stays bounded
+by the largest single item rather than the whole document.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Iterator, Tuple
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',:]}'
+
+
+class _Reader:
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read another chunk, dropping the consumed prefix of the buffer"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of input)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value, reading more input as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number cut off by the chunk boundary decodes as a shorter one,
+                # so only trust a value that is followed by a delimiter
+                if self.eof or (end < len(self.buf) and self.buf[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iter_object_items(filename: str, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Any]]:
+    """Yield (key, value) pairs of a top-level JSON object"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        reader = _Reader(f, chunk_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            yield key, reader.value()
+            if reader.peek() == ',':
+                reader.pos += 1
+                continue
+            reader.expect('}')
+            return
+
+
+def iter_array_items(filename: str, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the items of a top-level JSON array"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        reader = _Reader(f, chunk_size)
+        reader.expect('[')
+        if reader.peek() == ']':
+            return
+        while True:
+            yield reader.value()
+            if reader.peek() == ',':
+                reader.pos += 1
+                continue
+            reader.expect(']')
+            return
+
+
+class JsonArrayWriter:
+    """Write a JSON array one item at a time, matching json.dump(..., indent=indent).
+    Streams to a temp file beside filename and replaces filename only when the
+    array is complete, so a failed run never leaves a truncated file behind.
+    sha1 is the hex digest of the finished file."""
+
+    def __init__(self, filename: str, indent: int = 2, ensure_ascii: bool = True):
+        self.filename = filename
+        self.tmp_path = os.path.join(os.path.dirname(filename) or '.', f".{os.path.basename(filename)}.{os.getpid()}.tmp")
+        self.indent = indent
+        self.ensure_ascii = ensure_ascii
+        self.count = 0
+        self.sha1 = None
+        self._digest = hashlib.sha1()
+
+    def __enter__(self):
+        self.f = open(self.tmp_path, 'w', encoding='utf-8')
+        self._write('[')
+        return self
+
+    def _write(self, text: str):
+        self.f.write(text)
+        self._digest.update(text.encode('utf-8'))
+
+    def write(self, item: Any):
+        text = json.dumps(item, indent=self.indent, ensure_ascii=self.ensure_ascii)
+        if self.indent is not None:
+            pad = ' ' * self.indent
+            text = '\n' + pad + text.replace('\n', '\n' + pad)
+        self._write((',' if self.count else '') + text)
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                if self.count and self.indent is not None:
+                    self._write('\n')
+                self._write(']')
+                self.sha1 = self._digest.hexdigest()
+                self.f.flush()
+                os.fsync(self.f.fileno())
+            self.f.close()
+            if exc_type is None:
+                os.replace(self.tmp_path, self.filename)
+                fd = os.open(os.path.dirname(self.filename) or '.', os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+        return False
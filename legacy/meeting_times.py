@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Conversions between the display meeting times in courses.json
+("M W", "9:00 AM") and machine-friendly values (day bitmask, minutes since midnight).
+
+Every meeting in courses.json carries both: add_times.py emits
+start_min/end_min, day_mask and building_code next to the display
+strings. Run this file on an older courses.json to add them in place
+without refetching (the file keeps its layout):
+
+  python meeting_times.py ../data/courses.json ../courses.json
+"""
+
+import json
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+# Day codes in the order add_times.py emits them
+DAYS = ['M', 'T', 'W', 'Th', 'F', 'Sa', 'Su']
+DAY_BITS = {day: 1 << i for i, day in enumerate(DAYS)}
+
+
+def days_to_mask(days: str) -> int:
+    """'M W F' -> bitmask (M=1, T=2, W=4, Th=8, F=16, Sa=32, Su=64)"""
+    mask = 0
+    for day in (days or '').split():
+        mask |= DAY_BITS[day]
+    return mask
+
+
+def mask_to_days(mask: int) -> str:
+    return ' '.join(day for day in DAYS if mask & DAY_BITS[day])
+
+
+def parse_clock(text: str) -> Optional[int]:
+    """'9:00 AM' -> 540, '12:30 PM' -> 750; None if not in that format"""
+    try:
+        clock, period = (text or '').split()
+        hour, minute = clock.split(':')
+        hour, minute = int(hour), int(minute)
+    except ValueError:
+        return None
+    if period not in ('AM', 'PM') or not 1 <= hour <= 12 or not 0 <= minute < 60:
+        return None
+    return (hour % 12 + (12 if period == 'PM' else 0)) * 60 + minute
+
+
+def parse_hhmm(text: str) -> Optional[int]:
+    """getSections time '0900' or '900' -> 540, '1200' -> 720; None if not a 24-hour HHMM time"""
+    text = (text or '').strip()
+    if not text.isdigit() or len(text) not in (3, 4):
+        return None
+    hour, minute = divmod(int(text), 100)
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+
+def building_code(building: Optional[str]) -> Optional[str]:
+    """' jkb ' -> 'JKB'; blank -> None"""
+    code = ' '.join((building or '').split()).upper()
+    return code or None
+
+
+def normalize_meeting(meeting: Dict[str, Any]) -> Dict[str, Any]:
+    """The meeting with start_min/end_min, day_mask and building_code derived from its display fields"""
+    return {
+        **meeting,
+        'start_min': parse_clock(meeting.get('start_time')),
+        'end_min': parse_clock(meeting.get('end_time')),
+        'day_mask': days_to_mask(meeting.get('days')),
+        'building_code': building_code(meeting.get('building')),
+    }
+
+
+# Fields normalize_meeting adds; tool results leave them out (see display_section)
+DERIVED_FIELDS = ('start_min', 'end_min', 'day_mask', 'building_code')
+
+
+def display_section(section: Dict[str, Any]) -> Dict[str, Any]:
+    """The section with only the display fields on its meetings, as the chat tools return it"""
+    if not section.get('times'):
+        return section
+    return {**section, 'times': [{k: v for k, v in meeting.items() if k not in DERIVED_FIELDS}
+                                 for meeting in section['times']]}
+
+
+def meeting_minutes(meeting: Dict[str, Any]) -> Tuple[Optional[int], Optional[int], int]:
+    """(start_min, end_min, day_mask), read from the precomputed fields when the meeting has them"""
+    if 'start_min' in meeting:
+        return meeting['start_min'], meeting['end_min'], meeting['day_mask']
+    return (parse_clock(meeting.get('start_time')), parse_clock(meeting.get('end_time')),
+            days_to_mask(meeting.get('days')))
+
+
+def format_clock(minutes: int) -> str:
+    """540 -> '9:00 AM' (inverse of parse_clock)"""
+    hour, minute = divmod(minutes, 60)
+    period = 'AM' if hour < 12 else 'PM'
+    return f"{hour % 12 or 12}:{minute:02d} {period}"
+
+
+def dumps_like(text: str, data: Any) -> str:
+    """Serialize data in the layout of the JSON document `text` (indent width, extra
+    left margin on every line after the first, trailing newline), so a rewrite only
+    shows the values that changed"""
+    lines = text.split('\n', 3)
+    indent, margin = 2, ''
+    if len(lines) > 2 and lines[0].strip() in ('[', '{'):
+        first, second = (len(line) - len(line.lstrip(' ')) for line in lines[1:3])
+        if second > first:
+            indent, margin = second - first, ' ' * max(first - (second - first), 0)
+    out = json.dumps(data, indent=indent, ensure_ascii=text.isascii()).replace('\n', '\n' + margin)
+    return out + '\n' if text.endswith('\n') else out
+
+
+def main(files):
+    from publish import atomic_write_bytes
+
+    for filename in files:
+        with open(filename, 'r', encoding='utf-8') as f:
+            text = f.read()
+        courses = json.loads(text)
+        meetings = 0
+        for course in courses:
+            for section in course['sections']:
+                if section.get('times'):
+                    section['times'] = [normalize_meeting(m) for m in section['times']]
+                    meetings += len(section['times'])
+        atomic_write_bytes(filename, dumps_like(text, courses).encode('utf-8'))
+        print(f"Normalized {meetings} meetings in {filename}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ['../data/courses.json'])
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import json
 
+from publish import atomic_write_json
+
 def parse_classes(filename='classes_full.json'):
     """Parse classes JSON and organize by class code"""
     with open(filename, 'r', encoding='utf-8') as f:
@@ -12,8 +14,7 @@ def parse_classes(filename='classes_full.json'):
 
 def save_parsed(data, filename='parsed_classes.json'):
     """Save parsed data"""
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    atomic_write_json(filename, data, indent=2, ensure_ascii=False)
     print(f"Saved {len(data)} courses to {filename}")
 
 if __name__ == "__main__":
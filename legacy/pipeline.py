@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Single-pass streaming course pipeline.
+Replaces parse_classes.py -> simplify_classes.py -> add_times.py with generator
+stages (load -> project -> enrich -> write) over classes_full.json, so no
+intermediate files are written and only a bounded window of courses is held
+in memory. Each stage's own time is reported separately.
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from add_times import apply_sections, fetch_sections
+from columnar_catalog import CatalogWriter
+from crawl_journal import CrawlJournal
+from http_pool import TokenBucket, make_session
+from json_stream import JsonArrayWriter, iter_object_items
+from simplify_classes import simplify_course
+
+Course = Tuple[str, Dict[str, Any]]
+
+
+class StageTimer:
+    """Times each generator stage; exclusive time excludes upstream stages"""
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+
+    def timed(self, name: str, iterable: Iterable[Any]) -> Iterator[Any]:
+        stage = {'name': name, 'seconds': 0.0, 'items': 0}
+        self.stages.append(stage)
+        return self._measure(stage, iter(iterable))
+
+    def _measure(self, stage: Dict[str, Any], iterator: Iterator[Any]) -> Iterator[Any]:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                stage['seconds'] += time.perf_counter() - start
+                return
+            stage['seconds'] += time.perf_counter() - start
+            stage['items'] += 1
+            yield item
+
+    def report(self) -> str:
+        lines = []
+        upstream = 0.0
+        for stage in self.stages:
+            own = stage['seconds'] - upstream
+            upstream = stage['seconds']
+            lines.append(f"  {stage['name']:<8} {own:8.3f}s  {stage['items']} items")
+        return '\n'.join(lines)
+
+
+def load_stage(filename: str) -> Iterator[Course]:
+    """Stream (course_id, getClasses entry) pairs from classes_full.json"""
+    yield from iter_object_items(filename)
+
+
+def project_stage(courses: Iterable[Course]) -> Iterator[Course]:
+    for course_id, entry in courses:
+        yield course_id, simplify_course(entry)
+
+
+def enrich_stage(courses: Iterable[Course], concurrency: int = 8, rate: float = 8.0,
+                 retries: int = 3, journal: CrawlJournal = None) -> Iterator[Course]:
+    """Attach section times in input order, with at most 4 x concurrency courses buffered"""
+    limiter = TokenBucket(rate, capacity=concurrency)
+    session = make_session(pool_size=concurrency)
+    completed = journal.completed() if journal else set()
+    window = deque()
+
+    def finish(course_id, course, future):
+        if future is None:
+            apply_sections(course, journal.get(course_id))
+            return course_id, course
+        error = future.exception()
+        if error:
+            print(f"Error fetching {course['course_name']}: {error}")
+            if journal:
+                journal.record_failure(course_id, str(error))
+        else:
+            sections_detail = future.result()
+            if journal:
+                journal.record_success(course_id, sections_detail)
+            apply_sections(course, sections_detail)
+        return course_id, course
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for course_id, course in courses:
+            future = None
+            if course_id not in completed:
+                future = executor.submit(fetch_sections, session, course_id, limiter, retries)
+            window.append((course_id, course, future))
+            if len(window) >= concurrency * 4:
+                yield finish(*window.popleft())
+        while window:
+            yield finish(*window.popleft())
+
+
+def write_stage(courses: Iterable[Course], filename: str, columnar: str = None) -> Iterator[int]:
+    """Write courses as they arrive (and optionally a .cols catalog); yields the count when done"""
+    catalog = CatalogWriter() if columnar else None
+    with JsonArrayWriter(filename) as writer:
+        for _, course in courses:
+            writer.write(course)
+            if catalog:
+                catalog.add(course)
+    if catalog:
+        catalog.write(columnar, source_sha1=writer.sha1)
+    yield writer.count
+
+
+def run(input_file: str, output_file: str, concurrency: int = 8, rate: float = 8.0,
+        retries: int = 3, journal: CrawlJournal = None, fetch: bool = True,
+        columnar: str = None) -> StageTimer:
+    timer = StageTimer()
+    courses = timer.timed('load', load_stage(input_file))
+    courses = timer.timed('project', project_stage(courses))
+    if fetch:
+        courses = timer.timed('enrich', enrich_stage(courses, concurrency, rate, retries, journal))
+    for _ in timer.timed('write', write_stage(courses, output_file, columnar)):
+        pass
+    return timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream classes_full.json into the final courses file")
+    parser.add_argument('--input', default='classes_full.json')
+    parser.add_argument('--output', default='simplified_courses_with_times_final.json')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=8.0)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--checkpoint', default='add_times.checkpoint.jsonl')
+    parser.add_argument('--no-fetch', action='store_true', help="skip the getSections enrichment stage")
+    parser.add_argument('--columnar', metavar='PATH', help="also write a columnar .cols catalog")
+    parser.add_argument('--trace-memory', action='store_true', help="report peak Python heap usage")
+    args = parser.parse_args()
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    journal = None if args.no_fetch else CrawlJournal(args.checkpoint)
+    timer = run(args.input, args.output, args.concurrency, args.rate, args.retries,
+                journal=journal, fetch=not args.no_fetch, columnar=args.columnar)
+
+    print(f"Wrote {args.output}")
+    print("Stage timings (exclusive):")
+    print(timer.report())
+    if args.trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        print(f"Peak memory: {peak / 1024 / 1024:.1f} MiB")
+
+    if journal:
+        if journal.failed():
+            journal.close()
+            print(f"Some courses failed; re-run to retry them (progress kept in {args.checkpoint})")
+        else:
+            journal.discard()
+
+
+if __name__ == "__main__":
+    main()
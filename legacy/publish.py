@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Atomic, versioned publishing of the pipeline outputs.
+
+atomic_write_json() replaces a file so readers see the old document or
+the new one, never a truncated one: write a temp file in the same
+directory, fsync it, rename it over the target, fsync the directory.
+
+publish() turns a finished output into an immutable version and installs
+it where the app reads it (the hand copy into data/ and the repo root):
+
+  ../data/published/courses/
+    v000012/courses.json
+    v000013/courses.json
+    current.json          {"version": 13, "sha1": ..., "path": "v000013/courses.json", ...}
+
+The version directory is staged under a temp name and renamed into place,
+then current.json is flipped, then the install targets are replaced
+atomically and everything derived from them is rebuilt (rebuild_derived:
+search index, columnar catalog, instructor join, assignment index, the
+SQLite store), so no reader is left on an artifact of the old version.
+Publishing a file identical to the current version is a
+no-op (nothing is rebuilt unless an install target had drifted from it), so
+readers keyed on (version, sha1) never re-parse unchanged data.
+The newest --keep versions are retained; rolling back is publishing an
+old version's file again.
+
+Usage:
+  python publish.py courses simplified_courses_with_times_final.json
+  python publish.py teacher_ratings byu_professors.json --keep 3
+  python publish.py status
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+PUBLISH_ROOT = '../data/published'
+DEFAULT_KEEP = 5
+
+# dataset -> where the app and the repo expect its current version
+DATASETS = {
+    'courses': ['../data/courses.json', '../courses.json'],
+    'teacher_ratings': ['../data/teacher_ratings.json', '../byu_professors.json'],
+    'current_assignments': ['../data/current_assignments.json', '../current_assignments.json'],
+}
+
+
+def _fsync_dir(directory: str):
+    fd = os.open(directory or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    directory = os.path.dirname(path) or '.'
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _fsync_dir(directory)
+
+
+def atomic_write_json(path: str, data: Any, **dump_kwargs):
+    """json.dump(data, open(path, 'w'), **dump_kwargs), but all-or-nothing"""
+    atomic_write_bytes(path, json.dumps(data, **dump_kwargs).encode('utf-8'))
+
+
+def atomic_copy(source: str, target: str):
+    with open(source, 'rb') as f:
+        atomic_write_bytes(target, f.read())
+
+
+def _sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dataset_dir(dataset: str, root: str = PUBLISH_ROOT) -> str:
+    return os.path.join(root, dataset)
+
+
+def current(dataset: str, root: str = PUBLISH_ROOT) -> Optional[Dict[str, Any]]:
+    """The current.json pointer of a dataset, or None if never published"""
+    try:
+        with open(os.path.join(dataset_dir(dataset, root), 'current.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def current_path(dataset: str, root: str = PUBLISH_ROOT) -> Optional[str]:
+    pointer = current(dataset, root)
+    return os.path.join(dataset_dir(dataset, root), pointer['path']) if pointer else None
+
+
+def versions(dataset: str, root: str = PUBLISH_ROOT) -> List[int]:
+    directory = dataset_dir(dataset, root)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(name[1:]) for name in os.listdir(directory) if name.startswith('v') and name[1:].isdigit())
+
+
+@contextmanager
+def _locked(directory: str):
+    """One publisher per dataset at a time"""
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def publish(dataset: str, source_file: str, root: str = PUBLISH_ROOT, keep: int = DEFAULT_KEEP,
+            install: bool = True) -> Dict[str, Any]:
+    """Publish source_file as the next version of dataset; returns the current pointer"""
+    directory = dataset_dir(dataset, root)
+    os.makedirs(directory, exist_ok=True)
+    sha1 = _sha1(source_file)
+    with _locked(directory):
+        pointer = current(dataset, root)
+        changed = not (pointer and pointer['sha1'] == sha1)
+        if not changed:
+            print(f"{dataset}: unchanged, still version {pointer['version']}")
+        else:
+            version = max(versions(dataset, root), default=0) + 1
+            name = f"v{version:06d}"
+            filename = f"{dataset}.json"
+            staging = os.path.join(directory, f".{name}.tmp")
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            atomic_copy(source_file, os.path.join(staging, filename))
+            os.rename(staging, os.path.join(directory, name))
+            _fsync_dir(directory)
+
+            pointer = {'version': version, 'sha1': sha1, 'path': f"{name}/{filename}",
+                       'bytes': os.path.getsize(source_file), 'source': os.path.abspath(source_file),
+                       'published_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+            atomic_write_json(os.path.join(directory, 'current.json'), pointer, indent=2)
+            print(f"{dataset}: published version {version} ({pointer['bytes']} bytes)")
+            prune(dataset, root, keep)
+
+        if install:
+            published = os.path.join(directory, pointer['path'])
+            for target in DATASETS.get(dataset, []):
+                if not os.path.exists(target) or _sha1(target) != sha1:
+                    atomic_copy(published, target)
+                    print(f"  installed {target}")
+                    changed = True
+            if changed:
+                rebuild_derived(dataset)
+    return pointer
+
+
+def rebuild_derived(dataset: str):
+    """Rebuild the data/ artifacts computed from a dataset's installed copy"""
+    # Imported here because these modules import publish for atomic_write_json
+    import store
+    if dataset == 'courses':
+        import build_search_index
+        import columnar_catalog
+        build_search_index.main(DATASETS['courses'][0])
+        columnar_catalog.build_file(DATASETS['courses'][0], '../data/courses.cols')
+        print("  rebuilt ../data/courses.cols")
+    if dataset in ('courses', 'teacher_ratings'):
+        import instructor_join
+        instructor_join.main(DATASETS['courses'][0], DATASETS['teacher_ratings'][0])
+    if dataset == 'current_assignments':
+        from assignment_index import write_index
+        print(f"  rebuilt {write_index(DATASETS['current_assignments'][0])}")
+    counts = store.build(courses_file=DATASETS['courses'][0], ratings_file=DATASETS['teacher_ratings'][0],
+                         assignments_file=DATASETS['current_assignments'][0])
+    print(f"  rebuilt ../data/store.sqlite ({counts['courses']} courses)")
+
+
+def prune(dataset: str, root: str = PUBLISH_ROOT, keep: int = DEFAULT_KEEP) -> List[int]:
+    """Delete all but the newest `keep` versions (never the current one); returns what was removed"""
+    pointer = current(dataset, root)
+    removed = []
+    for version in versions(dataset, root)[:-keep] if keep > 0 else []:
+        if pointer and version == pointer['version']:
+            continue
+        shutil.rmtree(os.path.join(dataset_dir(dataset, root), f"v{version:06d}"))
+        removed.append(version)
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish a pipeline output as a new data version")
+    parser.add_argument('dataset', help=f"one of {', '.join(DATASETS)}, or 'status'")
+    parser.add_argument('file', nargs='?', help="the finished output to publish")
+    parser.add_argument('--root', default=PUBLISH_ROOT)
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP, help="versions to retain")
+    parser.add_argument('--no-install', action='store_true', help="don't replace the data/ and repo-root copies")
+    args = parser.parse_args()
+
+    if args.dataset == 'status':
+        for dataset in DATASETS:
+            pointer = current(dataset, args.root)
+            print(f"{dataset:22} " + (f"version {pointer['version']} ({pointer['published_at']}, "
+                                      f"{len(versions(dataset, args.root))} kept)" if pointer else "never published"))
+        return
+    if args.dataset not in DATASETS or not args.file:
+        parser.error(f"usage: publish.py {{{','.join(DATASETS)}}} FILE")
+    publish(args.dataset, args.file, args.root, args.keep, install=not args.no_install)
+
+
+if __name__ == "__main__":
+    main()
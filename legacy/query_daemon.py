@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Resident query server for the chat tools.
+
+Loads the pipeline outputs (data/courses.json, teacher_ratings.json,
+current_assignments.json, instructor_rmp.json) once into an in-memory
+store.py database plus the schedule_search candidates, and answers tool
+calls over localhost HTTP or a Unix socket, so no request pays for
+parsing JSON from disk:
+
+  POST /query   {"tool": "search_courses", "args": {"course_code": "MATH 3"}, "bounded": true}
+                -> {"result": ..., "snapshot": 3}
+  POST /batch   [{"tool": ..., "args": ..., "bounded": true}, ...]
+                -> {"results": [{"result": ...} | {"error": ...}], "snapshot": 3}
+  GET  /health  snapshot version, load time, source mtimes, request counts,
+                published data versions (publish.py)
+  POST /reload  rebuild now
+
+Tools: search_courses, get_teacher_ratings, get_assignments (same results
+as the routes; with "bounded": true, or any of limit/fields/cursor/summary/
+max_bytes in args, a budget-bounded page from tool_results.py instead; the
+routes always ask for bounded pages), build_schedule, and query_events,
+get_category_event_counts, get_event_categories (through events_sync.py's
+cache).
+
+Snapshots are immutable. A watcher polls the source files and, once they
+have stopped changing, builds a new snapshot off to the side and swaps the
+reference; each request (and each whole batch) reads the snapshot it
+started with, so readers never take a lock and never see a half-loaded
+state. A failed rebuild keeps serving the old snapshot.
+
+Usage:
+  python query_daemon.py                           # http://127.0.0.1:8766
+  python query_daemon.py --socket /tmp/fysa.sock   # Unix socket instead
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from events_sync import EventsSync, MAX_DATE, MIN_DATE
+from publish import DATASETS, current
+from schedule_search import load_ratings, top_k
+from store import Store, TOOLS, build
+from tool_results import SHAPING_ARGS, run_tool
+
+SOURCES = {
+    'courses_file': '../data/courses.json',
+    'ratings_file': '../data/teacher_ratings.json',
+    'assignments_file': '../data/current_assignments.json',
+    'join_file': '../data/instructor_rmp.json',
+}
+
+
+def source_mtimes(sources: Dict[str, str]) -> Dict[str, Optional[float]]:
+    return {path: (os.path.getmtime(path) if os.path.exists(path) else None) for path in sources.values()}
+
+
+class Snapshot:
+    """Everything one version of the data answers queries from"""
+
+    def __init__(self, version: int, sources: Dict[str, str]):
+        self.version = version
+        self.mtimes = source_mtimes(sources)
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'store.sqlite')
+            build(path, **sources)
+            self.store = Store(path, in_memory=True)
+        with open(sources['courses_file'], 'r', encoding='utf-8') as f:
+            self.courses = json.load(f)
+        self.ratings = load_ratings(sources['ratings_file'], sources['join_file'])
+        self.loaded_at = time.time()
+        self.load_seconds = round(time.perf_counter() - started, 2)
+
+
+class QueryService:
+    def __init__(self, sources: Dict[str, str] = SOURCES, events: Optional[EventsSync] = None):
+        self.sources = sources
+        self.events = events
+        self.snapshot = Snapshot(1, sources)
+        self.reload_lock = threading.Lock()
+        self.counts_lock = threading.Lock()
+        self.counts = {'queries': 0, 'batches': 0, 'errors': 0, 'reloads': 0, 'reload_failures': 0}
+
+    def count(self, key: str):
+        """Bump a request counter; handler threads share them"""
+        with self.counts_lock:
+            self.counts[key] += 1
+
+    def reload(self) -> bool:
+        """Build a new snapshot and swap it in; False (old one kept) on failure"""
+        with self.reload_lock:
+            try:
+                fresh = Snapshot(self.snapshot.version + 1, self.sources)
+            except Exception as e:
+                self.count('reload_failures')
+                print(f"Reload failed, still serving snapshot {self.snapshot.version}: {e}")
+                return False
+            self.snapshot = fresh
+            self.count('reloads')
+            print(f"Loaded snapshot {fresh.version} in {fresh.load_seconds}s")
+            return True
+
+    def watch(self, interval: float, stop: threading.Event):
+        """Reload once the sources have changed and then held still for one interval"""
+        seen = failed = self.snapshot.mtimes
+        while not stop.wait(interval):
+            current = source_mtimes(self.sources)
+            if current != seen:
+                seen = current
+                continue
+            if current != self.snapshot.mtimes and current != failed and not self.reload():
+                failed = current
+
+    def call(self, snapshot: Snapshot, tool: str, args: Dict[str, Any], bounded: bool = False) -> Any:
+        if tool in TOOLS:
+            if bounded or any(key in args for key in SHAPING_ARGS):
+                return run_tool(snapshot.store, tool, args)
+            return getattr(snapshot.store, tool)(**args)
+        if tool == 'build_schedule':
+            return top_k(args['courses'], snapshot.courses, snapshot.ratings, k=args.get('k', 5),
+                         time_budget=args.get('time_budget', 2.0), weights=args.get('weights'))
+        if tool in ('query_events', 'get_category_event_counts', 'get_event_categories'):
+            return self.call_events(tool, args)
+        raise ValueError(f"unknown tool {tool!r}")
+
+    def call_events(self, tool: str, args: Dict[str, Any]) -> Any:
+        if self.events is None:
+            raise ValueError("events tools are disabled (started with --no-events)")
+        if tool == 'get_event_categories':
+            return self.events.all_categories()[0]
+        params = []
+        if tool == 'query_events':
+            params.append(('categories', '+'.join(map(str, args['category'])) if args.get('category') else 'all'))
+        if args.get('start_date'):
+            params.append((MIN_DATE, args['start_date']))
+        if args.get('end_date'):
+            params.append((MAX_DATE, args['end_date']))
+        if args.get('price') is not None:
+            params.append(('price', str(args['price'])))
+        if tool == 'query_events':
+            return self.events.events(params)[0]
+        return self.events.category_counts(params)[0]
+
+    def query(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        snapshot = self.snapshot
+        self.count('queries')
+        result = self.call(snapshot, request['tool'], request.get('args') or {}, bool(request.get('bounded')))
+        return {'result': result, 'snapshot': snapshot.version}
+
+    def batch(self, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Answer every request from one snapshot; identical requests are computed once"""
+        snapshot = self.snapshot
+        self.count('batches')
+        answered: Dict[str, Dict[str, Any]] = {}
+        results = []
+        for request in requests:
+            key = json.dumps(request, sort_keys=True)
+            if key not in answered:
+                self.count('queries')
+                try:
+                    answered[key] = {'result': self.call(snapshot, request['tool'], request.get('args') or {},
+                                                         bool(request.get('bounded')))}
+                except Exception as e:
+                    self.count('errors')
+                    answered[key] = {'error': f"{type(e).__name__}: {e}"}
+            results.append(answered[key])
+        return {'results': results, 'snapshot': snapshot.version}
+
+    def health(self) -> Dict[str, Any]:
+        snapshot = self.snapshot
+        with self.counts_lock:
+            counts = dict(self.counts)
+        return {'snapshot': snapshot.version, 'loaded_at': snapshot.loaded_at, 'load_seconds': snapshot.load_seconds,
+                'sources': snapshot.mtimes, **counts,
+                'published': {dataset: (current(dataset) or {}).get('version') for dataset in DATASETS}}
+
+
+def make_handler(service: QueryService):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/health':
+                return self.reply(200, service.health())
+            self.reply(404, {'error': f"unknown path {self.path}"})
+
+        def do_POST(self):
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'null')
+                if self.path == '/query':
+                    return self.reply(200, service.query(body))
+                if self.path == '/batch':
+                    return self.reply(200, service.batch(body))
+                if self.path == '/reload':
+                    return self.reply(200, {'reloaded': service.reload(), 'snapshot': service.snapshot.version})
+                self.reply(404, {'error': f"unknown path {self.path}"})
+            except (ValueError, KeyError, TypeError) as e:
+                service.count('errors')
+                self.reply(400, {'error': f"{type(e).__name__}: {e}"})
+            except Exception as e:
+                service.count('errors')
+                self.reply(500, {'error': f"{type(e).__name__}: {e}"})
+
+        def reply(self, status: int, body: Any):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def address_string(self):
+            return str(self.client_address[0]) if self.client_address else 'unix'
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the chat tools from memory")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--socket', help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('--poll', type=float, default=2.0, help="seconds between source file checks (0 disables)")
+    parser.add_argument('--no-events', action='store_true', help="don't serve the BYU events tools")
+    parser.add_argument('--events-cache-dir', default='events_cache')
+    args = parser.parse_args()
+
+    events = None if args.no_events else EventsSync(cache_dir=args.events_cache_dir)
+    service = QueryService(SOURCES, events)
+    print(f"Loaded snapshot 1 in {service.snapshot.load_seconds}s")
+
+    stop = threading.Event()
+    if args.poll > 0:
+        threading.Thread(target=service.watch, args=(args.poll, stop), daemon=True).start()
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = UnixHTTPServer(args.socket, make_handler(service))
+        print(f"Serving on unix:{args.socket}")
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+        print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Lazy expansion of recurring iCal events (RRULE, RDATE, EXDATE).
+
+Works on the event dicts parse_event() in fetch_class_calendar.py produces.
+Occurrences come out of dateutil's rruleset in order and only the ones
+inside the requested window are yielded; iteration stops at the window end,
+so an open-ended rule ("every Tuesday", no UNTIL) never gets materialized
+past it.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, Iterator, Optional
+from zoneinfo import ZoneInfo
+
+from dateutil.rrule import rruleset, rrulestr
+
+
+def is_recurring(event: Dict[str, Any]) -> bool:
+    return bool(event.get('rrule') or event.get('rdate'))
+
+
+def _parse(value: str, tz) -> datetime:
+    """ISO date or datetime string -> datetime in tz (naive when tz is None)"""
+    parsed = datetime.fromisoformat(value)
+    if tz is None:
+        return parsed.replace(tzinfo=None)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=tz)
+    return parsed.astimezone(tz)
+
+
+def occurrences(dtstart: datetime, rrule: Optional[str], rdates: Iterable[datetime],
+                exdates: Iterable[datetime], window_start: datetime, window_end: datetime) -> Iterator[datetime]:
+    """Start times in [window_start, window_end), in order. DTSTART itself always counts."""
+    rset = rruleset()
+    if rrule:
+        rset.rrule(rrulestr(rrule, dtstart=dtstart, ignoretz=dtstart.tzinfo is None))
+    rset.rdate(dtstart)
+    for rdate in rdates:
+        rset.rdate(rdate)
+    for exdate in exdates:
+        rset.exdate(exdate)
+    for occurrence in rset.xafter(window_start, inc=True):
+        if occurrence >= window_end:
+            return
+        yield occurrence
+
+
+def expand_event(event: Dict[str, Any], window_start: date, window_end: date) -> Iterator[Dict[str, Any]]:
+    """One copy of the event per occurrence starting in [window_start, window_end).
+
+    dtstart/dtend are shifted to each occurrence (keeping the event's duration)
+    and recurrence_id is the original occurrence start. Times are expanded in the
+    event's TZID, so a weekly 9:00 stays at 9:00 across daylight-saving changes.
+    """
+    all_day = 'T' not in event['dtstart']
+    tz = ZoneInfo(event['tzid']) if event.get('tzid') else None
+    if tz is None and not all_day:
+        tz = datetime.fromisoformat(event['dtstart']).tzinfo
+    dtstart = _parse(event['dtstart'], tz)
+    duration = _parse(event['dtend'], tz) - dtstart if event.get('dtend') else timedelta(0)
+
+    start = datetime.combine(window_start, time(), tzinfo=tz)
+    end = datetime.combine(window_end, time(), tzinfo=tz)
+    rdates = (_parse(value, tz) for value in event.get('rdate', []))
+    exdates = [_parse(value, tz) for value in event.get('exdate', [])]
+
+    stamp = (lambda dt: dt.date().isoformat()) if all_day else (lambda dt: dt.isoformat())
+    for occurrence in occurrences(dtstart, event.get('rrule'), rdates, exdates, start, end):
+        copy = {**event, 'dtstart': stamp(occurrence), 'recurrence_id': stamp(occurrence)}
+        if event.get('dtend'):
+            copy['dtend'] = stamp(occurrence + duration)
+        for key in ('rrule', 'rdate', 'exdate'):
+            copy.pop(key, None)
+        yield copy
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+On-disk JSON response cache with a TTL.
+One file per key (named by the key's sha1) holding the response and the
+time it was fetched, so interrupted runs keep everything fetched so far.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Optional
+
+
+class ResponseCache:
+    def __init__(self, directory: str, ttl: float):
+        """ttl is in seconds; entries older than that count as stale"""
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached response if present and fresh, else None"""
+        entry = self.entry(key)
+        if entry is None or time.time() - entry['fetched_at'] > self.ttl:
+            return None
+        return entry['response']
+
+    def entry(self, key: str) -> Optional[dict]:
+        """Return the raw cache entry ({key, fetched_at, response}) regardless of age"""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, response: Any):
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'fetched_at': time.time(), 'response': response}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
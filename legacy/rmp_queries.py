@@ -0,0 +1,718 @@
+#!/usr/bin/env python3
+"""
+GraphQL query profiles for the RateMyProfessors scrapers.
+
+Each profile is the smallest field set one job needs, instead of the
+fragments the RMP web app asks for (notes, thumbs, bookmarks, related
+teachers, search filters...):
+
+  card          teacher summary: name, department, ratings averages
+  ratings-full  one page of a teacher's ratings with every rating field
+  tags-only     a teacher's rating tags and their counts
+  search-card   one page of the school's teacher search, card fields only
+  search-departments  the search's department filter options (for sharding)
+
+The original web-app queries are kept as "page" and "search-full" for
+reproducing old dumps. QueryStats records response size and latency per
+profile so the savings can be measured.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+
+from http_pool import TokenBucket, request_with_retry
+
+URL = "https://www.ratemyprofessors.com/graphql"
+
+_CARD_FIELDS = """
+  id
+  legacyId
+  firstName
+  lastName
+  department
+  avgRating
+  avgDifficulty
+  numRatings
+  wouldTakeAgainPercent
+  school {
+    name
+    id
+  }
+"""
+
+CARD_QUERY = """query TeacherCardQuery($id: ID!) {
+  node(id: $id) {
+    __typename
+    ... on Teacher {""" + _CARD_FIELDS + """    }
+  }
+}
+"""
+
+RATINGS_FULL_QUERY = """query RatingsListQuery(
+  $id: ID!
+  $count: Int!
+  $cursor: String
+) {
+  node(id: $id) {
+    __typename
+    ... on Teacher {
+      id
+      legacyId
+      numRatings
+      ratings(first: $count, after: $cursor) {
+        edges {
+          cursor
+          node {
+            id
+            legacyId
+            date
+            class
+            comment
+            helpfulRating
+            clarityRating
+            difficultyRating
+            ratingTags
+            grade
+            wouldTakeAgain
+            attendanceMandatory
+            textbookUse
+            isForOnlineClass
+            isForCredit
+            thumbsUpTotal
+            thumbsDownTotal
+          }
+        }
+        pageInfo {
+          hasNextPage
+          endCursor
+        }
+      }
+    }
+  }
+}
+"""
+
+TAGS_ONLY_QUERY = """query TeacherTagsQuery($id: ID!) {
+  node(id: $id) {
+    __typename
+    ... on Teacher {
+      id
+      legacyId
+      teacherRatingTags {
+        tagName
+        tagCount
+      }
+    }
+  }
+}
+"""
+
+SEARCH_CARD_QUERY = """query TeacherSearchPaginationQuery(
+  $count: Int!
+  $cursor: String
+  $query: TeacherSearchQuery!
+) {
+  search: newSearch {
+    teachers(query: $query, first: $count, after: $cursor) {
+      edges {
+        node {""" + _CARD_FIELDS + """        }
+      }
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      resultCount
+    }
+  }
+}
+"""
+
+SEARCH_DEPARTMENTS_QUERY = """query TeacherSearchFiltersQuery($query: TeacherSearchQuery!) {
+  search: newSearch {
+    teachers(query: $query, first: 1) {
+      resultCount
+      filters {
+        field
+        options {
+          value
+          id
+        }
+      }
+    }
+  }
+}
+"""
+
+# The queries the RMP web app sends, as originally copied into get_reviews.py and scrape_rmp.py
+PAGE_QUERY = """query TeacherRatingsPageQuery(
+  $id: ID!
+) {
+  node(id: $id) {
+    __typename
+    ... on Teacher {
+      id
+      legacyId
+      firstName
+      lastName
+      department
+      school {
+        legacyId
+        name
+        city
+        state
+        country
+        id
+      }
+      lockStatus
+      ...StickyHeaderContent_teacher
+      ...MiniStickyHeader_teacher
+      ...TeacherBookmark_teacher
+      ...RatingDistributionWrapper_teacher
+      ...TeacherInfo_teacher
+      ...SimilarProfessors_teacher
+      ...TeacherRatingTabs_teacher
+    }
+    id
+  }
+}
+
+fragment CompareProfessorLink_teacher on Teacher {
+  legacyId
+}
+
+fragment CourseMeta_rating on Rating {
+  attendanceMandatory
+  wouldTakeAgain
+  grade
+  textbookUse
+  isForOnlineClass
+  isForCredit
+}
+
+fragment HeaderDescription_teacher on Teacher {
+  id
+  legacyId
+  firstName
+  lastName
+  department
+  school {
+    legacyId
+    name
+    city
+    state
+    id
+  }
+  ...TeacherTitles_teacher
+  ...TeacherBookmark_teacher
+  ...RateTeacherLink_teacher
+  ...CompareProfessorLink_teacher
+}
+
+fragment HeaderRateButton_teacher on Teacher {
+  ...RateTeacherLink_teacher
+  ...CompareProfessorLink_teacher
+}
+
+fragment MiniStickyHeader_teacher on Teacher {
+  id
+  legacyId
+  firstName
+  lastName
+  department
+  departmentId
+  school {
+    legacyId
+    name
+    city
+    state
+    id
+  }
+  ...TeacherBookmark_teacher
+  ...RateTeacherLink_teacher
+  ...CompareProfessorLink_teacher
+}
+
+fragment NameLink_teacher on Teacher {
+  isProfCurrentUser
+  id
+  legacyId
+  firstName
+  lastName
+  school {
+    name
+    id
+  }
+}
+
+fragment NameTitle_teacher on Teacher {
+  id
+  firstName
+  lastName
+  department
+  school {
+    legacyId
+    name
+    id
+  }
+  ...TeacherDepartment_teacher
+  ...TeacherBookmark_teacher
+}
+
+fragment NoRatingsArea_teacher on Teacher {
+  lastName
+  ...RateTeacherLink_teacher
+}
+
+fragment NumRatingsLink_teacher on Teacher {
+  numRatings
+  ...RateTeacherLink_teacher
+}
+
+fragment ProfessorNoteEditor_rating on Rating {
+  id
+  legacyId
+  class
+  teacherNote {
+    id
+    teacherId
+    comment
+  }
+}
+
+fragment ProfessorNoteEditor_teacher on Teacher {
+  id
+}
+
+fragment ProfessorNoteFooter_note on TeacherNotes {
+  legacyId
+  flagStatus
+}
+
+fragment ProfessorNoteFooter_teacher on Teacher {
+  legacyId
+  isProfCurrentUser
+}
+
+fragment ProfessorNoteHeader_note on TeacherNotes {
+  createdAt
+  updatedAt
+}
+
+fragment ProfessorNoteHeader_teacher on Teacher {
+  lastName
+}
+
+fragment ProfessorNoteSection_rating on Rating {
+  teacherNote {
+    ...ProfessorNote_note
+    id
+  }
+  ...ProfessorNoteEditor_rating
+}
+
+fragment ProfessorNoteSection_teacher on Teacher {
+  ...ProfessorNote_teacher
+  ...ProfessorNoteEditor_teacher
+}
+
+fragment ProfessorNote_note on TeacherNotes {
+  comment
+  ...ProfessorNoteHeader_note
+  ...ProfessorNoteFooter_note
+}
+
+fragment ProfessorNote_teacher on Teacher {
+  ...ProfessorNoteHeader_teacher
+  ...ProfessorNoteFooter_teacher
+}
+
+fragment RateTeacherLink_teacher on Teacher {
+  legacyId
+  numRatings
+  lockStatus
+}
+
+fragment RatingDistributionChart_ratingsDistribution on ratingsDistribution {
+  r1
+  r2
+  r3
+  r4
+  r5
+}
+
+fragment RatingDistributionWrapper_teacher on Teacher {
+  ...NoRatingsArea_teacher
+  ratingsDistribution {
+    total
+    ...RatingDistributionChart_ratingsDistribution
+  }
+}
+
+fragment RatingFooter_rating on Rating {
+  id
+  comment
+  adminReviewedAt
+  flagStatus
+  legacyId
+  thumbsUpTotal
+  thumbsDownTotal
+  thumbs {
+    thumbsUp
+    thumbsDown
+    computerId
+    id
+  }
+  teacherNote {
+    id
+  }
+  ...Thumbs_rating
+}
+
+fragment RatingFooter_teacher on Teacher {
+  id
+  legacyId
+  lockStatus
+  isProfCurrentUser
+  ...Thumbs_teacher
+}
+
+fragment RatingHeader_rating on Rating {
+  legacyId
+  date
+  class
+  helpfulRating
+  clarityRating
+  isForOnlineClass
+}
+
+fragment RatingSuperHeader_rating on Rating {
+  legacyId
+}
+
+fragment RatingSuperHeader_teacher on Teacher {
+  firstName
+  lastName
+  legacyId
+  school {
+    name
+    id
+  }
+}
+
+fragment RatingTags_rating on Rating {
+  ratingTags
+}
+
+fragment RatingValue_teacher on Teacher {
+  avgRating
+  numRatings
+  ...NumRatingsLink_teacher
+}
+
+fragment RatingValues_rating on Rating {
+  helpfulRating
+  clarityRating
+  difficultyRating
+}
+
+fragment Rating_rating on Rating {
+  comment
+  flagStatus
+  createdByUser
+  teacherNote {
+    id
+  }
+  ...RatingHeader_rating
+  ...RatingSuperHeader_rating
+  ...RatingValues_rating
+  ...CourseMeta_rating
+  ...RatingTags_rating
+  ...RatingFooter_rating
+  ...ProfessorNoteSection_rating
+}
+
+fragment Rating_teacher on Teacher {
+  ...RatingFooter_teacher
+  ...RatingSuperHeader_teacher
+  ...ProfessorNoteSection_teacher
+}
+
+fragment RatingsFilter_teacher on Teacher {
+  courseCodes {
+    courseCount
+    courseName
+  }
+}
+
+fragment RatingsList_teacher on Teacher {
+  id
+  legacyId
+  lastName
+  numRatings
+  school {
+    id
+    legacyId
+    name
+    city
+    state
+    avgRating
+    numRatings
+  }
+  ...Rating_teacher
+  ...NoRatingsArea_teacher
+  ratings(first: 5) {
+    edges {
+      cursor
+      node {
+        ...Rating_rating
+        id
+        __typename
+      }
+    }
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+  }
+}
+
+fragment SimilarProfessorListItem_teacher on RelatedTeacher {
+  legacyId
+  firstName
+  lastName
+  avgRating
+}
+
+fragment SimilarProfessors_teacher on Teacher {
+  department
+  relatedTeachers {
+    legacyId
+    ...SimilarProfessorListItem_teacher
+    id
+  }
+}
+
+fragment StickyHeaderContent_teacher on Teacher {
+  ...HeaderDescription_teacher
+  ...HeaderRateButton_teacher
+  ...MiniStickyHeader_teacher
+}
+
+fragment TeacherBookmark_teacher on Teacher {
+  id
+  isSaved
+}
+
+fragment TeacherDepartment_teacher on Teacher {
+  department
+  departmentId
+  school {
+    legacyId
+    name
+    isVisible
+    id
+  }
+}
+
+fragment TeacherFeedback_teacher on Teacher {
+  numRatings
+  avgDifficulty
+  wouldTakeAgainPercent
+}
+
+fragment TeacherInfo_teacher on Teacher {
+  id
+  lastName
+  numRatings
+  ...RatingValue_teacher
+  ...NameTitle_teacher
+  ...TeacherTags_teacher
+  ...NameLink_teacher
+  ...TeacherFeedback_teacher
+  ...RateTeacherLink_teacher
+  ...CompareProfessorLink_teacher
+}
+
+fragment TeacherRatingTabs_teacher on Teacher {
+  numRatings
+  courseCodes {
+    courseName
+    courseCount
+  }
+  ...RatingsList_teacher
+  ...RatingsFilter_teacher
+}
+
+fragment TeacherTags_teacher on Teacher {
+  lastName
+  teacherRatingTags {
+    legacyId
+    tagCount
+    tagName
+    id
+  }
+}
+
+fragment TeacherTitles_teacher on Teacher {
+  department
+  school {
+    legacyId
+    name
+    id
+  }
+}
+
+fragment Thumbs_rating on Rating {
+  id
+  comment
+  adminReviewedAt
+  flagStatus
+  legacyId
+  thumbsUpTotal
+  thumbsDownTotal
+  thumbs {
+    computerId
+    thumbsUp
+    thumbsDown
+    id
+  }
+  teacherNote {
+    id
+  }
+}
+
+fragment Thumbs_teacher on Teacher {
+  id
+  legacyId
+  lockStatus
+  isProfCurrentUser
+}
+"""
+
+SEARCH_FULL_QUERY = """query TeacherSearchPaginationQuery(
+  $count: Int!
+  $cursor: String
+  $query: TeacherSearchQuery!
+) {
+  search: newSearch {
+    ...TeacherSearchPagination_search_1jWD3d
+  }
+}
+
+fragment CardFeedback_teacher on Teacher {
+  wouldTakeAgainPercent
+  avgDifficulty
+}
+
+fragment CardName_teacher on Teacher {
+  firstName
+  lastName
+}
+
+fragment CardSchool_teacher on Teacher {
+  department
+  school {
+    name
+    id
+  }
+}
+
+fragment TeacherBookmark_teacher on Teacher {
+  id
+  isSaved
+}
+
+fragment TeacherCard_teacher on Teacher {
+  id
+  legacyId
+  avgRating
+  numRatings
+  ...CardFeedback_teacher
+  ...CardSchool_teacher
+  ...CardName_teacher
+  ...TeacherBookmark_teacher
+}
+
+fragment TeacherSearchPagination_search_1jWD3d on newSearch {
+  teachers(query: $query, first: $count, after: $cursor) {
+    didFallback
+    edges {
+      cursor
+      node {
+        ...TeacherCard_teacher
+        id
+        __typename
+      }
+    }
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+    resultCount
+    filters {
+      field
+      options {
+        value
+        id
+      }
+    }
+  }
+}
+"""
+
+PROFILES = {
+    'card': CARD_QUERY,
+    'ratings-full': RATINGS_FULL_QUERY,
+    'tags-only': TAGS_ONLY_QUERY,
+    'search-card': SEARCH_CARD_QUERY,
+    'search-departments': SEARCH_DEPARTMENTS_QUERY,
+    'page': PAGE_QUERY,
+    'search-full': SEARCH_FULL_QUERY,
+}
+
+
+class QueryStats:
+    """Thread-safe response size and latency per profile"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: Dict[str, List[tuple]] = {}
+
+    def record(self, profile: str, nbytes: int, seconds: float):
+        with self.lock:
+            self.samples.setdefault(profile, []).append((nbytes, seconds))
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            samples = {profile: list(rows) for profile, rows in self.samples.items()}
+        report = {}
+        for profile, rows in samples.items():
+            sizes = sorted(n for n, _ in rows)
+            latencies = sorted(s for _, s in rows)
+            report[profile] = {
+                'requests': len(rows),
+                'total_bytes': sum(sizes),
+                'avg_bytes': round(sum(sizes) / len(sizes)),
+                'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+                'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+            }
+        return report
+
+    def summary(self) -> str:
+        return '\n'.join(f"  {profile}: {r['requests']} requests, {r['avg_bytes']:,} bytes avg "
+                         f"({r['total_bytes']:,} total), p50 {r['p50_ms']} ms, p95 {r['p95_ms']} ms"
+                         for profile, r in self.report().items())
+
+
+def run_query(session, profile: str, variables: Dict[str, Any], limiter: Optional[TokenBucket] = None,
+              stats: Optional[QueryStats] = None, url: str = URL, **kwargs) -> Dict[str, Any]:
+    """POST the profile's query and return the decoded response, recording its size and latency.
+
+    Latency is the final attempt's round trip (response.elapsed), so rate-limit
+    waits and retry backoff don't count against the profile.
+    """
+    response = request_with_retry(session, 'POST', url, limiter=limiter,
+                                  json={"query": PROFILES[profile], "variables": variables}, **kwargs)
+    if stats is not None:
+        stats.record(profile, len(response.content), response.elapsed.total_seconds())
+    return response.json()
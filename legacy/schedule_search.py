@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Schedule generator for multi-course registration plans.
+
+Each requirement is a course name ("MATH 320", spacing-insensitive so
+"CS 452" finds "C S 452") or a department wildcard ("REL *" = any
+REL A/REL C/REL E course). Every candidate section gets a weekly
+bitmask with one bit per 5-minute slot, so a conflict check is a
+single integer AND. The search backtracks over the requirements,
+always expanding the one with the fewest sections still compatible
+(most-constrained first) and pruning as soon as any requirement has
+none left. Complete schedules stream out of search() as they are
+found; top_k() ranks them under a hard time budget.
+
+Usage:
+  python schedule_search.py "MATH 320" "CS 452" "REL *" --k 5
+  python schedule_search.py --json '{"courses": ["MATH 320", "REL *"], "k": 3}'
+"""
+
+import argparse
+import heapq
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from instructor_join import load_join
+from meeting_times import DAYS, display_section, meeting_minutes
+
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+DEFAULT_WEIGHTS = {'rating': 1.0, 'late_start': 1.0, 'gaps': 1.0}
+
+
+class Candidate:
+    __slots__ = ('course', 'section', 'mask', 'meetings', 'rating')
+
+    def __init__(self, course: Dict[str, Any], section: Dict[str, Any], rating: Optional[float]):
+        self.course = course
+        self.section = section
+        self.rating = rating
+        self.meetings: List[Tuple[int, int, int]] = []  # (day index, start, end)
+        self.mask = 0
+        for meeting in section.get('times') or []:
+            start, end, day_mask = meeting_minutes(meeting)
+            if start is None or end is None:
+                continue
+            first, last = start // SLOT_MINUTES, -(-end // SLOT_MINUTES)
+            for day in range(len(DAYS)):
+                if day_mask & (1 << day):
+                    self.meetings.append((day, start, end))
+                    self.mask |= ((1 << (last - first)) - 1) << (day * SLOTS_PER_DAY + first)
+
+
+def load_ratings(filename: str = '../data/teacher_ratings.json',
+                 join_file: str = '../data/instructor_rmp.json') -> Dict[str, float]:
+    """instructor name -> avgRating for teachers with at least one rating.
+
+    Keys are instructor_name exactly as in courses.json when the
+    instructor_join.py index exists, else lowercased 'first last'.
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        teachers = json.load(f)
+    if os.path.exists(join_file):
+        by_id = {t['legacyId']: t for t in teachers}
+        return {name: by_id[match['legacyId']]['avgRating']
+                for name, match in load_join(join_file).items()
+                if by_id.get(match['legacyId'], {}).get('numRatings')}
+    ratings = {}
+    for t in teachers:
+        if t.get('numRatings'):
+            name = ' '.join(f"{t['firstName']} {t['lastName']}".lower().split())
+            ratings[name] = t['avgRating']
+    return ratings
+
+
+def _key(name: str) -> str:
+    """Spacing-insensitive course key, so 'CS 452' matches 'C S 452'"""
+    return name.upper().replace(' ', '')
+
+
+def candidates_for(requirement: str, courses: List[Dict[str, Any]],
+                   ratings: Dict[str, float]) -> List[Candidate]:
+    if requirement.endswith('*'):
+        prefix = _key(requirement[:-1])
+        matches = [c for c in courses if _key(c['course_name'].rsplit(' ', 1)[0]).startswith(prefix)]
+    else:
+        matches = [c for c in courses if _key(c['course_name']) == _key(requirement)]
+    result = []
+    for course in matches:
+        for section in course['sections']:
+            instructor = section.get('instructor_name') or ''
+            rating = ratings.get(instructor, ratings.get(' '.join(instructor.lower().split())))
+            result.append(Candidate(course, section, rating))
+    return result
+
+
+def search(requirements: List[List[Candidate]], deadline: float) -> Iterator[List[Candidate]]:
+    """Yield every conflict-free schedule (one candidate per requirement) until the deadline"""
+    n = len(requirements)
+    chosen: List[Optional[Candidate]] = [None] * n
+
+    def expand(busy: int, used_courses: frozenset, remaining: List[int]) -> Iterator[List[Candidate]]:
+        if time.monotonic() > deadline:
+            return
+        if not remaining:
+            yield list(chosen)
+            return
+        # Forward check every open requirement and branch on the most constrained
+        best, best_options = None, None
+        for req in remaining:
+            options = [c for c in requirements[req]
+                       if not c.mask & busy and c.course['course_name'] not in used_courses]
+            if not options:
+                return
+            if best_options is None or len(options) < len(best_options):
+                best, best_options = req, options
+        rest = [req for req in remaining if req != best]
+        for candidate in best_options:
+            chosen[best] = candidate
+            yield from expand(busy | candidate.mask, used_courses | {candidate.course['course_name']}, rest)
+            if time.monotonic() > deadline:
+                return
+        chosen[best] = None
+
+    yield from expand(0, frozenset(), list(range(n)))
+
+
+def score(schedule: List[Candidate], weights: Dict[str, float]) -> Tuple[float, Dict[str, Any]]:
+    """Higher is better. Ratings are 0-5, start hours and gap hours are on a similar scale."""
+    rated = [c.rating for c in schedule if c.rating is not None]
+    avg_rating = sum(rated) / len(rated) if rated else None
+
+    by_day: Dict[int, List[Tuple[int, int]]] = {}
+    for c in schedule:
+        for day, start, end in c.meetings:
+            by_day.setdefault(day, []).append((start, end))
+    earliest = min((start for blocks in by_day.values() for start, _ in blocks), default=None)
+    gaps = 0
+    for blocks in by_day.values():
+        blocks.sort()
+        gaps += sum(max(0, nxt[0] - prev[1]) for prev, nxt in zip(blocks, blocks[1:]))
+
+    value = weights.get('rating', 0) * (avg_rating if avg_rating is not None else 2.5)
+    if earliest is not None:
+        value += weights.get('late_start', 0) * (earliest - 8 * 60) / 60
+    value -= weights.get('gaps', 0) * gaps / 60 / max(1, len(by_day))
+    metrics = {
+        'avg_rating': round(avg_rating, 2) if avg_rating is not None else None,
+        'earliest_start': f"{earliest // 60}:{earliest % 60:02d}" if earliest is not None else None,
+        'gap_minutes': gaps,
+    }
+    return value, metrics
+
+
+def top_k(course_requirements: List[str], courses: List[Dict[str, Any]], ratings: Dict[str, float],
+          k: int = 5, time_budget: float = 2.0, weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Best k schedules found within time_budget seconds"""
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    started = time.monotonic()
+    requirements = [candidates_for(r, courses, ratings) for r in course_requirements]
+    missing = [r for r, cands in zip(course_requirements, requirements) if not cands]
+    if missing:
+        return {'schedules': [], 'error': f"No sections found for: {', '.join(missing)}"}
+
+    heap: List[Tuple[float, int, Dict[str, Any]]] = []
+    explored = 0
+    for schedule in search(requirements, started + time_budget):
+        explored += 1
+        value, metrics = score(schedule, weights)
+        if len(heap) < k or value > heap[0][0]:
+            entry = {
+                'score': round(value, 3),
+                **metrics,
+                'sections': list(schedule),
+            }
+            item = (value, explored, entry)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heapreplace(heap, item)
+
+    elapsed = time.monotonic() - started
+    return {
+        'schedules': [{**entry, 'sections': [{'course_name': c.course['course_name'], **display_section(c.section)}
+                                             for c in entry['sections']]}
+                      for _, _, entry in sorted(heap, key=lambda x: (-x[0], x[1]))],
+        'schedules_considered': explored,
+        'timed_out': elapsed > time_budget,
+        'elapsed_ms': round(elapsed * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build conflict-free schedules for a list of courses")
+    parser.add_argument('courses', nargs='*', help="course names, or 'DEPT *' for any course in a department")
+    parser.add_argument('--json', help="request as JSON: {courses, k, time_budget, weights}")
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--time-budget', type=float, default=2.0, help="seconds")
+    parser.add_argument('--courses-file', default='../data/courses.json')
+    parser.add_argument('--ratings-file', default='../data/teacher_ratings.json')
+    args = parser.parse_args()
+
+    request = json.loads(args.json) if args.json else {}
+    with open(args.courses_file, 'r') as f:
+        courses = json.load(f)
+    ratings = load_ratings(args.ratings_file)
+
+    result = top_k(request.get('courses', args.courses), courses, ratings,
+                   k=request.get('k', args.k), time_budget=request.get('time_budget', args.time_budget),
+                   weights=request.get('weights'))
+    print(json.dumps(result, indent=2 if not args.json else None))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
+import argparse
 import requests
 import json
+import sys
 import time
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
+
+from http_pool import Throughput, TokenBucket, make_session, run_pool
+from publish import atomic_write_json, publish
+from rmp_queries import QueryStats, run_query
 
 class RateMyProfessorsScraper:
-    def __init__(self):
+    def __init__(self, profile: str = 'search-card'):
+        """profile: 'search-card' (card fields only) or 'search-full' (the web app's query)"""
         self.url = "https://www.ratemyprofessors.com/graphql"
         self.headers = {
             "Content-Type": "application/json",
@@ -12,102 +19,54 @@ class RateMyProfessorsScraper:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
         
-        self.query = """query TeacherSearchPaginationQuery(
-          $count: Int!
-          $cursor: String
-          $query: TeacherSearchQuery!
-        ) {
-          search: newSearch {
-            ...TeacherSearchPagination_search_1jWD3d
-          }
-        }
-
-        fragment CardFeedback_teacher on Teacher {
-          wouldTakeAgainPercent
-          avgDifficulty
-        }
-
-        fragment CardName_teacher on Teacher {
-          firstName
-          lastName
-        }
-
-        fragment CardSchool_teacher on Teacher {
-          department
-          school {
-            name
-            id
-          }
-        }
-
-        fragment TeacherBookmark_teacher on Teacher {
-          id
-          isSaved
-        }
-
-        fragment TeacherCard_teacher on Teacher {
-          id
-          legacyId
-          avgRating
-          numRatings
-          ...CardFeedback_teacher
-          ...CardSchool_teacher
-          ...CardName_teacher
-          ...TeacherBookmark_teacher
-        }
-
-        fragment TeacherSearchPagination_search_1jWD3d on newSearch {
-          teachers(query: $query, first: $count, after: $cursor) {
-            didFallback
-            edges {
-              cursor
-              node {
-                ...TeacherCard_teacher
-                id
-                __typename
-              }
-            }
-            pageInfo {
-              hasNextPage
-              endCursor
-            }
-            resultCount
-            filters {
-              field
-              options {
-                value
-                id
-              }
-            }
-          }
+        self.school_id = "U2Nob29sLTEzNQ=="  # BYU school ID
+        self.profile = profile
+        self.session = make_session(pool_size=1, headers=self.headers)
+        self.limiter = None
+        self.retries = 0
+        self.stats = QueryStats()
+        self.failures: List[str] = []  # pages or shards the last scrape could not fetch
+    
+    def search_query(self, department_id: Optional[str] = None) -> Dict:
+        query = {
+            "text": "",
+            "schoolID": self.school_id,
+            "fallback": department_id is None
         }
-        """
+        if department_id:
+            query["departmentID"] = department_id
+        return query
     
-    def fetch_page(self, cursor: Optional[str] = None, count: int = 100) -> Dict:
+    def fetch_page(self, cursor: Optional[str] = None, count: int = 100, department_id: Optional[str] = None) -> Dict:
         """Fetch a single page of results"""
         variables = {
             "count": count,
             "cursor": cursor,
-            "query": {
-                "text": "",
-                "schoolID": "U2Nob29sLTEzNQ==",  # BYU school ID
-                "fallback": True
-            }
-        }
-        
-        payload = {
-            "query": self.query,
-            "variables": variables
+            "query": self.search_query(department_id)
         }
         
         try:
-            response = requests.post(self.url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            return response.json()
+            return run_query(self.session, self.profile, variables, limiter=self.limiter, stats=self.stats,
+                             url=self.url, retries=self.retries)
         except requests.exceptions.RequestException as e:
             print(f"Error fetching data: {e}")
             return None
     
+    @staticmethod
+    def extract_professor(node: Dict) -> Dict:
+        return {
+            'id': node.get('id'),
+            'legacyId': node.get('legacyId'),
+            'firstName': node.get('firstName'),
+            'lastName': node.get('lastName'),
+            'department': node.get('department'),
+            'school': node.get('school', {}).get('name'),
+            'avgRating': node.get('avgRating'),
+            'avgDifficulty': node.get('avgDifficulty'),
+            'numRatings': node.get('numRatings'),
+            'wouldTakeAgainPercent': node.get('wouldTakeAgainPercent')
+        }
+    
     def scrape_all_professors(self, batch_size: int = 100, delay: float = 1.0) -> List[Dict]:
         """Scrape all professors from BYU"""
         all_professors = []
@@ -123,7 +82,8 @@ class RateMyProfessorsScraper:
             data = self.fetch_page(cursor=cursor, count=batch_size)
             
             if not data or 'data' not in data:
-                print("Failed to fetch data or reached end")
+                print("Failed to fetch data; stopping")
+                self.failures.append(f"page {page_num}")
                 break
             
             teachers_data = data['data']['search']['teachers']
@@ -133,20 +93,7 @@ class RateMyProfessorsScraper:
             
             # Extract professor information
             for edge in edges:
-                node = edge['node']
-                professor = {
-                    'id': node.get('id'),
-                    'legacyId': node.get('legacyId'),
-                    'firstName': node.get('firstName'),
-                    'lastName': node.get('lastName'),
-                    'department': node.get('department'),
-                    'school': node.get('school', {}).get('name'),
-                    'avgRating': node.get('avgRating'),
-                    'avgDifficulty': node.get('avgDifficulty'),
-                    'numRatings': node.get('numRatings'),
-                    'wouldTakeAgainPercent': node.get('wouldTakeAgainPercent')
-                }
-                all_professors.append(professor)
+                all_professors.append(self.extract_professor(edge['node']))
             
             print(f"  - Fetched {len(edges)} professors")
             print(f"  - Total so far: {len(all_professors)} / {result_count}")
@@ -171,13 +118,102 @@ class RateMyProfessorsScraper:
         print(f"\n{'='*60}")
         print(f"Scraping complete! Total professors collected: {len(all_professors)}")
         print(f"{'='*60}")
+        print(f"Query stats:\n{self.stats.summary()}")
+        
+        return all_professors
+    
+    def fetch_departments(self) -> tuple:
+        """(resultCount, [(department name, departmentID)]) from the search's filter options"""
+        data = run_query(self.session, 'search-departments', {"query": self.search_query()},
+                         limiter=self.limiter, stats=self.stats, url=self.url, retries=self.retries)
+        teachers = data['data']['search']['teachers']
+        departments = []
+        for search_filter in teachers.get('filters') or []:
+            if search_filter['field'] == 'teacherdepartment_s':
+                departments = [(option['value'], option['id']) for option in search_filter['options']]
+        return teachers.get('resultCount', 0), departments
+    
+    def crawl_shard(self, department_id: Optional[str], batch_size: int = 100,
+                    stop: Optional[Callable[[List[Dict]], bool]] = None) -> List[Dict]:
+        """Walk one shard's cursor pages to the end (or until stop(professors so far) is true);
+        raises if a page fails so the shard can be retried"""
+        professors = []
+        cursor = None
+        while True:
+            variables = {"count": batch_size, "cursor": cursor, "query": self.search_query(department_id)}
+            data = run_query(self.session, self.profile, variables, limiter=self.limiter, stats=self.stats,
+                             url=self.url, retries=self.retries)
+            teachers_data = data['data']['search']['teachers']
+            professors.extend(self.extract_professor(edge['node']) for edge in teachers_data.get('edges', []))
+            page_info = teachers_data.get('pageInfo', {})
+            cursor = page_info.get('endCursor')
+            if not page_info.get('hasNextPage') or not cursor or (stop and stop(professors)):
+                return professors
+    
+    def scrape_sharded(self, concurrency: int = 8, rate: float = 5.0, batch_size: int = 100,
+                       fill_missing: bool = False) -> List[Dict]:
+        """Scrape all professors by crawling one search shard per department concurrently.
+        
+        Every request shares one token bucket, so `rate` bounds the whole crawl rather
+        than each shard. Teachers are deduplicated by legacyId. Failed shards are
+        retried once. Teachers without a department are in no shard; with
+        fill_missing the unfiltered search is paged only until that many teachers
+        not already collected have turned up.
+        """
+        self.session = make_session(pool_size=concurrency, headers=self.headers)
+        self.limiter = TokenBucket(rate, capacity=concurrency)
+        self.retries = 3
+        
+        result_count, departments = self.fetch_departments()
+        print(f"Crawling {len(departments)} department shards ({result_count} teachers) "
+              f"with {concurrency} workers at {rate}/sec...")
+        
+        by_legacy_id: Dict[int, Dict] = {}
+        progress = Throughput(len(departments), label="shards")
+        crawl = lambda department: self.crawl_shard(department[1], batch_size)
+        pending = departments
+        for attempt in range(2):
+            failed = []
+            for department, professors, error in run_pool(pending, crawl, concurrency):
+                if error:
+                    failed.append(department)
+                    print(f"  - {department[0]}: failed ({error})" + ("; will retry" if attempt == 0 else ""))
+                    continue
+                progress.tick(True)
+                for professor in professors:
+                    by_legacy_id.setdefault(professor['legacyId'], professor)
+                print(f"  - {department[0]}: {len(professors)} teachers ({progress.done}/{len(departments)})")
+            if not failed:
+                break
+            pending = failed
+        for department in failed:
+            progress.tick(False)
+            self.failures.append(f"shard {department[0]}")
+        
+        missing = result_count - len(by_legacy_id)
+        if missing > 0 and fill_missing:
+            print(f"Shards cover {len(by_legacy_id)}/{result_count} teachers; "
+                  f"paging the unfiltered search for the other {missing}")
+            found = lambda professors: sum(p['legacyId'] not in by_legacy_id for p in professors) >= missing
+            for professor in self.crawl_shard(None, batch_size, stop=found):
+                by_legacy_id.setdefault(professor['legacyId'], professor)
+        elif missing > 0:
+            failures = f", {len(failed)} shards failed" if failed else ""
+            print(f"Shards cover {len(by_legacy_id)}/{result_count} teachers{failures}; "
+                  f"--fill-missing pages the unfiltered search for the rest")
+        
+        all_professors = list(by_legacy_id.values())
+        print(f"\n{'='*60}")
+        print(f"Scraping complete! Total professors collected: {len(all_professors)}")
+        print(progress.summary())
+        print(f"{'='*60}")
+        print(f"Query stats:\n{self.stats.summary()}")
         
         return all_professors
     
     def save_to_json(self, professors: List[Dict], filename: str = "byu_professors.json"):
         """Save professors data to JSON file"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(professors, f, indent=2, ensure_ascii=False)
+        atomic_write_json(filename, professors, indent=2, ensure_ascii=False)
         print(f"\nData saved to {filename}")
     
     def save_to_csv(self, professors: List[Dict], filename: str = "byu_professors.csv"):
@@ -200,14 +236,33 @@ class RateMyProfessorsScraper:
 
 # Main execution
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape every BYU professor from RateMyProfessors")
+    parser.add_argument('--sharded', action='store_true', help="crawl one shard per department concurrently")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=5.0, help="max requests per second across all shards")
+    parser.add_argument('--fill-missing', action='store_true',
+                        help="with --sharded, page the unfiltered search until teachers in no shard are found")
+    parser.add_argument('--publish', action='store_true',
+                        help="publish byu_professors.json as the new teacher_ratings version")
+    args = parser.parse_args()
+    
     scraper = RateMyProfessorsScraper()
     
-    # Scrape all professors (100 per page with 1 second delay)
-    professors = scraper.scrape_all_professors(batch_size=100, delay=1.0)
+    if args.sharded:
+        professors = scraper.scrape_sharded(concurrency=args.concurrency, rate=args.rate, batch_size=100,
+                                            fill_missing=args.fill_missing)
+    else:
+        # Scrape all professors (100 per page with 1 second delay)
+        professors = scraper.scrape_all_professors(batch_size=100, delay=1.0)
     
     # Save to both JSON and CSV
     scraper.save_to_json(professors, "byu_professors.json")
     scraper.save_to_csv(professors, "byu_professors.csv")
+    if args.publish:
+        if scraper.failures:
+            print(f"Not publishing: {len(scraper.failures)} failed ({', '.join(scraper.failures)})")
+            sys.exit(1)
+        publish('teacher_ratings', "byu_professors.json")
     
     # Print some statistics
     if professors:
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+One SQLite database for courses, RateMyProfessors ratings and assignments.
+
+build() loads the outputs of add_times.py (data/courses.json),
+scrape_rmp.py (data/teacher_ratings.json) and fetch_class_calendar.py
+(data/current_assignments.json) into normalized tables:
+
+  course       one row per course (dept and number split out)
+  section      course_id, position within the course, instructor_id
+  meeting      section_id, display strings plus day_mask/start_min/end_min/building_code
+  instructor   distinct instructor names, joined to rating via instructor_rmp.json
+  rating       one row per RMP teacher
+  assignment   one row per exported event, in due_date order
+
+with indexes for the tool queries, FTS5 over course titles and a trigram
+FTS5 table over teacher names (so name substring matches are indexed).
+Store answers the existing tool shapes (search_courses, get_teacher_ratings,
+get_assignments) with the same results the routes return.
+
+Usage:
+  python store.py build [../data/store.sqlite]
+  python store.py query search_courses '{"course_code": "MATH 3"}'
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from meeting_times import building_code, meeting_minutes
+
+SCHEMA_VERSION = 2
+
+TIMES_MISSING, TIMES_NONE, TIMES_LIST = 0, 1, 2
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE course (
+    id INTEGER PRIMARY KEY,          -- position in courses.json
+    course_name TEXT NOT NULL COLLATE NOCASE,   -- not unique: topics courses repeat it
+    dept TEXT NOT NULL,
+    number TEXT NOT NULL COLLATE NOCASE,
+    full_title TEXT,
+    curriculum_id TEXT,
+    credit_hours TEXT
+);
+CREATE TABLE rating (
+    rowid INTEGER PRIMARY KEY,       -- position in teacher_ratings.json (it has duplicate teachers)
+    legacy_id INTEGER NOT NULL,
+    id TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    department TEXT,
+    school TEXT,
+    avg_rating REAL,
+    avg_difficulty REAL,
+    num_ratings INTEGER,
+    would_take_again_percent REAL
+);
+CREATE TABLE instructor (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    rating_legacy_id INTEGER,        -- rating.legacy_id
+    match_confidence REAL
+);
+CREATE TABLE section (
+    id INTEGER PRIMARY KEY,
+    course_id INTEGER NOT NULL REFERENCES course(id),
+    position INTEGER NOT NULL,
+    section_number TEXT,
+    instructor_id INTEGER REFERENCES instructor(id),
+    mode TEXT,
+    times_state INTEGER NOT NULL     -- 0: no "times" key, 1: "times": null, 2: a list
+);
+CREATE TABLE meeting (
+    id INTEGER PRIMARY KEY,
+    section_id INTEGER NOT NULL REFERENCES section(id),
+    position INTEGER NOT NULL,
+    days TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    building TEXT,
+    room TEXT,
+    day_mask INTEGER,
+    start_min INTEGER,
+    end_min INTEGER,
+    building_code TEXT
+);
+CREATE TABLE assignment (
+    id INTEGER PRIMARY KEY,          -- position in the export (due_date order)
+    assignment TEXT,
+    due_date TEXT,
+    course TEXT COLLATE NOCASE
+);
+
+CREATE INDEX course_name ON course(course_name);
+CREATE INDEX course_dept ON course(dept);
+CREATE INDEX course_number ON course(number);
+CREATE INDEX section_course ON section(course_id, position);
+CREATE INDEX section_instructor ON section(instructor_id);
+CREATE INDEX meeting_section ON meeting(section_id, position);
+CREATE INDEX meeting_day_time ON meeting(day_mask, start_min);
+CREATE INDEX rating_legacy_id ON rating(legacy_id);
+CREATE INDEX rating_last_name ON rating(last_name COLLATE NOCASE);
+CREATE INDEX assignment_due ON assignment(due_date);
+CREATE INDEX assignment_course_due ON assignment(course, due_date);
+
+CREATE VIRTUAL TABLE course_fts USING fts5(full_title, content='course', content_rowid='id');
+CREATE VIRTUAL TABLE rating_name USING fts5(full_name, tokenize='trigram');
+CREATE VIRTUAL TABLE instructor_name USING fts5(name, tokenize='trigram');
+"""
+
+
+def _split_course_name(course_name: str):
+    """'C S 452' -> ('C S', '452')"""
+    dept, _, number = course_name.rpartition(' ')
+    return dept, number
+
+
+def build(path: str = '../data/store.sqlite', courses_file: str = '../data/courses.json',
+          ratings_file: str = '../data/teacher_ratings.json',
+          assignments_file: str = '../data/current_assignments.json',
+          join_file: str = '../data/instructor_rmp.json') -> Dict[str, int]:
+    """Build the database at a temp path and swap it in; returns row counts"""
+    with open(courses_file, 'r', encoding='utf-8') as f:
+        courses = json.load(f)
+    with open(ratings_file, 'r', encoding='utf-8') as f:
+        teachers = json.load(f)
+    assignments = {'events': []}
+    if os.path.exists(assignments_file):
+        with open(assignments_file, 'r', encoding='utf-8') as f:
+            assignments = json.load(f)
+    join = {}
+    if os.path.exists(join_file):
+        from instructor_join import load_join
+        join = load_join(join_file)
+
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    db.executescript(SCHEMA)
+
+    db.executemany("INSERT INTO rating VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+        (position, t['legacyId'], t.get('id'), t.get('firstName'), t.get('lastName'), t.get('department'),
+         t.get('school'), t.get('avgRating'), t.get('avgDifficulty'), t.get('numRatings'),
+         t.get('wouldTakeAgainPercent'))
+        for position, t in enumerate(teachers)])
+    db.execute("INSERT INTO rating_name (rowid, full_name) "
+               "SELECT rowid, lower(first_name || ' ' || last_name) FROM rating")
+
+    instructor_ids: Dict[str, int] = {}
+    sections, meetings = [], []
+    for course_id, course in enumerate(courses):
+        dept, number = _split_course_name(course['course_name'])
+        db.execute("INSERT INTO course VALUES (?, ?, ?, ?, ?, ?, ?)",
+                   (course_id, course['course_name'], dept, number, course.get('full_title'),
+                    course.get('curriculum_id'), course.get('credit_hours')))
+        for position, section in enumerate(course['sections']):
+            name = section.get('instructor_name')
+            if name and name not in instructor_ids:
+                instructor_ids[name] = len(instructor_ids) + 1
+            section_id = len(sections) + 1
+            times = section.get('times')
+            times_state = TIMES_MISSING if 'times' not in section else TIMES_NONE if times is None else TIMES_LIST
+            sections.append((section_id, course_id, position, section.get('section_number'),
+                             instructor_ids.get(name), section.get('mode'), times_state))
+            for meeting_position, meeting in enumerate(times or []):
+                start_min, end_min, day_mask = meeting_minutes(meeting)
+                code = meeting['building_code'] if 'building_code' in meeting else building_code(meeting.get('building'))
+                meetings.append((section_id, meeting_position, meeting.get('days'), meeting.get('start_time'),
+                                 meeting.get('end_time'), meeting.get('building'), meeting.get('room'),
+                                 day_mask, start_min, end_min, code))
+
+    db.executemany("INSERT INTO instructor VALUES (?, ?, ?, ?)", [
+        (instructor_id, name, join.get(name, {}).get('legacyId'), join.get(name, {}).get('confidence'))
+        for name, instructor_id in instructor_ids.items()])
+    db.execute("INSERT INTO instructor_name (rowid, name) SELECT id, lower(name) FROM instructor")
+    db.executemany("INSERT INTO section VALUES (?, ?, ?, ?, ?, ?, ?)", sections)
+    db.executemany("INSERT INTO meeting (section_id, position, days, start_time, end_time, building, room, "
+                   "day_mask, start_min, end_min, building_code) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", meetings)
+    db.execute("INSERT INTO course_fts (rowid, full_title) SELECT id, full_title FROM course")
+
+    db.executemany("INSERT INTO assignment VALUES (?, ?, ?, ?)", [
+        (position, event.get('assignment'), event.get('due_date'), event.get('course'))
+        for position, event in enumerate(assignments['events'])])
+    export_meta = {key: value for key, value in assignments.items() if key != 'events'}
+    db.executemany("INSERT INTO meta VALUES (?, ?)", [
+        ('schema_version', str(SCHEMA_VERSION)),
+        ('built_at', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('assignments_export', json.dumps(export_meta)),
+    ])
+    db.commit()
+    db.execute("ANALYZE")
+    db.close()
+    os.replace(tmp_path, path)
+
+    return {'courses': len(courses), 'sections': len(sections), 'meetings': len(meetings),
+            'instructors': len(instructor_ids), 'ratings': len(teachers),
+            'assignments': len(assignments['events'])}
+
+
+def _like_escape(text: str) -> str:
+    return re.sub(r'([\\%_])', r'\\\1', text)
+
+
+class Store:
+    """Read-only query API over a built database"""
+
+    def __init__(self, path: str = '../data/store.sqlite', in_memory: bool = False):
+        """in_memory copies the whole database into RAM (for long-lived processes)"""
+        self.path = path
+        self.db = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True, check_same_thread=False)
+        if in_memory:
+            disk, self.db = self.db, sqlite3.connect(':memory:', check_same_thread=False)
+            disk.backup(self.db)
+            disk.close()
+        self.db.row_factory = sqlite3.Row
+        version = self.db.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if not version or int(version[0]) != SCHEMA_VERSION:
+            raise ValueError(f"{path} was built with another schema version; rebuild it with store.py build")
+
+    def close(self):
+        self.db.close()
+
+    def _substring_ids(self, table: str, column: str, text: str):
+        """SQL for rowids of a trigram table whose column contains every whitespace-separated term"""
+        terms = text.lower().split()
+        clauses = ' AND '.join(f"{column} LIKE ? ESCAPE '\\'" for _ in terms) or '1'
+        return f"SELECT rowid FROM {table} WHERE {clauses}", [f"%{_like_escape(t)}%" for t in terms]
+
+    def _instructor_ids(self, text: str) -> List[int]:
+        """Instructors whose name, or a word of it, starts with text; failing that (several
+        words) names where every word of text starts some word (lib/searchIndex.ts rules)"""
+        q = ' '.join(text.lower().split())
+        if ' ' in q:
+            ids = [r[0] for r in self.db.execute("SELECT rowid FROM instructor_name WHERE name LIKE ? ESCAPE '\\'",
+                                                 (f"{_like_escape(q)}%",))]
+            if ids:
+                return ids
+        terms = q.split()
+        clauses = ' AND '.join(f"(name LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\')" for _ in terms)
+        params = [p for t in terms for p in (f"{_like_escape(t)}%", f"% {_like_escape(t)}%")]
+        return [r[0] for r in self.db.execute(f"SELECT rowid FROM instructor_name WHERE {clauses}", params)]
+
+    def courses(self, course_ids: List[int], section_filter: Optional[Dict[int, set]] = None) -> List[Dict[str, Any]]:
+        """Rebuild courses as in courses.json, in catalog order, with only the display fields on
+        each meeting (the tool shape; the precomputed ones stay in the meeting table)"""
+        if not course_ids:
+            return []
+        course_ids = sorted(set(course_ids))
+        marks = ','.join('?' * len(course_ids))
+        rows = self.db.execute(f"""
+            SELECT c.id AS course_id, c.course_name, c.full_title, c.curriculum_id, c.credit_hours,
+                   s.id AS section_id, s.position, s.section_number, i.name AS instructor_name,
+                   s.mode, s.times_state
+            FROM course c JOIN section s ON s.course_id = c.id
+            LEFT JOIN instructor i ON i.id = s.instructor_id
+            WHERE c.id IN ({marks}) ORDER BY c.id, s.position""", course_ids).fetchall()
+        meetings: Dict[int, List[Dict[str, Any]]] = {}
+        for m in self.db.execute(f"""
+                SELECT m.section_id, m.days, m.start_time, m.end_time, m.building, m.room
+                FROM meeting m JOIN section s ON s.id = m.section_id
+                WHERE s.course_id IN ({marks}) ORDER BY m.section_id, m.position""", course_ids):
+            meetings.setdefault(m['section_id'], []).append(
+                {'days': m['days'], 'start_time': m['start_time'], 'end_time': m['end_time'],
+                 'building': m['building'], 'room': m['room']})
+
+        result: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            course = result.setdefault(row['course_id'], {
+                'course_name': row['course_name'], 'full_title': row['full_title'],
+                'curriculum_id': row['curriculum_id'], 'credit_hours': row['credit_hours'], 'sections': []})
+            if section_filter is not None and row['position'] not in section_filter.get(row['course_id'], ()):
+                continue
+            section = {
+                'section_number': row['section_number'],
+                'instructor_name': row['instructor_name'],
+                'mode': row['mode'],
+            }
+            if row['times_state'] != TIMES_MISSING:
+                section['times'] = meetings.get(row['section_id'], []) if row['times_state'] == TIMES_LIST else None
+            course['sections'].append(section)
+        return [result[i] for i in course_ids if i in result]
+
+    def search_courses(self, course_code: Optional[str] = None, instructor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Same rules as lib/searchIndex.ts: course_code is a prefix of the course code or catalog
+        number, or failing that title words (FTS prefixes); instructor is a name or name-word prefix."""
+        course_ids = None
+        if course_code:
+            code = ' '.join(course_code.split())
+            prefix = f"{_like_escape(code)}%"
+            course_ids = [r[0] for r in self.db.execute(
+                "SELECT id FROM course WHERE course_name LIKE ? ESCAPE '\\' "
+                "UNION SELECT id FROM course WHERE number LIKE ? ESCAPE '\\'", (prefix, prefix))]
+            if not course_ids:
+                tokens = [t for t in re.findall(r'[a-z0-9]+', code.lower()) if len(t) >= 3]
+                if tokens:
+                    query = ' '.join(f'"{t}"*' for t in tokens)
+                    course_ids = [r[0] for r in self.db.execute(
+                        "SELECT rowid FROM course_fts WHERE course_fts MATCH ?", (query,))]
+
+        if not instructor:
+            if course_ids is None:
+                course_ids = [r[0] for r in self.db.execute("SELECT id FROM course")]
+            return self.courses(course_ids)
+
+        instructor_ids = self._instructor_ids(instructor)
+        section_filter: Dict[int, set] = {}
+        for course_id, position in self.db.execute(
+                f"SELECT course_id, position FROM section WHERE instructor_id IN ({','.join('?' * len(instructor_ids))})",
+                instructor_ids):
+            section_filter.setdefault(course_id, set()).add(position)
+        allowed = section_filter.keys() if course_ids is None else set(course_ids) & section_filter.keys()
+        return self.courses(list(allowed), section_filter)
+
+    def get_teacher_ratings(self, teacher_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Teachers whose full name contains every term of teacher_name, as in teacher_ratings.json"""
+        sql = ("SELECT id, legacy_id, first_name, last_name, department, school, avg_rating, avg_difficulty, "
+               "num_ratings, would_take_again_percent FROM rating")
+        params: List[str] = []
+        if teacher_name and teacher_name.split():
+            ids_sql, params = self._substring_ids('rating_name', 'full_name', teacher_name)
+            sql += f" WHERE rowid IN ({ids_sql})"
+        rows = self.db.execute(sql + " ORDER BY rowid", params)
+        return [{'id': r[0], 'legacyId': r[1], 'firstName': r[2], 'lastName': r[3], 'department': r[4],
+                 'school': r[5], 'avgRating': r[6], 'avgDifficulty': r[7], 'numRatings': r[8],
+                 'wouldTakeAgainPercent': r[9]} for r in rows]
+
+    def get_assignments(self, course: Optional[str] = None, due_after: Optional[str] = None,
+                        due_before: Optional[str] = None) -> Dict[str, Any]:
+        """The current_assignments.json shape, filtered like lib/assignmentIndex.ts"""
+        clauses, params = [], []
+        if course:
+            clauses.append("course LIKE ? ESCAPE '\\'")
+            params.append(f"%{_like_escape(' '.join(course.split()))}%")
+        if due_after:
+            clauses.append("due_date >= ?")
+            params.append(due_after)
+        if due_before:
+            clauses.append("due_date <= ?")
+            params.append(due_before)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        events = [{'assignment': r[0], 'due_date': r[1], 'course': r[2]} for r in self.db.execute(
+            f"SELECT assignment, due_date, course FROM assignment{where} ORDER BY id", params)]
+        export = json.loads(self.db.execute("SELECT value FROM meta WHERE key = 'assignments_export'").fetchone()[0])
+        return {**export, 'events': events}
+
+    def instructor_rating(self, instructor_name: str) -> Optional[Dict[str, Any]]:
+        """The RMP teacher joined to a courses.json instructor_name, if any"""
+        row = self.db.execute("""
+            SELECT r.legacy_id, r.avg_rating, r.avg_difficulty, r.num_ratings, i.match_confidence
+            FROM instructor i JOIN rating r ON r.legacy_id = i.rating_legacy_id
+            WHERE i.name = ? ORDER BY r.rowid LIMIT 1""", (instructor_name,)).fetchone()
+        return dict(row) if row else None
+
+
+TOOLS = ('search_courses', 'get_teacher_ratings', 'get_assignments')
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+    if command == 'build':
+        path = sys.argv[2] if len(sys.argv) > 2 else '../data/store.sqlite'
+        started = time.perf_counter()
+        counts = build(path)
+        print(f"Built {path} in {time.perf_counter() - started:.1f}s "
+              f"({', '.join(f'{n} {table}' for table, n in counts.items())}; {os.path.getsize(path)} bytes)")
+    elif command == 'query' and len(sys.argv) > 2 and sys.argv[2] in TOOLS:
+        store = Store()
+        args = json.loads(sys.argv[3]) if len(sys.argv) > 3 else {}
+        print(json.dumps(getattr(store, sys.argv[2])(**args)))
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
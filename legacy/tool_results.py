@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Size-bounded tool results for the LLM: limits, field projection, cursors,
+summaries and a byte budget on top of store.py.
+
+A broad query ("MATH", or get_teacher_ratings with no name) returns
+hundreds or thousands of rows. run_tool() returns one page of them instead:
+
+  {"total": 412, "returned": 25, "items": [...], "next_cursor": "eyJv...",
+   "summary": {...}, "truncated": false}
+
+Shaping arguments, accepted next to the tool's own arguments:
+  limit      max items per page (default 25, at most 200)
+  fields     dotted paths to keep, e.g. ["course_name", "sections.instructor_name"]
+  cursor     next_cursor from the previous page of the same query
+  summary    include aggregates over the whole result (default true):
+             search_courses       courses, sections, per-department counts
+             get_teacher_ratings  rating-weighted averages, per-department counts
+             get_assignments      per-course counts, due date range
+  max_bytes  byte budget for the whole response (default 16000)
+
+The envelope and summary count against the budget too: when they leave no
+room for the first item, the summary loses its per-group breakdown, then is
+dropped (summary_dropped: true). Items are added until the next one would
+exceed the budget; the cursor then resumes from there. Every page holds at
+least one item, so a cursor always moves forward: a single course too big for
+the budget keeps only the sections that fit (sections_total says how many it
+has) and the cursor resumes inside it, at sections_offset, on the next page.
+A budget too small for even one section raises ValueError. Every course
+carries section_count, so the section list can be projected away.
+
+Each store keeps its last few query results (rows and summary) keyed by
+query, so following a cursor pages through them without re-running the query.
+
+Usage:
+  python tool_results.py search_courses '{"course_code": "MATH", "limit": 5, "fields": ["course_name"]}'
+"""
+
+import base64
+import hashlib
+import json
+import sys
+import threading
+import weakref
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from store import Store, TOOLS
+
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 200
+DEFAULT_MAX_BYTES = 16000
+SHAPING_ARGS = ('limit', 'fields', 'cursor', 'summary', 'max_bytes')
+TOP_GROUPS = 15
+CACHED_QUERIES = 8
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+
+def query_hash(tool: str, args: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps([tool, args], sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def encode_cursor(offset: int, qhash: str, sections: int = 0) -> str:
+    state = {'o': offset, 'q': qhash}
+    if sections:
+        state['s'] = sections
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, qhash: str) -> Tuple[int, int]:
+    """(row offset, section offset within that row)"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        offset, sections, owner = int(state['o']), int(state.get('s', 0)), state['q']
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError("invalid cursor")
+    if owner != qhash:
+        raise ValueError("cursor belongs to a different query")
+    return offset, sections
+
+
+def field_tree(fields: List[str]) -> Dict[str, Any]:
+    """["a", "b.c", "b.d"] -> {"a": {}, "b": {"c": {}, "d": {}}}; an empty dict keeps the whole value"""
+    tree: Dict[str, Any] = {}
+    for path in fields:
+        node = tree
+        for part in path.split('.'):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def project(value: Any, tree: Dict[str, Any]) -> Any:
+    """Keep only the paths in tree; lists are projected element-wise"""
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [project(v, tree) for v in value]
+    if isinstance(value, dict):
+        return {k: project(value[k], sub) for k, sub in tree.items() if k in value}
+    return value
+
+
+def _department(course_name: str) -> str:
+    return course_name.rsplit(' ', 1)[0]
+
+
+def _top(groups: Dict[str, Dict[str, Any]], key: str) -> Dict[str, Dict[str, Any]]:
+    ranked = sorted(groups.items(), key=lambda kv: (-kv[1][key], kv[0]))
+    return dict(ranked[:TOP_GROUPS])
+
+
+def summarize_courses(courses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    departments: Dict[str, Dict[str, int]] = defaultdict(lambda: {'courses': 0, 'sections': 0})
+    for course in courses:
+        group = departments[_department(course['course_name'])]
+        group['courses'] += 1
+        group['sections'] += len(course['sections'])
+    return {
+        'courses': len(courses),
+        'sections': sum(len(c['sections']) for c in courses),
+        'departments': len(departments),
+        'by_department': _top(departments, 'sections'),
+    }
+
+
+def summarize_ratings(teachers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def averages(rows):
+        rated = [t for t in rows if t.get('numRatings')]
+        weight = sum(t['numRatings'] for t in rated)
+        return {
+            'teachers': len(rows),
+            'rated': len(rated),
+            'avg_rating': round(sum(t['avgRating'] * t['numRatings'] for t in rated) / weight, 2) if weight else None,
+            'avg_difficulty': round(sum(t['avgDifficulty'] * t['numRatings'] for t in rated) / weight, 2) if weight else None,
+            'ratings': weight,
+        }
+    by_department: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for teacher in teachers:
+        by_department[teacher.get('department') or 'Unknown'].append(teacher)
+    return {**averages(teachers),
+            'by_department': _top({d: averages(rows) for d, rows in by_department.items()}, 'teachers')}
+
+
+def summarize_assignments(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    dates = [e['due_date'] for e in events if e.get('due_date')]
+    return {
+        'events': len(events),
+        'undated': len(events) - len(dates),
+        'first_due': min(dates, default=None),
+        'last_due': max(dates, default=None),
+        'by_course': dict(Counter(e['course'] for e in events).most_common(TOP_GROUPS)),
+    }
+
+
+SUMMARIES = {
+    'search_courses': summarize_courses,
+    'get_teacher_ratings': summarize_ratings,
+    'get_assignments': summarize_assignments,
+}
+
+
+def _summaries(summary: Dict[str, Any]) -> List[Optional[Dict[str, Any]]]:
+    """The summary from largest to smallest: whole, without per-group breakdowns, none"""
+    return [summary, {k: v for k, v in summary.items() if not k.startswith('by_')}, None]
+
+
+def _fit_course(course: Dict[str, Any], room: int) -> Optional[Dict[str, Any]]:
+    """The course with as many leading sections as fit in `room` bytes, or None"""
+    trimmed = {**course, 'sections': [], 'sections_total': course.get('sections_total', len(course.get('sections', [])))}
+    if _size(trimmed) > room:
+        return None
+    for section in course.get('sections', []):
+        candidate = {**trimmed, 'sections': trimmed['sections'] + [section]}
+        if _size(candidate) > room:
+            break
+        trimmed = candidate
+    return trimmed
+
+
+def paginate(tool: str, rows: List[Any], args: Dict[str, Any], limit: Optional[int] = None,
+             fields: Optional[List[str]] = None, cursor: Optional[str] = None, summary: bool = True,
+             max_bytes: int = DEFAULT_MAX_BYTES, envelope: Optional[Dict[str, Any]] = None,
+             totals: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """One budget-bounded page of a tool's full result rows; envelope keys lead the response.
+    totals is SUMMARIES[tool](rows) when the caller already has it."""
+    limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+    qhash = query_hash(tool, args)
+    offset, skip = decode_cursor(cursor, qhash) if cursor else (0, 0)
+    tree = field_tree(fields or [])
+
+    def shape(row):
+        if tool == 'search_courses':
+            row = {**row, 'section_count': len(row['sections'])}
+        return project(row, tree)
+
+    page = [shape(row) for row in rows[offset:offset + limit]]
+    if skip and page and isinstance(page[0], dict) and isinstance(page[0].get('sections'), list):
+        # Resume inside a course that the previous page cut short
+        first = page[0]
+        page[0] = {**first, 'sections': first['sections'][skip:], 'sections_offset': skip,
+                   'sections_total': len(first['sections'])}
+    else:
+        skip = 0
+    # Room the first item needs: whole if the summary can shrink enough, else a course with one section
+    needs = [0]
+    if page:
+        first = page[0]
+        needs = [_size(first) + 1]
+        if isinstance(first, dict) and isinstance(first.get('sections'), list):
+            total = first.get('sections_total', len(first['sections']))
+            needs.append(_size({**first, 'sections': first['sections'][:1], 'sections_total': total}) + 1)
+
+    base: Dict[str, Any] = {**(envelope or {}), 'total': len(rows), 'returned': 0, 'items': [], 'next_cursor': None}
+    candidates = _summaries(totals if totals is not None else SUMMARIES[tool](rows)) if summary else [None]
+    fitted = None
+    for need in needs:
+        for candidate in candidates:
+            response = dict(base)
+            if candidate is not None:
+                response['summary'] = candidate
+            elif summary:
+                response['summary_dropped'] = True
+            response['truncated'] = False
+            # Reserve room for a cursor and the returned count growing
+            used = _size(response) + len(encode_cursor(len(rows), qhash, 10 ** 6)) + 8
+            if used + need <= max_bytes:
+                fitted = response, used
+                break
+        if fitted:
+            break
+    if fitted is None:
+        raise ValueError(f"max_bytes={max_bytes} leaves no room for one item (needs {used + needs[-1]} bytes); "
+                         f"raise max_bytes or project fewer fields")
+    response, used = fitted
+
+    items = []
+    position = offset
+    resume = 0
+    for item in page:
+        size = _size(item) + 1
+        if used + size > max_bytes:
+            if not items:
+                fitted_course = _fit_course(item, max_bytes - used - 1)
+                items.append(fitted_course)
+                response['truncated'] = True
+                resume = skip + len(fitted_course['sections'])
+                if resume >= fitted_course['sections_total']:
+                    resume = 0
+                    position += 1
+            break
+        items.append(item)
+        used += size
+        position += 1
+
+    response['items'] = items
+    response['returned'] = len(items)
+    if position < len(rows):
+        response['next_cursor'] = encode_cursor(position, qhash, resume)
+    return response
+
+
+# store -> {(tool, query hash): (rows, envelope, totals)}, most recent last; dropped with the store
+_results: Any = weakref.WeakKeyDictionary()
+_results_lock = threading.Lock()
+
+
+def _query(store: Store, tool: str, query: Dict[str, Any]) -> Tuple[List[Any], Optional[Dict[str, Any]], Dict[str, Any]]:
+    """A tool's full result rows, envelope and summary, reused while the caller pages through them"""
+    key = (tool, query_hash(tool, query))
+    with _results_lock:
+        cached = _results.setdefault(store, OrderedDict())
+        if key in cached:
+            cached.move_to_end(key)
+            return cached[key]
+    result = getattr(store, tool)(**query)
+    envelope = None
+    if tool == 'get_assignments':
+        envelope = {'generated_at': result.get('generated_at'), 'courses': result['courses']}
+        result = result['events']
+    entry = result, envelope, SUMMARIES[tool](result)
+    with _results_lock:
+        cached[key] = entry
+        while len(cached) > CACHED_QUERIES:
+            cached.popitem(last=False)
+    return entry
+
+
+def run_tool(store: Store, tool: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a store tool with shaping arguments mixed into its arguments"""
+    if tool not in TOOLS:
+        raise ValueError(f"unknown tool {tool!r}")
+    query = {k: v for k, v in args.items() if k not in SHAPING_ARGS}
+    shaping = {k: v for k, v in args.items() if k in SHAPING_ARGS}
+    rows, envelope, totals = _query(store, tool, query)
+    return paginate(tool, rows, query, envelope=envelope, totals=totals, **shaping)
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in TOOLS:
+        print(__doc__)
+        return
+    args = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+    print(json.dumps(run_tool(Store(), sys.argv[1], args), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
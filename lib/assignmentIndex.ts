@@ -0,0 +1,127 @@
+import { readFileSync, statSync } from "fs";
+import { join } from "path";
+import { createHash } from "crypto";
+
+// Index written by legacy/assignment_index.py. Positions refer to the order of
+// data/current_assignments.json, whose events are sorted by due_date.
+type AssignmentIndex = {
+  version: number;
+  source_sha1: string;
+  event_count: number;
+  courses: Record<string, number[]>;
+  undated: number[];
+};
+
+export type GetAssignmentsArgs = {
+  course?: string;
+  due_after?: string;
+  due_before?: string;
+};
+
+const INDEX_VERSION = 1;
+
+let cache: { key: string; data: any; index: AssignmentIndex | null } | null = null;
+
+// mtime and size of each file, or "-" if it is missing
+function fileKey(paths: string[]) {
+  return paths
+    .map((path) => {
+      try {
+        const stat = statSync(path);
+        return `${stat.mtimeMs}:${stat.size}`;
+      } catch {
+        return "-";
+      }
+    })
+    .join("|");
+}
+
+// Load the assignments export and its index, again whenever either file is
+// replaced (legacy/publish.py installs a new version in place). The index is
+// only used if it was built from this exact file.
+function load() {
+  const dataPath = join(process.cwd(), "data", "current_assignments.json");
+  const indexPath = join(process.cwd(), "data", "current_assignments_index.json");
+  const key = fileKey([dataPath, indexPath]);
+  if (cache && cache.key === key) return cache;
+  const raw = readFileSync(dataPath, "utf-8");
+  const data = JSON.parse(raw);
+  let index: AssignmentIndex | null = null;
+  try {
+    const candidate = JSON.parse(readFileSync(indexPath, "utf-8"));
+    const sha1 = createHash("sha1").update(raw).digest("hex");
+    if (candidate.version === INDEX_VERSION && candidate.source_sha1 === sha1) {
+      index = candidate;
+    } else {
+      console.warn("current_assignments_index.json is stale; run legacy/assignment_index.py. Falling back to a linear scan.");
+    }
+  } catch {
+    // No index built yet: fall back to scanning
+  }
+  cache = { key, data, index };
+  return cache;
+}
+
+// Must match normalize() in legacy/assignment_index.py
+function normalize(text: string | null | undefined) {
+  return (text ?? "").toLowerCase().split(/\s+/).filter(Boolean).join(" ");
+}
+
+// First i in [0, n) with key(i) >= target (or > target when `after`)
+function bound(n: number, key: (i: number) => string, target: string, after: boolean) {
+  let lo = 0;
+  let hi = n;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    const k = key(mid);
+    if (k < target || (after && k === target)) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+// Positions (in due_date order) whose due_date is within [after, before]
+function dateRange(positions: number[] | null, events: any[], after?: string, before?: string): number[] {
+  const n = positions ? positions.length : events.length;
+  const at = positions ? (i: number) => positions[i] : (i: number) => i;
+  const key = (i: number) => events[at(i)].due_date ?? "";
+  const lo = after ? bound(n, key, after, false) : 0;
+  const hi = before ? bound(n, key, before, true) : n;
+  const result: number[] = [];
+  for (let i = lo; i < hi; i++) {
+    if (events[at(i)].due_date) result.push(at(i));
+  }
+  return result;
+}
+
+function scanAssignments(data: any, args: GetAssignmentsArgs) {
+  const course = args.course?.toLowerCase();
+  return data.events.filter((e: any) =>
+    (!course || e.course.toLowerCase().includes(course)) &&
+    (!args.due_after || (e.due_date && e.due_date >= args.due_after)) &&
+    (!args.due_before || (e.due_date && e.due_date <= args.due_before))
+  );
+}
+
+// get_assignments: course matches any part of the course name ("MATH", "math 320");
+// due_after/due_before are inclusive YYYY-MM-DD bounds. Results stay in due_date order.
+export function getAssignments(args: GetAssignmentsArgs) {
+  const { data, index } = load();
+  if (!args.course && !args.due_after && !args.due_before) return data;
+  if (!index) return { ...data, events: scanAssignments(data, args) };
+
+  const ranged = !!(args.due_after || args.due_before);
+  let positions: number[];
+  if (args.course) {
+    // Few distinct courses: match names by substring, then range-search each partition
+    const q = normalize(args.course);
+    positions = Object.keys(index.courses)
+      .filter((name) => name.includes(q))
+      .flatMap((name) => ranged ? dateRange(index.courses[name], data.events, args.due_after, args.due_before)
+                                : index.courses[name])
+      .sort((a, b) => a - b);
+  } else {
+    positions = dateRange(null, data.events, args.due_after, args.due_before);
+  }
+  return { ...data, events: positions.map((i) => data.events[i]) };
+}
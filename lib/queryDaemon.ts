@@ -0,0 +1,52 @@
+// Client for legacy/query_daemon.py. When QUERY_DAEMON_URL is set (e.g.
+// http://127.0.0.1:8766) the data tools are answered by the resident daemon
+// instead of reading data/*.json in this process. If the daemon is unreachable
+// or fails (5xx), the local implementation answers instead; a 4xx means the
+// arguments were bad, and its error is returned to the caller as {error}.
+//
+// The daemon answers search_courses, get_teacher_ratings and get_assignments
+// with a budget-bounded page ({total, returned, items, next_cursor, summary};
+// see legacy/tool_results.py). The local fallback returns the whole result,
+// so the paging arguments are only offered when the daemon is configured.
+const DAEMON_URL = process.env.QUERY_DAEMON_URL;
+const DAEMON_TIMEOUT_MS = 10000;
+
+export const DAEMON_ENABLED = Boolean(DAEMON_URL);
+
+// Paging arguments the model may add to the bounded tools (JSON schema properties)
+export const PAGING_PROPERTIES = DAEMON_ENABLED ? {
+  limit: { type: "number", description: "Max items per page (default 25, at most 200)" },
+  fields: {
+    type: "array",
+    items: { type: "string" },
+    description: "Dotted paths to keep in each item, e.g. ['course_name', 'sections.instructor_name']",
+  },
+  cursor: { type: "string", description: "next_cursor from the previous page of the same query" },
+  max_bytes: { type: "number", description: "Byte budget for the whole response (default 16000)" },
+} : {};
+
+export async function viaDaemon<T>(
+  tool: string,
+  args: object,
+  local: () => T | Promise<T>,
+): Promise<T | { error: string }> {
+  if (DAEMON_URL) {
+    try {
+      const res = await fetch(`${DAEMON_URL}/query`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ tool, args, bounded: true }),
+        signal: AbortSignal.timeout(DAEMON_TIMEOUT_MS),
+      });
+      if (res.ok) return (await res.json()).result;
+      if (res.status < 500) {
+        const body = await res.json().catch(() => ({}));
+        return { error: body.error ?? `query daemon rejected ${tool}: ${res.status}` };
+      }
+      console.warn(`query daemon failed ${tool}: ${res.status}; answering locally.`);
+    } catch (error) {
+      console.warn(`query daemon unreachable for ${tool}; answering locally.`, error);
+    }
+  }
+  return local();
+}
@@ -0,0 +1,24 @@
+import { execFile } from "child_process";
+import { join } from "path";
+import { promisify } from "util";
+
+const execFileAsync = promisify(execFile);
+
+export type BuildScheduleArgs = {
+  courses: string[];
+  k?: number;
+  weights?: { rating?: number; late_start?: number; gaps?: number };
+};
+
+// build_schedule: runs legacy/schedule_search.py, which backtracks over the
+// requested courses with bitmask conflict pruning and returns the top-k
+// conflict-free schedules found within its time budget.
+export async function buildSchedule(args: BuildScheduleArgs) {
+  const request = JSON.stringify({ courses: args.courses, k: args.k ?? 5, weights: args.weights, time_budget: 2 });
+  const { stdout } = await execFileAsync(process.env.PYTHON ?? "python3", ["schedule_search.py", "--json", request], {
+    cwd: join(process.cwd(), "legacy"),
+    timeout: 15000,
+    maxBuffer: 16 * 1024 * 1024,
+  });
+  return JSON.parse(stdout);
+}
@@ -0,0 +1,176 @@
+import { readFileSync, statSync } from "fs";
+import { join } from "path";
+import { createHash } from "crypto";
+
+// Prebuilt index written by legacy/build_search_index.py. All positions refer
+// to the order of data/courses.json.
+type CourseIndex = {
+  version: number;
+  source_sha1: string;
+  course_count: number;
+  code_prefix: Record<string, number[]>;
+  title_prefix: Record<string, number[]>;
+  instructor_names: string[];
+  instructor_sections: [number, number][][];
+  instructor_prefix: Record<string, number[]>;
+};
+
+const INDEX_VERSION = 1;
+const TITLE_MIN_PREFIX = 3;
+
+let cache: { key: string; courses: any[]; index: CourseIndex | null } | null = null;
+
+// Meeting fields precomputed by legacy/add_times.py for the Python side;
+// search_courses returns only the display fields (see meeting_times.display_section).
+const DERIVED_MEETING_FIELDS = ["start_min", "end_min", "day_mask", "building_code"];
+
+function displayCourses(courses: any[]) {
+  for (const course of courses) {
+    for (const section of course.sections) {
+      for (const meeting of section.times ?? []) {
+        for (const field of DERIVED_MEETING_FIELDS) delete meeting[field];
+      }
+    }
+  }
+  return courses;
+}
+
+// mtime and size of each file, or "-" if it is missing
+function fileKey(paths: string[]) {
+  return paths
+    .map((path) => {
+      try {
+        const stat = statSync(path);
+        return `${stat.mtimeMs}:${stat.size}`;
+      } catch {
+        return "-";
+      }
+    })
+    .join("|");
+}
+
+// Load courses.json and its index, again whenever either file is replaced
+// (legacy/publish.py installs a new version in place). The index is only used
+// if it was built from this exact courses.json.
+function load() {
+  const coursesPath = join(process.cwd(), "data", "courses.json");
+  const indexPath = join(process.cwd(), "data", "courses_index.json");
+  const key = fileKey([coursesPath, indexPath]);
+  if (cache && cache.key === key) return cache;
+  const raw = readFileSync(coursesPath, "utf-8");
+  const courses = displayCourses(JSON.parse(raw));
+  let index: CourseIndex | null = null;
+  try {
+    const candidate = JSON.parse(readFileSync(indexPath, "utf-8"));
+    const sha1 = createHash("sha1").update(raw).digest("hex");
+    if (candidate.version === INDEX_VERSION && candidate.source_sha1 === sha1) {
+      index = candidate;
+    } else {
+      console.warn("courses_index.json is stale; run legacy/build_search_index.py. Falling back to a linear scan.");
+    }
+  } catch {
+    // No index built yet: fall back to scanning
+  }
+  cache = { key, courses, index };
+  return cache;
+}
+
+// Must match normalize()/tokenize() in legacy/build_search_index.py
+function normalize(text: string | null | undefined) {
+  return (text ?? "").toLowerCase().split(/\s+/).filter(Boolean).join(" ");
+}
+
+function tokenize(text: string) {
+  return text.toLowerCase().match(/[a-z0-9]+/g) ?? [];
+}
+
+function lookup(table: Record<string, number[]>, key: string): number[] {
+  return Object.prototype.hasOwnProperty.call(table, key) ? table[key] : [];
+}
+
+function intersect(lists: number[][]): number[] {
+  if (lists.length === 0) return [];
+  let result = new Set(lists[0]);
+  for (const list of lists.slice(1)) {
+    result = new Set(list.filter((x) => result.has(x)));
+  }
+  return Array.from(result);
+}
+
+function matchCourses(index: CourseIndex, query: string): Set<number> {
+  const q = normalize(query);
+  const codeHits = lookup(index.code_prefix, q);
+  if (codeHits.length > 0) return new Set(codeHits);
+  // Not a course code: match title words instead
+  const tokens = tokenize(q).filter((t) => t.length >= TITLE_MIN_PREFIX);
+  return new Set(intersect(tokens.map((t) => lookup(index.title_prefix, t))));
+}
+
+function matchSections(index: CourseIndex, query: string): Map<number, Set<number>> {
+  const q = normalize(query);
+  let nameIds = lookup(index.instructor_prefix, q);
+  if (nameIds.length === 0 && q.includes(" ")) {
+    nameIds = intersect(q.split(" ").map((t) => lookup(index.instructor_prefix, t)));
+  }
+  const byCourse = new Map<number, Set<number>>();
+  for (const nameId of nameIds) {
+    for (const [course, section] of index.instructor_sections[nameId]) {
+      if (!byCourse.has(course)) byCourse.set(course, new Set());
+      byCourse.get(course)!.add(section);
+    }
+  }
+  return byCourse;
+}
+
+function scanCourses(courses: any[], args: { course_code?: string; instructor?: string }) {
+  let filtered = courses;
+
+  if (args.course_code) {
+    const search = args.course_code.toLowerCase();
+    filtered = filtered.filter((c: any) =>
+      c.course_name.toLowerCase().includes(search) ||
+      c.full_title.toLowerCase().includes(search)
+    );
+  }
+
+  if (args.instructor) {
+    const search = args.instructor.toLowerCase();
+    filtered = filtered.map((c: any) => ({
+      ...c,
+      sections: c.sections.filter((s: any) =>
+        (s.instructor_name ?? "").toLowerCase().includes(search)
+      )
+    })).filter((c: any) => c.sections.length > 0);
+  }
+
+  return filtered;
+}
+
+// search_courses: course_code matches a course-code prefix ("MATH 3", "320"),
+// or failing that title words (prefixes of 3+ letters); instructor matches a
+// prefix of the full name or of any part of it. Results keep the order of
+// courses.json.
+export function searchCourses(args: { course_code?: string; instructor?: string }) {
+  const { courses, index } = load();
+  if (!index) return scanCourses(courses, args);
+
+  let courseIds: number[] | null = null;
+  if (args.course_code) {
+    courseIds = Array.from(matchCourses(index, args.course_code));
+  }
+
+  if (!args.instructor) {
+    if (courseIds === null) return courses;
+    return courseIds.sort((a, b) => a - b).map((i) => courses[i]);
+  }
+
+  const sections = matchSections(index, args.instructor);
+  const allowed = courseIds === null ? null : new Set(courseIds);
+  return Array.from(sections.keys())
+    .filter((i) => allowed === null || allowed.has(i))
+    .sort((a, b) => a - b)
+    .map((i) => ({
+      ...courses[i],
+      sections: courses[i].sections.filter((_: any, s: number) => sections.get(i)!.has(s)),
+    }));
+}